@@ -0,0 +1,372 @@
+"""
+Headless command-line entry point for ColdCompress.
+
+Runs the same scan/compress/decompress pipeline as the GUI without importing
+tkinter, so it can be scheduled from cron or run on servers without a display.
+"""
+import argparse
+import json
+import multiprocessing
+import shutil
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import (
+    THRESHOLD_DAYS, MAX_WORKERS, PROGRESS_REFRESH_MS, USE_DICTIONARIES, USE_PACKS, PACK_NAME, USE_DEDUP,
+    JOB_BANDWIDTH_LIMIT, JOB_CPU_SHARE, JOB_LOW_PRIORITY, SELECTION_POLICY,
+    READ_CACHE_DISK_BYTES, SERVE_HOST, SERVE_PORT, METRICS_ENABLED, METRICS_DIR, PROFILE_CPU, PROFILE_MEMORY
+)
+from services.compression_service import CompressionService
+from services.file_server import ColdFileServer
+from services.job_control import JobController
+from services.selection_policy import AGE_FIELDS, SelectionPolicy
+from services.pipeline import CompressionPipeline, RunSummary
+from services.progress import format_progress
+from services.read_cache import DecompressionCache
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize Paths and other non-JSON values as strings."""
+    return str(value)
+
+
+def _print_json(payload: Dict[str, Any]):
+    print(json.dumps(payload, default=_json_default, indent=2, ensure_ascii=False))
+
+
+def _print_summary(summary: RunSummary):
+    """Print a human-readable run summary."""
+    for message in summary.recovered:
+        print(message)
+    print(f"Scanned files: {summary.scanned_files}")
+    if summary.operation == "compress":
+        print(f"Cold candidates: {summary.candidate_files} "
+              f"({summary.candidate_bytes / (1024 * 1024):.2f} MB)")
+    print(f"Files processed: {summary.files_processed} "
+          f"(succeeded {summary.files_succeeded}, failed {summary.files_failed}, "
+          f"skipped {summary.files_skipped})")
+    if summary.cancelled:
+        print(f"Cancelled: {summary.files_cancelled} files stopped before finishing")
+    if summary.operation == "compress" and not summary.dry_run:
+        print(f"Space saved: {summary.space_saved / (1024 * 1024):.2f} MB")
+    if not summary.dry_run and summary.elapsed:
+        print(f"Throughput: {summary.bytes_processed / (1024 * 1024) / summary.elapsed:.1f} MB/s")
+    print(f"Elapsed: {summary.elapsed:.2f}s")
+    for path in summary.metrics_files:
+        print(f"Metrics: {path}")
+
+
+def _print_stage_times(pipeline: CompressionPipeline):
+    """Print where the run spent its time, busiest stage first."""
+    report = pipeline.metrics.to_dict()
+    for stage, seconds in report['stages'].items():
+        print(f"  {stage:<16} {seconds:>10.3f}s")
+    latency = report['file_latency']
+    if latency['count']:
+        print(f"  per-file latency: p50 <= {latency['p50']}s, p90 <= {latency['p90']}s, "
+              f"p99 <= {latency['p99']}s")
+
+
+def _report_progress(pipeline: CompressionPipeline, stop: threading.Event):
+    """Rewrite a progress line on stderr until stop is set."""
+    while not stop.wait(PROGRESS_REFRESH_MS / 1000):
+        print(f"\r{format_progress(pipeline.progress.snapshot())}\033[K",
+              end="", file=sys.stderr, flush=True)
+    print("\r\033[K", end="", file=sys.stderr, flush=True)
+
+
+def _run_operation(args: argparse.Namespace, pipeline: CompressionPipeline) -> RunSummary:
+    """Run a compress, decompress or verify pass, streaming results to stdout."""
+    results: List[Dict[str, Any]] = []
+
+    # Live progress only makes sense on an interactive terminal
+    stop_progress = threading.Event()
+    if sys.stderr.isatty() and not getattr(args, 'dry_run', False):
+        threading.Thread(target=_report_progress, args=(pipeline, stop_progress), daemon=True).start()
+
+    def on_result(result: Dict[str, Any], summary: RunSummary):
+        if args.json:
+            results.append(result)
+        else:
+            print(result['message'], flush=True)
+
+    try:
+        if args.command == "compress":
+            summary = pipeline.compress(args.folder, args.threshold_days, args.dry_run, on_result)
+        elif args.command == "decompress":
+            summary = pipeline.decompress(args.folder, args.dry_run, on_result)
+        else:
+            summary = pipeline.verify(args.folder, on_result)
+    finally:
+        stop_progress.set()
+
+    if args.json:
+        _print_json({'summary': summary.to_dict(), 'metrics': pipeline.metrics.to_dict(), 'results': results})
+    else:
+        _print_summary(summary)
+        if args.timings:
+            _print_stage_times(pipeline)
+    return summary
+
+
+def _command_scan(args: argparse.Namespace, pipeline: CompressionPipeline) -> int:
+    entries = []
+    for entry in pipeline.scan(args.folder, args.threshold_days):
+        if args.json:
+            entries.append({
+                'path': str(entry.path),
+                'compressed': entry.compressed,
+                'size': entry.size,
+                'atime': entry.stat.st_atime if entry.stat is not None else None
+            })
+        else:
+            print(f"{'compressed' if entry.compressed else 'cold':<10} {entry.path}")
+    if args.json:
+        _print_json({'entries': entries})
+    return 0
+
+
+def _command_stats(args: argparse.Namespace, pipeline: CompressionPipeline) -> int:
+    stats = pipeline.stats(args.folder)
+    if args.sizes:
+        stats.update(pipeline.sizes(args.folder))
+    if args.json:
+        _print_json(stats)
+    else:
+        print(f"Total files: {stats['total_files']}")
+        print(f"Compressed files: {stats['compressed_files']}")
+        if args.sizes:
+            print(f"Physical size: {stats['physical_bytes'] / (1024 * 1024):.2f} MB")
+            print(f"Logical size: {stats['logical_bytes'] / (1024 * 1024):.2f} MB")
+            if stats['unknown_files']:
+                print(f"Legacy or unreadable files (logical size unknown): {stats['unknown_files']}")
+    return 0
+
+
+def _command_extract(args: argparse.Namespace, pipeline: CompressionPipeline) -> int:
+    service = pipeline.service
+    if args.list:
+        members = service.list_pack(args.archive)
+        if args.json:
+            _print_json({'members': [member._asdict() for member in members]})
+        else:
+            for member in members:
+                print(f"{member.size:>12} {member.name}")
+        return 0
+
+    result = service.extract_pack(args.archive, args.names or None)
+    if args.json:
+        _print_json(result)
+    else:
+        print(result['message'])
+    return 0 if result['success'] else 1
+
+
+def _read_cache(args: argparse.Namespace, pipeline: CompressionPipeline) -> DecompressionCache:
+    return DecompressionCache(pipeline.service, disk_bytes=int(args.cache_size * 1024 * 1024))
+
+
+def _command_read(args: argparse.Namespace, pipeline: CompressionPipeline) -> int:
+    cache = _read_cache(args, pipeline)
+    try:
+        with cache.open(args.path) as source:
+            if args.output is not None:
+                with open(args.output, "wb") as target:
+                    shutil.copyfileobj(source, target)
+            else:
+                shutil.copyfileobj(source, sys.stdout.buffer)
+                sys.stdout.flush()
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _command_serve(args: argparse.Namespace, pipeline: CompressionPipeline) -> int:
+    with ColdFileServer(args.folder, _read_cache(args, pipeline), args.bind, args.port,
+                        verbose=args.verbose) as server:
+        host, port = server.server_address[:2]
+        print(f"Serving {args.folder} at http://{host}:{port}/ (cache stats at /_stats)", flush=True)
+        server.serve_forever()
+    return 0
+
+
+def _command_process(args: argparse.Namespace, pipeline: CompressionPipeline) -> int:
+    while True:
+        summary = _run_operation(args, pipeline)
+        if summary.cancelled:
+            return 130
+        if not args.interval:
+            return 1 if summary.files_failed else 0
+        time.sleep(args.interval)
+
+
+def _load_policy(args: argparse.Namespace) -> SelectionPolicy:
+    """Build the selection policy from the configured rules and the policy options."""
+    rules = dict(SELECTION_POLICY)
+    if getattr(args, 'policy', None) is not None:
+        rules = json.loads(args.policy.read_text(encoding="utf-8"))
+        if not isinstance(rules, dict):
+            raise ValueError(f"{args.policy} must hold a JSON object")
+    if getattr(args, 'age_field', None) is not None:
+        rules['age_field'] = args.age_field
+    if getattr(args, 'max_bytes', None) is not None:
+        rules['max_bytes_per_run'] = args.max_bytes
+    return SelectionPolicy(rules)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the command-line argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="coldcompress",
+        description="Compress files that have not been accessed recently."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(subparser: argparse.ArgumentParser):
+        subparser.add_argument("folder", type=Path, help="root folder to process")
+        subparser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+
+    def add_policy(subparser: argparse.ArgumentParser):
+        subparser.add_argument("--policy", type=Path,
+                               help="JSON file with selection rules replacing the configured ones")
+        subparser.add_argument("--age-field", choices=AGE_FIELDS,
+                               help="timestamp the age threshold applies to ('newest' suits noatime mounts)")
+        subparser.add_argument("--max-bytes", type=int,
+                               help="select at most this many bytes of cold files per run")
+
+    scan = subparsers.add_parser("scan", help="list cold candidates and compressed files")
+    add_common(scan)
+    scan.add_argument("--threshold-days", type=int, default=THRESHOLD_DAYS,
+                      help=f"age threshold in days (default: {THRESHOLD_DAYS})")
+    add_policy(scan)
+    scan.set_defaults(handler=_command_scan)
+
+    for name, help_text in (("compress", "compress files older than the threshold"),
+                            ("decompress", "decompress all .zz files"),
+                            ("verify", "check all .zz files against their checksums without writing")):
+        subparser = subparsers.add_parser(name, help=help_text)
+        add_common(subparser)
+        if name == "compress":
+            subparser.add_argument("--threshold-days", type=int, default=THRESHOLD_DAYS,
+                                   help=f"age threshold in days (default: {THRESHOLD_DAYS})")
+            add_policy(subparser)
+            subparser.add_argument("--dictionary", action="store_true", default=USE_DICTIONARIES,
+                                   help="compress small files against a shared per-directory dictionary")
+            subparser.add_argument("--pack", action="store_true", default=USE_PACKS,
+                                   help="bundle small files of each directory into one pack archive")
+            subparser.add_argument("--dedup", action="store_true", default=USE_DEDUP,
+                                   help="store identical files once and hardlink the copies")
+        subparser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                               help=f"parallel workers (default: {MAX_WORKERS})")
+        if name != "verify":
+            subparser.add_argument("--dry-run", action="store_true",
+                                   help="report what would be done without changing any file")
+        if name == "decompress":
+            subparser.add_argument("--allow-unverified", action="store_true",
+                                   help="replace .zz files whose checksum can't be computed here "
+                                        "(xxh64 without xxhash) after checking only their size")
+        subparser.add_argument("--interval", type=float, default=0,
+                               help="keep running, repeating the pass every INTERVAL seconds")
+        subparser.add_argument("--bandwidth", type=float, default=JOB_BANDWIDTH_LIMIT, metavar="MBPS",
+                               help="limit input bandwidth across all workers in MB/s (0: unlimited)")
+        subparser.add_argument("--cpu-share", type=float, default=JOB_CPU_SHARE, metavar="FRACTION",
+                               help="fraction of its time each worker may spend working (default: 1.0)")
+        subparser.add_argument("--low-priority", action="store_true", default=JOB_LOW_PRIORITY,
+                               help="run workers at background CPU and I/O priority")
+        subparser.add_argument("--timings", action="store_true",
+                               help="print time spent per stage and per-file latency percentiles")
+        subparser.add_argument("--metrics-dir", type=Path, default=METRICS_DIR,
+                               help=f"where run metrics (JSON and Prometheus text) are written (default: {METRICS_DIR})")
+        subparser.add_argument("--no-metrics", dest="metrics", action="store_false", default=METRICS_ENABLED,
+                               help="do not write metrics files")
+        subparser.add_argument("--profile", action="store_true", default=PROFILE_CPU,
+                               help="cProfile file operations and write a .prof report next to the metrics")
+        subparser.add_argument("--trace-memory", action="store_true", default=PROFILE_MEMORY,
+                               help="trace allocations with tracemalloc and report the peak and top sites")
+        subparser.set_defaults(handler=_command_process)
+
+    stats = subparsers.add_parser("stats", help="show file counts for a folder")
+    add_common(stats)
+    stats.add_argument("--sizes", action="store_true",
+                       help="also total logical vs. physical size of .zz files (reads headers only)")
+    stats.set_defaults(handler=_command_stats)
+
+    extract = subparsers.add_parser("extract", help="restore files from a pack archive")
+    extract.add_argument("archive", type=Path, help=f"pack archive ({PACK_NAME})")
+    extract.add_argument("names", nargs="*", help="members to extract (default: all)")
+    extract.add_argument("--list", action="store_true", help="list members instead of extracting")
+    extract.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    extract.add_argument("--allow-unverified", action="store_true",
+                         help="extract members whose checksum can't be computed here after checking only their size")
+    extract.set_defaults(handler=_command_extract)
+
+    cache_size_help = f"on-disk read cache limit in MB (default: {READ_CACHE_DISK_BYTES // (1024 * 1024)})"
+    read = subparsers.add_parser("read", help="print the original content of a compressed file, leaving it compressed")
+    read.add_argument("path", type=Path, help="original path (or the .zz path) of a compressed file or pack member")
+    read.add_argument("--output", "-o", type=Path, help="write to this file instead of stdout")
+    read.add_argument("--cache-size", type=float, default=READ_CACHE_DISK_BYTES / (1024 * 1024),
+                      metavar="MB", help=cache_size_help)
+    read.set_defaults(handler=_command_read)
+
+    serve = subparsers.add_parser("serve", help="serve a folder over local HTTP, decompressing files on demand")
+    serve.add_argument("folder", type=Path, help="root folder to serve")
+    serve.add_argument("--bind", default=SERVE_HOST, help=f"address to listen on (default: {SERVE_HOST})")
+    serve.add_argument("--port", type=int, default=SERVE_PORT, help=f"port to listen on (default: {SERVE_PORT})")
+    serve.add_argument("--cache-size", type=float, default=READ_CACHE_DISK_BYTES / (1024 * 1024),
+                       metavar="MB", help=cache_size_help)
+    serve.add_argument("--verbose", action="store_true", help="log every request")
+    serve.set_defaults(handler=_command_serve)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command-line interface."""
+    args = build_parser().parse_args(argv)
+    if hasattr(args, 'folder') and not args.folder.is_dir():
+        print(f"Error: {args.folder} is not a valid folder", file=sys.stderr)
+        return 2
+    if hasattr(args, 'archive') and not args.archive.is_file():
+        print(f"Error: {args.archive} is not a file", file=sys.stderr)
+        return 2
+
+    try:
+        selection_policy = _load_policy(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: invalid selection policy: {e}", file=sys.stderr)
+        return 2
+
+    service = CompressionService(
+        selection_policy=selection_policy,
+        use_dictionaries=getattr(args, 'dictionary', USE_DICTIONARIES),
+        use_packs=getattr(args, 'pack', USE_PACKS),
+        use_dedup=getattr(args, 'dedup', USE_DEDUP),
+        allow_unverified=getattr(args, 'allow_unverified', False)
+    )
+    controller = JobController(
+        bandwidth_limit=getattr(args, 'bandwidth', JOB_BANDWIDTH_LIMIT),
+        cpu_share=getattr(args, 'cpu_share', JOB_CPU_SHARE),
+        low_priority=getattr(args, 'low_priority', JOB_LOW_PRIORITY)
+    )
+    # Let a service manager stop a run cleanly: running files finish or roll back
+    signal.signal(signal.SIGTERM, lambda signum, frame: controller.cancel())
+    pipeline = CompressionPipeline(
+        service, max_workers=getattr(args, 'workers', MAX_WORKERS), controller=controller,
+        metrics_dir=args.metrics_dir if getattr(args, 'metrics', False) else None,
+        profile_cpu=getattr(args, 'profile', PROFILE_CPU),
+        profile_memory=getattr(args, 'trace_memory', PROFILE_MEMORY)
+    )
+    try:
+        return args.handler(args, pipeline)
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,3 +1,6 @@
+import os
+from pathlib import Path
+
 # Default threshold for file age in days
 THRESHOLD_DAYS = 30
 
@@ -44,3 +47,188 @@ LOG_COLORS = {
 
 # File extensions
 COMPRESSED_EXTENSION = ".zz"
+
+# Compression engine configuration
+COMPRESSION_LEVEL = 9
+
+# Size of the read/write buffer used when streaming file data (bytes)
+CHUNK_SIZE = 1024 * 1024
+
+# Uncompressed size of each independently compressed block in a .zz container (bytes)
+BLOCK_SIZE = 1024 * 1024
+
+# Checksum recorded in the footer of new .zz containers. CRC-32 can be checked
+# everywhere; 'xxh64' is faster but needs the optional xxhash package on every
+# machine that decompresses (elsewhere only the original size is checked)
+CHECKSUM_ALGORITHM = 'crc32'
+
+# Memory-map files at least this large when compressing, feeding blocks to the
+# codec as slices of the mapping instead of copying them into bytes objects
+USE_MMAP = True
+MMAP_MIN_SIZE = 4 * BLOCK_SIZE
+
+# Threads compressing or decompressing the blocks of large files, split between the files of a parallel run
+BLOCK_WORKERS = os.cpu_count() or 1
+
+# Number of files processed concurrently (defaults to one per CPU core)
+MAX_WORKERS = os.cpu_count() or 1
+
+# Use a process pool for multi-file operations; a thread pool is used otherwise
+USE_PROCESS_POOL = True
+
+# Throttling for running jobs, so compression can share a busy file server:
+# input bandwidth across all workers in MB/s (0 = unlimited), the fraction of
+# its time each worker may spend working, and background CPU/I/O priority
+JOB_BANDWIDTH_LIMIT = 0
+JOB_CPU_SHARE = 1.0
+JOB_LOW_PRIORITY = False
+
+# Seconds between checks for cancellation while a job is paused
+JOB_PAUSE_POLL = 0.2
+
+# Directories listed concurrently while scanning (1 scans on a single thread)
+SCAN_WORKERS = 8
+
+# Yield scan results in a deterministic, name-sorted order
+SCAN_ORDERED = False
+
+# Local cache directory for persistent state
+CACHE_DIR = Path(os.environ.get('LOCALAPPDATA', Path.home() / '.cache')) / 'ColdCompress'
+
+# Persistent scan index used for incremental rescans
+USE_SCAN_INDEX = True
+SCAN_INDEX_PATH = CACHE_DIR / 'scan_index.sqlite3'
+SCAN_INDEX_TIMEOUT = 1.0  # Seconds to wait for another process's lock before scanning without the index
+
+# Compressibility probe: compress a small sample at a fast level before the real run
+PROBE_ENABLED = True
+PROBE_SAMPLE_SIZE = 64 * 1024  # Bytes per sample (head, middle and tail)
+PROBE_LEVEL = 1
+PROBE_MIN_SAVINGS = 5.0  # Skip files whose sample shrinks by less than this percentage
+
+# Extensions of formats that are already compressed
+INCOMPRESSIBLE_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic',
+    '.mp3', '.aac', '.ogg', '.flac', '.mp4', '.m4v', '.mkv', '.mov', '.avi', '.webm',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.zst', '.lz4',
+    '.docx', '.xlsx', '.pptx', '.jar', '.apk', '.gpg'
+}
+
+# Order compression work by estimated space reclaimed per unit of work
+USE_SCHEDULER = True
+SCHEDULER_WINDOW = 10000  # Most candidates held for ordering at once; 0 orders the whole scan
+SCHEDULER_WARMUP = 64  # Candidates collected before the first is dispatched; the window then grows
+SCHEDULER_FILE_OVERHEAD = 256 * 1024  # Fixed per-file cost in bytes (open, journal, fsync, rename)
+SCHEDULER_PROBE_MIN_SIZE = 8 * 1024 * 1024  # Sample files this large instead of using priors
+SCHEDULER_LARGE_FILE = 64 * 1024 * 1024  # Large jobs are kept to half of the workers
+
+# Expected fraction of a file's size compression reclaims, by extension
+COMPRESSIBILITY_PRIORS = {
+    '.log': 0.9, '.csv': 0.8, '.tsv': 0.8, '.json': 0.85, '.xml': 0.85, '.sql': 0.8,
+    '.txt': 0.65, '.md': 0.6, '.html': 0.75, '.yaml': 0.7, '.yml': 0.7,
+    '.bak': 0.5, '.dat': 0.4, '.bin': 0.3, '.pdf': 0.1, '.exe': 0.4, '.dll': 0.4,
+}
+DEFAULT_COMPRESSIBILITY = 0.5
+
+# CPU cost of each codec relative to zlib, per input byte
+CODEC_COSTS = {'zlib': 1.0, 'zstd': 0.3, 'bz2': 3.0, 'lzma': 8.0}
+
+# Codec used when no policy rule matches (level is COMPRESSION_LEVEL)
+DEFAULT_CODEC = 'zlib'
+
+# Per-file codec selection; the first matching rule wins. Each rule lists
+# (codec, level) choices in order of preference and the first available one is
+# used, so optional codecs such as zstd fall back to the standard library.
+CODEC_POLICY = [
+    {
+        'min_size': 1024 ** 3,
+        'codecs': [('zstd', 3), ('zlib', 1)]
+    },
+    {
+        'extensions': {'.log', '.txt', '.csv', '.tsv', '.json', '.xml', '.md', '.sql'},
+        'codecs': [('lzma', 6)]
+    },
+]
+
+# Which files are cold candidates. A file is picked when every rule holds:
+#   age_field: timestamp compared with the age threshold: 'atime', 'mtime',
+#     'ctime' or 'newest' (the later of atime and mtime, safe on noatime mounts)
+#   days: age threshold overriding the one given to the scan
+#   min_size / max_size: size range in bytes
+#   include / exclude: globs; without a '/' they match the file name, with one
+#     the path below the scan root (an empty include list includes everything)
+#   include_classes / exclude_classes: names from EXTENSION_CLASSES
+#   max_bytes_per_run: stop selecting once this many bytes are picked (0: no limit)
+# A POLICY_FILE (JSON object with the same keys) overrides the rules for its
+# directory and everything below; {"exclude": ["*"]} opts a subtree out.
+SELECTION_POLICY = {
+    'age_field': 'atime',
+}
+POLICY_FILE = ".coldcompress.json"
+
+EXTENSION_CLASSES = {
+    'text': ['.txt', '.log', '.csv', '.tsv', '.json', '.xml', '.md', '.sql', '.html', '.yaml', '.yml'],
+    'documents': ['.pdf', '.doc', '.xls', '.ppt', '.rtf', '.odt'],
+    'images': ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic'],
+    'media': ['.mp3', '.mp4', '.mkv', '.avi', '.mov', '.flac', '.aac', '.ogg'],
+    'archives': ['.zip', '.gz', '.bz2', '.xz', '.7z', '.rar', '.zst', '.tgz'],
+    'office': ['.docx', '.xlsx', '.pptx', '.odp', '.ods'],
+}
+
+# UI refresh: worker updates are queued and applied on the Tk main loop in batches
+UI_REFRESH_MS = 100
+LOG_BUFFER_SIZE = 1000  # Log lines queued between refreshes; older ones are dropped
+LOG_MAX_LINES = 5000  # Lines kept in the log widget
+
+# Window over which the throughput shown in progress reports is averaged (seconds)
+PROGRESS_RATE_WINDOW = 10.0
+
+# How often the GUI and CLI refresh byte-level progress (milliseconds)
+PROGRESS_REFRESH_MS = 500
+
+# Crash safety: outputs are written to a temporary file, fsync'ed and renamed into place
+FSYNC_WRITES = True
+TEMP_SUFFIX = ".cctmp"
+JOURNAL_DIR = CACHE_DIR / 'journal'
+USE_JOURNAL = True
+
+# Shared dictionaries for folders of many small, similar files
+USE_DICTIONARIES = False
+DICTIONARY_MAX_FILE_SIZE = 64 * 1024  # Only files up to this size use a dictionary
+DICTIONARY_SIZE = 32 * 1024  # zlib only looks back 32 KiB, so larger dictionaries are wasted
+DICTIONARY_MIN_SAMPLES = 8  # Directories with fewer small files get no dictionary
+DICTIONARY_SAMPLE_FILES = 256
+DICTIONARY_PREFIX = ".coldcompress-"
+DICTIONARY_EXTENSION = ".dict"
+DICTIONARY_GC_MIN_AGE = 300  # Seconds a dictionary must go unused before garbage collection may delete it
+# Codecs able to use a dictionary, in order of preference
+DICTIONARY_CODECS = [('zstd', 3), ('zlib', 9)]
+
+# Pack mode: small cold files in a directory are bundled into one archive
+USE_PACKS = False
+PACK_NAME = ".coldcompress-pack" + COMPRESSED_EXTENSION
+PACK_MAX_FILE_SIZE = 1024 * 1024  # Larger files are compressed individually
+PACK_MIN_FILES = 2  # Directories with fewer small candidates are not packed
+
+# Content-hash deduplication of identical cold files
+USE_DEDUP = False
+DEDUP_MIN_SIZE = 4 * 1024  # Smaller duplicates are not worth a hash and a link
+DEDUP_PREFIX_BYTES = 64 * 1024  # Same-size files are compared by this prefix before a full hash
+DEDUP_HASH_WORKERS = 4
+DEDUP_STORE_NAME = ".coldcompress-store"
+
+# Read-through cache serving compressed files without unpacking them in place
+READ_CACHE_DIR = CACHE_DIR / 'read_cache'
+READ_CACHE_DISK_BYTES = 2 * 1024 ** 3  # Least recently read files are evicted beyond this
+READ_CACHE_MEMORY_BYTES = 64 * 1024 * 1024
+READ_CACHE_MEMORY_MAX_FILE = 4 * 1024 * 1024  # Larger files are only cached on disk
+SERVE_HOST = '127.0.0.1'
+SERVE_PORT = 8750
+
+# Run metrics: stage timers, counters and per-file latency, written after every run
+METRICS_ENABLED = True
+METRICS_DIR = CACHE_DIR / 'metrics'
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # Seconds
+PROFILE_CPU = False  # cProfile each file operation (adds overhead)
+PROFILE_MEMORY = False  # Trace allocations with tracemalloc (adds overhead)
+PROFILE_TOP_ENTRIES = 30  # Functions and allocation sites listed in profile reports
@@ -3,13 +3,17 @@ from tkinter import ttk
 
 
 class ActionButtonsWidget(ttk.Frame):
-    """Widget containing the main action buttons for compress/decompress operations."""
+    """Widget containing the action buttons for compress/decompress/verify and the running job."""
 
-    def __init__(self, parent, compress_callback, decompress_callback):
+    def __init__(self, parent, compress_callback, decompress_callback, verify_callback,
+                 pause_callback, cancel_callback):
         super().__init__(parent)
 
         self.compress_callback = compress_callback
         self.decompress_callback = decompress_callback
+        self.verify_callback = verify_callback
+        self.pause_callback = pause_callback
+        self.cancel_callback = cancel_callback
 
         self._create_widgets()
 
@@ -29,10 +33,44 @@ class ActionButtonsWidget(ttk.Frame):
             command=self.decompress_callback,
             style='Action.TButton'
         )
-        self.decompress_btn.pack(side=tk.LEFT, padx=(10, 0), fill=tk.X, expand=True)
+        self.decompress_btn.pack(side=tk.LEFT, padx=10, fill=tk.X, expand=True)
+
+        self.verify_btn = ttk.Button(
+            self,
+            text="🩺 Verify .zz Files",
+            command=self.verify_callback,
+            style='Action.TButton'
+        )
+        self.verify_btn.pack(side=tk.LEFT, padx=10, fill=tk.X, expand=True)
+
+        self.pause_btn = ttk.Button(
+            self,
+            text="⏸️ Pause",
+            command=self.pause_callback,
+            state=tk.DISABLED
+        )
+        self.pause_btn.pack(side=tk.LEFT, padx=10)
+
+        self.cancel_btn = ttk.Button(
+            self,
+            text="⏹️ Cancel",
+            command=self.cancel_callback,
+            state=tk.DISABLED
+        )
+        self.cancel_btn.pack(side=tk.LEFT, padx=(10, 0))
 
     def set_buttons_enabled(self, enabled: bool):
-        """Enable or disable both action buttons."""
+        """Enable or disable all action buttons."""
         state = tk.NORMAL if enabled else tk.DISABLED
         self.compress_btn.configure(state=state)
         self.decompress_btn.configure(state=state)
+        self.verify_btn.configure(state=state)
+
+        # Job controls are only live while an operation runs
+        job_state = tk.DISABLED if enabled else tk.NORMAL
+        self.pause_btn.configure(state=job_state, text="⏸️ Pause")
+        self.cancel_btn.configure(state=job_state)
+
+    def set_paused(self, paused: bool):
+        """Show whether the running job is paused."""
+        self.pause_btn.configure(text="▶️ Resume" if paused else "⏸️ Pause")
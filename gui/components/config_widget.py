@@ -4,13 +4,18 @@ from config import STYLES
 
 
 class ConfigWidget(ttk.LabelFrame):
-    """Widget for configuration settings (folder and threshold)."""
+    """Widget for configuration settings (folder, threshold, worker count, throttling and profiling)."""
 
-    def __init__(self, parent, folder_path_var, threshold_var):
+    def __init__(self, parent, folder_path_var, threshold_var, workers_var,
+                 bandwidth_var, low_priority_var, profile_var):
         super().__init__(parent, text="Configuration", padding="15")
 
         self.folder_path_var = folder_path_var
         self.threshold_var = threshold_var
+        self.workers_var = workers_var
+        self.bandwidth_var = bandwidth_var
+        self.low_priority_var = low_priority_var
+        self.profile_var = profile_var
 
         self._create_widgets()
 
@@ -22,6 +27,12 @@ class ConfigWidget(ttk.LabelFrame):
         # Threshold setting section
         self._create_threshold_setting()
 
+        # Worker count section
+        self._create_workers_setting()
+
+        # Throttling section
+        self._create_throttle_setting()
+
     def _create_folder_selection(self):
         """Create folder selection widgets."""
         folder_frame = ttk.Frame(self)
@@ -65,6 +76,56 @@ class ConfigWidget(ttk.LabelFrame):
 
         ttk.Label(threshold_frame, text="days").pack(side=tk.LEFT)
 
+    def _create_workers_setting(self):
+        """Create worker count widgets."""
+        workers_frame = ttk.Frame(self)
+        workers_frame.pack(fill=tk.X, pady=(10, 0))
+
+        ttk.Label(workers_frame, text="Parallel workers:",
+                  style='Heading.TLabel').pack(side=tk.LEFT)
+
+        workers_spinbox = ttk.Spinbox(
+            workers_frame,
+            from_=1,
+            to=64,
+            textvariable=self.workers_var,
+            width=5,
+            font=STYLES['entry']['font']
+        )
+        workers_spinbox.pack(side=tk.LEFT, padx=(10, 5))
+
+    def _create_throttle_setting(self):
+        """Create bandwidth limit and low-priority widgets."""
+        throttle_frame = ttk.Frame(self)
+        throttle_frame.pack(fill=tk.X, pady=(10, 0))
+
+        ttk.Label(throttle_frame, text="Bandwidth limit:",
+                  style='Heading.TLabel').pack(side=tk.LEFT)
+
+        bandwidth_spinbox = ttk.Spinbox(
+            throttle_frame,
+            from_=0,
+            to=10000,
+            textvariable=self.bandwidth_var,
+            width=6,
+            font=STYLES['entry']['font']
+        )
+        bandwidth_spinbox.pack(side=tk.LEFT, padx=(10, 5))
+
+        ttk.Label(throttle_frame, text="MB/s (0 = unlimited)").pack(side=tk.LEFT)
+
+        ttk.Checkbutton(
+            throttle_frame,
+            text="Low priority",
+            variable=self.low_priority_var
+        ).pack(side=tk.LEFT, padx=(20, 0))
+
+        ttk.Checkbutton(
+            throttle_frame,
+            text="Profile run",
+            variable=self.profile_var
+        ).pack(side=tk.LEFT, padx=(20, 0))
+
     def _choose_folder(self):
         """Open folder selection dialog."""
         folder = filedialog.askdirectory(title="Select folder to process")
@@ -1,7 +1,8 @@
 import time
 import tkinter as tk
 from tkinter import ttk
-from config import STYLES, LOG_COLORS
+from typing import List, Tuple
+from config import STYLES, LOG_COLORS, LOG_MAX_LINES
 
 
 class LogWidget(ttk.LabelFrame):
@@ -27,6 +28,8 @@ class LogWidget(ttk.LabelFrame):
             fg=STYLES['log']['fg'],
             height=STYLES['log']['height']
         )
+        for level, color in LOG_COLORS.items():
+            self.log_area.tag_config(level, foreground=color)
 
         # Scrollbar
         scrollbar = ttk.Scrollbar(log_container, orient=tk.VERTICAL, command=self.log_area.yview)
@@ -47,27 +50,39 @@ class LogWidget(ttk.LabelFrame):
         """
         Add a message to the log with timestamp and color coding.
 
+        Must be called from the Tk main thread; worker threads go through UIEventQueue.
+
         Args:
             message: The message to log
             level: Log level (INFO, SUCCESS, ERROR, WARNING)
         """
-        timestamp = time.strftime("%H:%M:%S")
-        formatted_message = f"[{timestamp}] {message}\n"
+        self.append_lines([(time.strftime("%H:%M:%S"), message, level)])
 
-        self.log_area.insert(tk.END, formatted_message)
+    def append_lines(self, lines: List[Tuple[str, str, str]], dropped: int = 0):
+        """
+        Insert a batch of (timestamp, message, level) lines with a single widget update.
 
-        # Apply color to the last line
-        line_start = self.log_area.index("end-2c linestart")
-        line_end = self.log_area.index("end-2c")
-        self.log_area.tag_add(level, line_start, line_end)
-        self.log_area.tag_config(level, foreground=LOG_COLORS.get(level, "black"))
+        Args:
+            lines: Log lines in order
+            dropped: Number of older lines discarded before this batch was drained
+        """
+        chunks = []
+        if dropped:
+            chunks.extend((f"[{time.strftime('%H:%M:%S')}] "
+                           f"⚠️ {dropped} log messages dropped to keep the UI responsive\n",
+                           "WARNING"))
+        for timestamp, message, level in lines:
+            chunks.extend((f"[{timestamp}] {message}\n", level))
+        self.log_area.insert(tk.END, *chunks)
+
+        # Keep the widget bounded
+        line_count = int(self.log_area.index("end-1c").split(".")[0])
+        if line_count > LOG_MAX_LINES:
+            self.log_area.delete("1.0", f"{line_count - LOG_MAX_LINES + 1}.0")
 
         # Auto-scroll to the bottom
         self.log_area.see(tk.END)
 
-        # Update the display
-        self.update_idletasks()
-
     def clear_log(self):
         """Clear all messages from the log area."""
         self.log_area.delete(1.0, tk.END)
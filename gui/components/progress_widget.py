@@ -1,5 +1,6 @@
 import tkinter as tk
 from tkinter import ttk
+from services.progress import ProgressSnapshot, format_progress
 
 
 class ProgressWidget(ttk.LabelFrame):
@@ -18,9 +19,13 @@ class ProgressWidget(ttk.LabelFrame):
         self.progress_label.pack(anchor=tk.W)
 
         # Progress bar
-        self.progress_bar = ttk.Progressbar(self, mode='indeterminate')
+        self.progress_bar = ttk.Progressbar(self, mode='determinate', maximum=100)
         self.progress_bar.pack(fill=tk.X, pady=(5, 0))
 
+        # Throughput and ETA label
+        self.throughput_var = tk.StringVar(value="")
+        ttk.Label(self, textvariable=self.throughput_var).pack(anchor=tk.W, pady=(5, 0))
+
         # Statistics frame
         stats_frame = ttk.Frame(self)
         stats_frame.pack(fill=tk.X, pady=(10, 0))
@@ -32,12 +37,18 @@ class ProgressWidget(ttk.LabelFrame):
         ttk.Label(stats_frame, textvariable=self.space_saved_var).pack(side=tk.RIGHT)
 
     def start_progress(self):
-        """Start the progress bar animation."""
-        self.progress_bar.start()
+        """Reset the progress bar for a new operation."""
+        self.progress_bar.configure(value=0)
+        self.throughput_var.set("")
 
     def stop_progress(self):
-        """Stop the progress bar animation."""
-        self.progress_bar.stop()
+        """Clear the throughput display once an operation ends."""
+        self.throughput_var.set("")
+
+    def update_progress(self, snapshot: ProgressSnapshot):
+        """Show byte-level percent, throughput and ETA."""
+        self.progress_bar.configure(value=snapshot.percent)
+        self.throughput_var.set(format_progress(snapshot))
 
     def set_status(self, status: str):
         """Update the progress status text."""
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import UI_REFRESH_MS, LOG_BUFFER_SIZE
+
+
+class UIEventQueue:
+    """
+    Thread-safe queue of UI updates, drained on the Tk main loop.
+
+    Worker threads never touch widgets. They queue log lines into a bounded ring
+    buffer (the oldest lines are dropped and counted when it overflows), post
+    coalesced updates where only the latest value matters, and queue one-off
+    calls. A root.after timer applies everything in one batch per refresh, so
+    the UI cost per frame stays constant however fast the workers run.
+
+    on_drain, if given, is called with the seconds each batch took to apply.
+    """
+
+    def __init__(self, root, log_widget, interval_ms: int = UI_REFRESH_MS,
+                 log_buffer_size: int = LOG_BUFFER_SIZE,
+                 on_drain: Optional[Callable[[float], None]] = None):
+        self.root = root
+        self.log_widget = log_widget
+        self.interval_ms = interval_ms
+        self.on_drain = on_drain
+
+        self._lock = threading.Lock()
+        self._log_lines: deque = deque(maxlen=log_buffer_size)
+        self._dropped = 0
+        self._latest: Dict[str, Tuple[Callable, tuple]] = {}
+        self._calls: List[Tuple[Callable, tuple]] = []
+
+        self.root.after(self.interval_ms, self._drain)
+
+    def log(self, message: str, level: str = "INFO"):
+        """Queue a log line; safe to call from any thread."""
+        entry = (time.strftime("%H:%M:%S"), message, level)
+        with self._lock:
+            if len(self._log_lines) == self._log_lines.maxlen:
+                self._dropped += 1
+            self._log_lines.append(entry)
+
+    def post_latest(self, key: str, func: Callable, *args: Any):
+        """Queue an update that replaces any pending update with the same key."""
+        with self._lock:
+            self._latest[key] = (func, args)
+
+    def call(self, func: Callable, *args: Any):
+        """Queue a call to run on the main loop after the pending log lines."""
+        with self._lock:
+            self._calls.append((func, args))
+
+    def _drain(self):
+        """Apply all queued updates in one batch and schedule the next drain."""
+        with self._lock:
+            lines = list(self._log_lines)
+            self._log_lines.clear()
+            dropped, self._dropped = self._dropped, 0
+            latest = list(self._latest.values())
+            self._latest.clear()
+            calls, self._calls = self._calls, []
+
+        start = time.perf_counter()
+        try:
+            if lines or dropped:
+                self.log_widget.append_lines(lines, dropped)
+            for func, args in latest:
+                func(*args)
+            for func, args in calls:
+                func(*args)
+        finally:
+            if self.on_drain is not None:
+                self.on_drain(time.perf_counter() - start)
+            self.root.after(self.interval_ms, self._drain)
@@ -4,8 +4,14 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from pathlib import Path
 
-from config import WINDOW_CONFIG, STYLES, THRESHOLD_DAYS
+from config import (
+    WINDOW_CONFIG, STYLES, THRESHOLD_DAYS, MAX_WORKERS, PROGRESS_REFRESH_MS,
+    JOB_BANDWIDTH_LIMIT, JOB_LOW_PRIORITY, PROFILE_CPU
+)
 from services.compression_service import CompressionService
+from services.job_control import JobController
+from services.pipeline import CompressionPipeline, RunSummary
+from gui.event_queue import UIEventQueue
 from gui.components.log_widget import LogWidget
 from gui.components.progress_widget import ProgressWidget
 from gui.components.config_widget import ConfigWidget
@@ -26,6 +32,14 @@ class ColdCompressGUI:
         # Initialize variables
         self.folder_path = tk.StringVar()
         self.threshold_days = tk.IntVar(value=THRESHOLD_DAYS)
+        self.max_workers = tk.IntVar(value=MAX_WORKERS)
+        self.bandwidth_limit = tk.DoubleVar(value=JOB_BANDWIDTH_LIMIT)
+        self.low_priority = tk.BooleanVar(value=JOB_LOW_PRIORITY)
+        self.profile = tk.BooleanVar(value=PROFILE_CPU)
+
+        # State of the running operation
+        self.pipeline = CompressionPipeline(self.compression_service)
+        self.operation_running = False
 
         # Create UI components
         self._create_widgets()
@@ -64,14 +78,20 @@ class ColdCompressGUI:
         title_label.pack(pady=(0, 20))
 
         # Configuration widget
-        self.config_widget = ConfigWidget(main_frame, self.folder_path, self.threshold_days)
+        self.config_widget = ConfigWidget(
+            main_frame, self.folder_path, self.threshold_days, self.max_workers,
+            self.bandwidth_limit, self.low_priority, self.profile
+        )
         self.config_widget.pack(fill=tk.X, pady=(0, 20))
 
         # Action buttons widget
         self.action_widget = ActionButtonsWidget(
             main_frame,
             self.start_compression_thread,
-            self.start_decompression_thread
+            self.start_decompression_thread,
+            self.start_verification_thread,
+            self.toggle_pause,
+            self.cancel_operation
         )
         self.action_widget.pack(fill=tk.X, pady=(0, 20))
 
@@ -83,6 +103,9 @@ class ColdCompressGUI:
         self.log_widget = LogWidget(main_frame)
         self.log_widget.pack(fill=tk.BOTH, expand=True)
 
+        # Worker threads report to the UI through this queue
+        self.ui_events = UIEventQueue(self.root, self.log_widget, on_drain=self._record_ui_time)
+
         # Initialize log
         self.log_widget.log_message("🚀 ColdCompress initialized. Select a folder to begin.", "INFO")
 
@@ -104,104 +127,214 @@ class ColdCompressGUI:
         thread = threading.Thread(target=self._decompression_worker, daemon=True)
         thread.start()
 
+    def start_verification_thread(self):
+        """Start verification in a separate thread."""
+        if not self._validate_folder():
+            return
+
+        self._start_operation("verification")
+        thread = threading.Thread(target=self._verification_worker, daemon=True)
+        thread.start()
+
     def _start_operation(self, operation_type: str):
         """Common setup for starting an operation."""
+        controller = JobController(
+            bandwidth_limit=self.bandwidth_limit.get(), low_priority=self.low_priority.get()
+        )
+        profile = self.profile.get()
+        self.pipeline = CompressionPipeline(
+            self.compression_service, max_workers=self.max_workers.get(), controller=controller,
+            profile_cpu=profile, profile_memory=profile
+        )
+        self.operation_running = True
         self.action_widget.set_buttons_enabled(False)
         self.progress_widget.start_progress()
         self.progress_widget.set_status(f"Starting {operation_type}...")
+        self.root.after(PROGRESS_REFRESH_MS, self._poll_progress)
+
+    def toggle_pause(self):
+        """Pause the running operation between chunks, or resume it."""
+        controller = self.pipeline.controller
+        if controller.paused:
+            controller.resume()
+            self.log_widget.log_message("▶️ Resumed", "INFO")
+        else:
+            controller.pause()
+            self.log_widget.log_message("⏸️ Paused; files in progress stop at their next chunk", "INFO")
+        self.action_widget.set_paused(controller.paused)
+
+    def cancel_operation(self):
+        """Stop the running operation; files in progress are rolled back."""
+        self.pipeline.controller.cancel()
+        self.action_widget.set_paused(False)
+        self.progress_widget.set_status("Cancelling...")
+        self.log_widget.log_message("⏹️ Cancelling; files in progress are left untouched", "WARNING")
+
+    def _record_ui_time(self, seconds: float):
+        """Charge time spent applying UI updates to the running operation's metrics."""
+        if self.operation_running:
+            self.pipeline.metrics.add_stage("ui", seconds)
+
+    def _poll_progress(self):
+        """Refresh byte-level progress while an operation runs."""
+        if not self.operation_running:
+            return
+        self.progress_widget.update_progress(self.pipeline.progress.snapshot())
+        self.root.after(PROGRESS_REFRESH_MS, self._poll_progress)
 
     def _compression_worker(self):
         """Worker thread for compression operations."""
         try:
             self._scan_and_compress()
         except Exception as e:
-            self.log_widget.log_message(f"❌ Compression failed: {e}", "ERROR")
+            self.ui_events.log(f"❌ Compression failed: {e}", "ERROR")
         finally:
-            self.root.after(0, self._reset_ui)
+            self.ui_events.call(self._reset_ui)
 
     def _decompression_worker(self):
         """Worker thread for decompression operations."""
         try:
             self._scan_and_decompress()
         except Exception as e:
-            self.log_widget.log_message(f"❌ Decompression failed: {e}", "ERROR")
+            self.ui_events.log(f"❌ Decompression failed: {e}", "ERROR")
         finally:
-            self.root.after(0, self._reset_ui)
+            self.ui_events.call(self._reset_ui)
+
+    def _verification_worker(self):
+        """Worker thread for verification operations."""
+        try:
+            self._scan_and_verify()
+        except Exception as e:
+            self.ui_events.log(f"❌ Verification failed: {e}", "ERROR")
+        finally:
+            self.ui_events.call(self._reset_ui)
 
     def _scan_and_compress(self):
         """Scan folder and compress old files."""
         folder = Path(self.folder_path.get())
         threshold_days = self.threshold_days.get()
 
-        self.log_widget.log_message(
+        self.ui_events.log(
             f"🔍 Scanning {folder} recursively for files older than {threshold_days} days...",
             "INFO"
         )
 
-        # Find old files
-        old_files = self.compression_service.find_old_files(folder, threshold_days)
+        # Compress candidates as the scan finds them
+        summary = self.pipeline.compress(folder, threshold_days, on_result=self._on_result)
+        self._log_recovered(summary)
+        self._log_metrics(summary)
+        if self._log_cancelled(summary):
+            return
 
-        if not old_files:
-            self.log_widget.log_message("⚠️ No files found to process", "WARNING")
+        self.ui_events.log(
+            f"📊 Scanned {summary.scanned_files} files, "
+            f"{summary.candidate_files} older than {threshold_days} days",
+            "INFO"
+        )
+        if not summary.files_processed:
+            self.ui_events.log("⚠️ No files found to process", "WARNING")
             return
 
-        self.log_widget.log_message(f"📊 Found {len(old_files)} files to compress", "INFO")
+        # Final summary
+        space_saved_mb = summary.space_saved / (1024 * 1024)
+        self.ui_events.log(f"✨ Compression completed!", "SUCCESS")
+        self.ui_events.log(f"📈 Files compressed: {summary.files_succeeded}", "INFO")
+        self.ui_events.log(f"💾 Total space saved: {space_saved_mb:.2f} MB", "SUCCESS")
+        if summary.files_skipped:
+            self.ui_events.log(
+                f"⏭️ Skipped {summary.files_skipped} incompressible files "
+                f"({summary.skipped_bytes / (1024 * 1024):.2f} MB, "
+                f"~{summary.cpu_saved:.1f}s CPU saved)",
+                "INFO"
+            )
+
+        self.ui_events.post_latest(
+            "stats", self.progress_widget.update_stats, summary.files_succeeded, space_saved_mb
+        )
 
-        # Compress files
-        total_space_saved = 0
-        files_compressed = 0
+    def _scan_and_decompress(self):
+        """Scan folder and decompress .zz files."""
+        folder = Path(self.folder_path.get())
 
-        for i, filepath in enumerate(old_files, 1):
-            progress_text = f"Processing {i}/{len(old_files)}: {filepath.name}"
-            self.progress_widget.set_status(progress_text)
+        self.ui_events.log(f"🔍 Scanning {folder} recursively for .zz files...", "INFO")
 
-            result = self.compression_service.compress_file(filepath)
-            if result['success']:
-                files_compressed += 1
-                total_space_saved += result['space_saved']
-                self.log_widget.log_message(result['message'], "SUCCESS")
-            else:
-                self.log_widget.log_message(result['message'], "ERROR")
+        # Decompress .zz files as the scan finds them
+        summary = self.pipeline.decompress(folder, on_result=self._on_result)
+        self._log_recovered(summary)
+        self._log_metrics(summary)
+        if self._log_cancelled(summary):
+            return
 
-        # Final summary
-        space_saved_mb = total_space_saved / (1024 * 1024)
-        self.log_widget.log_message(f"✨ Compression completed!", "SUCCESS")
-        self.log_widget.log_message(f"📈 Files compressed: {files_compressed}", "INFO")
-        self.log_widget.log_message(f"💾 Total space saved: {space_saved_mb:.2f} MB", "SUCCESS")
+        if not summary.files_processed:
+            self.ui_events.log("ℹ️ No .zz compressed files found", "INFO")
+            return
 
-        self.progress_widget.update_stats(files_compressed, space_saved_mb)
+        self.ui_events.log(
+            f"✨ Decompression completed! {summary.files_succeeded} files decompressed",
+            "SUCCESS"
+        )
+        self.ui_events.post_latest(
+            "stats", self.progress_widget.update_stats, summary.files_succeeded, 0
+        )
 
-    def _scan_and_decompress(self):
-        """Scan folder and decompress .zz files."""
+    def _scan_and_verify(self):
+        """Scan folder and check every .zz file without writing anything."""
         folder = Path(self.folder_path.get())
 
-        self.log_widget.log_message(f"🔍 Scanning {folder} recursively for .zz files...", "INFO")
+        self.ui_events.log(f"🔍 Scanning {folder} recursively for .zz files to verify...", "INFO")
 
-        # Find compressed files
-        compressed_files = self.compression_service.find_compressed_files(folder)
+        summary = self.pipeline.verify(folder, on_result=self._on_result)
+        self._log_metrics(summary)
+        if self._log_cancelled(summary):
+            return
 
-        if not compressed_files:
-            self.log_widget.log_message("ℹ️ No .zz compressed files found", "INFO")
+        if not summary.files_processed:
+            self.ui_events.log("ℹ️ No .zz compressed files found", "INFO")
             return
 
-        # Decompress files
-        files_decompressed = 0
-        for i, filepath in enumerate(compressed_files, 1):
-            progress_text = f"Processing {i}/{len(compressed_files)}: {filepath.name}"
-            self.progress_widget.set_status(progress_text)
-
-            result = self.compression_service.decompress_file(filepath)
-            if result['success']:
-                files_decompressed += 1
-                self.log_widget.log_message(result['message'], "SUCCESS")
-            else:
-                self.log_widget.log_message(result['message'], "ERROR")
-
-        self.log_widget.log_message(
-            f"✨ Decompression completed! {files_decompressed} files decompressed",
-            "SUCCESS"
+        level = "ERROR" if summary.files_failed else "SUCCESS"
+        self.ui_events.log(
+            f"🩺 Verification completed! {summary.files_succeeded} intact, "
+            f"{summary.files_failed} corrupt",
+            level
+        )
+
+    def _log_cancelled(self, summary: RunSummary) -> bool:
+        """Report a cancelled run; returns True if it was cancelled."""
+        if summary.cancelled:
+            self.ui_events.log(
+                f"⏹️ Cancelled after {summary.files_succeeded} files "
+                f"({summary.files_cancelled} stopped before finishing)",
+                "WARNING"
+            )
+        return summary.cancelled
+
+    def _log_metrics(self, summary: RunSummary):
+        """Report where the run spent its time and where its metrics were written."""
+        stages = self.pipeline.metrics.to_dict()['stages']
+        if stages:
+            busiest = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in list(stages.items())[:5])
+            self.ui_events.log(f"⏱️ Time by stage: {busiest}", "INFO")
+        for path in summary.metrics_files:
+            self.ui_events.log(f"📊 Metrics written to {path}", "INFO")
+
+    def _log_recovered(self, summary: RunSummary):
+        """Report operations a previous crash left behind and this run settled."""
+        for message in summary.recovered:
+            self.ui_events.log(message, "ERROR" if message.startswith("❌") else "WARNING")
+
+    def _on_result(self, result, summary: RunSummary):
+        """Log a per-file result and update the progress status."""
+        self.ui_events.post_latest(
+            "status", self.progress_widget.set_status, f"Processed {summary.files_processed} files"
         )
-        self.progress_widget.update_stats(files_decompressed, 0)
+
+        if result.get('skipped') or result.get('cancelled'):
+            self.ui_events.log(result['message'], "INFO")
+        elif result['success']:
+            self.ui_events.log(result['message'], "SUCCESS")
+        else:
+            self.ui_events.log(result['message'], "ERROR")
 
     def _validate_folder(self) -> bool:
         """Validate the selected folder."""
@@ -213,6 +346,7 @@ class ColdCompressGUI:
 
     def _reset_ui(self):
         """Reset UI after operation completes."""
+        self.operation_running = False
         self.progress_widget.stop_progress()
         self.progress_widget.set_status("Ready")
         self.action_widget.set_buttons_enabled(True)
@@ -1,3 +1,4 @@
+import multiprocessing
 import tkinter as tk
 from gui.main_window import ColdCompressGUI
 
@@ -10,5 +11,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Required for the worker process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
 
@@ -0,0 +1,320 @@
+"""
+Headless benchmark harness for CompressionService.
+
+Generates synthetic corpora, compresses and decompresses them under every
+combination of codec, level, block size and worker count, and reports
+throughput, compression ratio, peak RSS and wall time as JSON or CSV.
+
+Run with: python -m services.benchmark --help
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from config import COMPRESSED_EXTENSION
+from services.codec_policy import CodecPolicy
+from services.codecs import available_codecs
+from services.compression_service import CompressionService
+from services.parallel_executor import ParallelExecutor
+
+CORPORA = ('text', 'logs', 'random', 'mixed')
+LAYOUTS = ('small', 'large')
+
+_WORDS = ("cold storage file archive compress block index server data report user "
+          "request error warning info debug value total count system disk").split()
+_LEVELS = ("INFO", "INFO", "INFO", "DEBUG", "WARNING", "ERROR")
+
+
+def _text_chunk(rng: random.Random, size: int) -> bytes:
+    """Generate prose-like text."""
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words).encode()[:size]
+
+
+def _log_chunk(rng: random.Random, size: int) -> bytes:
+    """Generate timestamped log lines."""
+    lines = []
+    length = 0
+    timestamp = 1_700_000_000
+    while length < size:
+        timestamp += rng.randint(0, 5)
+        line = (f"{time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(timestamp))} "
+                f"{rng.choice(_LEVELS)} worker-{rng.randint(1, 16)} "
+                f"{' '.join(rng.choices(_WORDS, k=6))} id={rng.getrandbits(32):08x}\n")
+        lines.append(line)
+        length += len(line)
+    return "".join(lines).encode()[:size]
+
+
+def _random_chunk(rng: random.Random, size: int) -> bytes:
+    """Generate incompressible data."""
+    return rng.randbytes(size)
+
+
+def _mixed_chunk(rng: random.Random, size: int) -> bytes:
+    """Interleave text, log and random segments."""
+    generators = (_text_chunk, _log_chunk, _random_chunk)
+    parts = []
+    remaining = size
+    while remaining > 0:
+        part_size = min(remaining, rng.randint(4 * 1024, 256 * 1024))
+        parts.append(rng.choice(generators)(rng, part_size))
+        remaining -= part_size
+    return b"".join(parts)
+
+
+_GENERATORS = {
+    'text': _text_chunk,
+    'logs': _log_chunk,
+    'random': _random_chunk,
+    'mixed': _mixed_chunk,
+}
+
+
+def generate_corpus(target: Path, corpus: str, layout: str, total_bytes: int,
+                    seed: int = 0) -> None:
+    """
+    Write a deterministic synthetic corpus.
+
+    Args:
+        target: Directory to create the files in
+        corpus: One of CORPORA
+        layout: 'small' for many 2-20 KB files, 'large' for four big files
+        total_bytes: Approximate corpus size in bytes
+        seed: Random seed, so every configuration sees identical data
+    """
+    rng = random.Random(seed)
+    generator = _GENERATORS[corpus]
+    target.mkdir(parents=True, exist_ok=True)
+
+    written = 0
+    index = 0
+    while written < total_bytes:
+        if layout == 'small':
+            size = rng.randint(2 * 1024, 20 * 1024)
+        else:
+            size = total_bytes // 4
+        size = min(size, total_bytes - written)
+        subdir = target / f"dir{index // 1000:04d}"
+        subdir.mkdir(exist_ok=True)
+        (subdir / f"{corpus}_{index:06d}.dat").write_bytes(generator(rng, size))
+        written += size
+        index += 1
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process and its children, in MB."""
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return max(own, children) / scale
+
+
+def _list_files(folder: Path) -> List[Path]:
+    return sorted(path for path in folder.rglob('*') if path.is_file())
+
+
+def _run_configuration(source: str, work: str, codec: str, level: int, block_size: int,
+                       workers: int, probe: bool) -> Dict[str, Any]:
+    """Run one configuration; executes in a fresh process so peak RSS is per configuration."""
+    start = time.perf_counter()
+    shutil.copytree(source, work)
+    work_dir = Path(work)
+    files = _list_files(work_dir)
+    bytes_in = sum(path.stat().st_size for path in files)
+
+    service = CompressionService(block_size=block_size, use_scan_index=False,
+                                 probe_enabled=probe)
+    service.codec_policy = CodecPolicy(rules=[], default_codec=codec, default_level=level)
+    executor = ParallelExecutor(service, max_workers=workers)
+
+    compress_start = time.perf_counter()
+    results = list(executor.compress_files(files))
+    compress_seconds = time.perf_counter() - compress_start
+
+    compressed = [path for path in _list_files(work_dir) if path.name.endswith(COMPRESSED_EXTENSION)]
+    bytes_out = sum(path.stat().st_size for path in _list_files(work_dir))
+    compressed_input = bytes_in - sum(result.get('skipped_bytes', 0) for result in results)
+
+    decompress_start = time.perf_counter()
+    list(executor.decompress_files(compressed))
+    decompress_seconds = time.perf_counter() - decompress_start
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        'files': len(files),
+        'errors': sum(1 for result in results if not result['success']),
+        'skipped': sum(1 for result in results if result.get('skipped')),
+        'bytes_in': bytes_in,
+        'bytes_out': bytes_out,
+        'ratio': bytes_in / bytes_out if bytes_out else 0.0,
+        'compress_seconds': compress_seconds,
+        'compress_mb_s': compressed_input / (1024 * 1024) / compress_seconds if compress_seconds else 0.0,
+        'decompress_seconds': decompress_seconds,
+        'decompress_mb_s': compressed_input / (1024 * 1024) / decompress_seconds if decompress_seconds else 0.0,
+        'peak_rss_mb': _peak_rss_mb(),
+        'wall_seconds': time.perf_counter() - start,
+    }
+
+
+def check_parameters(corpora, layouts, codecs) -> None:
+    """
+    Reject unknown corpus kinds, layouts and codecs before any work starts.
+
+    Raises:
+        ValueError: If a name is unknown or its codec is not installed
+    """
+    for kind, names, known in (('corpus', corpora, CORPORA), ('layout', layouts, LAYOUTS),
+                               ('codec', codecs, available_codecs())):
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            raise ValueError(f"Unknown {kind}: {', '.join(unknown)} "
+                             f"(available: {', '.join(known)})")
+
+
+def run_benchmark(corpora=CORPORA, layouts=LAYOUTS, codecs=('zlib',), levels=(6,),
+                  block_sizes=(1024 * 1024,), workers=(1,), size_mb: float = 32,
+                  probe: bool = False, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Benchmark every combination of the given parameters.
+
+    Args:
+        corpora: Corpus kinds to generate
+        layouts: File layouts to generate
+        codecs: Codec names to test
+        levels: Compression levels to test with every codec
+        block_sizes: Container block sizes in bytes
+        workers: Worker counts for the parallel executor
+        size_mb: Size of each generated corpus in MB
+        probe: Keep the compressibility probe enabled
+        seed: Random seed for corpus generation
+
+    Returns:
+        Iterator of one result row per configuration
+
+    Raises:
+        ValueError: If a corpus, layout or codec is unknown, raised on the first
+            iteration before any corpus is generated
+    """
+    check_parameters(corpora, layouts, codecs)
+    scratch = Path(tempfile.mkdtemp(prefix='coldcompress-bench-'))
+    try:
+        for corpus, layout in itertools.product(corpora, layouts):
+            source = scratch / f"{corpus}-{layout}"
+            generate_corpus(source, corpus, layout, int(size_mb * 1024 * 1024), seed)
+
+            for codec, level, block_size, worker_count in itertools.product(
+                    codecs, levels, block_sizes, workers):
+                with ProcessPoolExecutor(max_workers=1) as isolated:
+                    metrics = isolated.submit(
+                        _run_configuration, str(source), str(scratch / 'work'),
+                        codec, level, block_size, worker_count, probe
+                    ).result()
+                yield {
+                    'corpus': corpus,
+                    'layout': layout,
+                    'codec': codec,
+                    'level': level,
+                    'block_size': block_size,
+                    'workers': worker_count,
+                    **metrics
+                }
+
+            shutil.rmtree(source, ignore_errors=True)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def format_results(rows: List[Dict[str, Any]], output_format: str) -> str:
+    """Render result rows as JSON or CSV."""
+    if output_format == 'json':
+        return json.dumps(rows, indent=2)
+    buffer = io.StringIO()
+    if rows:
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(',')]
+
+
+def _str_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the benchmark command."""
+    parser = argparse.ArgumentParser(description="Benchmark ColdCompress configurations.")
+    parser.add_argument('--corpora', type=_str_list, default=list(CORPORA),
+                        help="comma-separated corpus kinds (text,logs,random,mixed)")
+    parser.add_argument('--layouts', type=_str_list, default=list(LAYOUTS),
+                        help="comma-separated layouts (small,large)")
+    parser.add_argument('--codecs', type=_str_list, default=['zlib'],
+                        help="comma-separated codec names")
+    parser.add_argument('--levels', type=_int_list, default=[6],
+                        help="comma-separated compression levels")
+    parser.add_argument('--block-sizes', type=_int_list, default=[1024 * 1024],
+                        help="comma-separated container block sizes in bytes")
+    parser.add_argument('--workers', type=_int_list, default=[1],
+                        help="comma-separated worker counts")
+    parser.add_argument('--size-mb', type=float, default=32, help="size of each corpus in MB")
+    parser.add_argument('--probe', action='store_true', help="keep the compressibility probe enabled")
+    parser.add_argument('--seed', type=int, default=0, help="corpus random seed")
+    parser.add_argument('--format', choices=('json', 'csv'), default='json', dest='output_format')
+    parser.add_argument('--output', type=Path, help="write results to this file instead of stdout")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark from the command line."""
+    args = build_parser().parse_args(argv)
+    try:
+        check_parameters(args.corpora, args.layouts, args.codecs)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    rows = []
+    for row in run_benchmark(args.corpora, args.layouts, args.codecs, args.levels,
+                             args.block_sizes, args.workers, args.size_mb, args.probe, args.seed):
+        rows.append(row)
+        print(f"{row['corpus']}/{row['layout']} {row['codec']}-{row['level']} "
+              f"block={row['block_size']} workers={row['workers']}: "
+              f"{row['compress_mb_s']:.1f} MB/s, ratio {row['ratio']:.2f}", file=sys.stderr)
+
+    report = format_results(rows, args.output_format)
+    if args.output:
+        args.output.write_text(report)
+    else:
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import zlib
+from typing import Callable, Dict, List
+
+from config import CHECKSUM_ALGORITHM
+
+try:
+    import xxhash
+except ImportError:  # Optional dependency
+    xxhash = None
+
+
+class Checksum:
+    """Interface for incremental checksums recorded in the container footer."""
+
+    name = ""
+
+    def update(self, data: bytes) -> None:
+        """Feed the next piece of data."""
+        raise NotImplementedError
+
+    def hexdigest(self) -> str:
+        """Return the checksum of everything fed so far."""
+        raise NotImplementedError
+
+
+class Crc32Checksum(Checksum):
+    """CRC-32 via zlib; always available."""
+
+    name = "crc32"
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data: bytes) -> None:
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self) -> str:
+        return f"{self.value:08x}"
+
+
+class Xxh64Checksum(Checksum):
+    """XXH64 via the optional xxhash package; several times faster than CRC-32."""
+
+    name = "xxh64"
+
+    def __init__(self):
+        self._hash = xxhash.xxh64()
+
+    def update(self, data: bytes) -> None:
+        self._hash.update(data)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+_CHECKSUMS: Dict[str, Callable[[], Checksum]] = {}
+
+
+def register_checksum(factory: Callable[[], Checksum], name: str) -> None:
+    """Make a checksum available for writing and footer-based lookup."""
+    _CHECKSUMS[name] = factory
+
+
+def new_checksum(name: str) -> Checksum:
+    """
+    Create a fresh checksum by name.
+
+    Args:
+        name: Checksum name as recorded in the container footer
+
+    Returns:
+        New checksum instance
+    """
+    try:
+        return _CHECKSUMS[name]()
+    except KeyError:
+        raise ValueError(f"Checksum '{name}' is not available") from None
+
+
+def preferred_checksum() -> str:
+    """Return the checksum new containers record: CHECKSUM_ALGORITHM if available, else CRC-32."""
+    return CHECKSUM_ALGORITHM if CHECKSUM_ALGORITHM in _CHECKSUMS else Crc32Checksum.name
+
+
+def available_checksums() -> List[str]:
+    """Return the names of all registered checksums."""
+    return list(_CHECKSUMS)
+
+
+def is_available(name: str) -> bool:
+    """Return True if a checksum recorded in a footer can be computed here."""
+    return name in _CHECKSUMS
+
+
+register_checksum(Crc32Checksum, Crc32Checksum.name)
+if xxhash is not None:
+    register_checksum(Xxh64Checksum, Xxh64Checksum.name)
@@ -0,0 +1,47 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import CODEC_POLICY, DEFAULT_CODEC, COMPRESSION_LEVEL
+from services.codecs import Codec, available_codecs, get_codec
+
+
+class CodecPolicy:
+    """Chooses a codec and level for each file from an ordered list of rules."""
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None,
+                 default_codec: str = DEFAULT_CODEC, default_level: int = COMPRESSION_LEVEL):
+        """
+        Args:
+            rules: Rules with optional 'extensions', 'min_size' and 'max_size'
+                conditions and a 'codecs' list of (name, level) choices
+            default_codec: Codec used when no rule matches
+            default_level: Level used with the default codec
+        """
+        self.rules = CODEC_POLICY if rules is None else rules
+        self.default_codec = default_codec
+        self.default_level = default_level
+
+    def select(self, filepath: Path, size: int) -> Tuple[Codec, int]:
+        """
+        Pick the codec and level for a file.
+
+        Args:
+            filepath: File to be compressed
+            size: File size in bytes
+
+        Returns:
+            Tuple of (codec, level)
+        """
+        extension = filepath.suffix.lower()
+        available = available_codecs()
+        for rule in self.rules:
+            if 'extensions' in rule and extension not in rule['extensions']:
+                continue
+            if size < rule.get('min_size', 0):
+                continue
+            if 'max_size' in rule and size > rule['max_size']:
+                continue
+            for name, level in rule['codecs']:
+                if name in available:
+                    return get_codec(name), level
+        return get_codec(self.default_codec), self.default_level
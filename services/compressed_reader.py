@@ -0,0 +1,153 @@
+import bisect
+import io
+import os
+import zlib
+from pathlib import Path
+from typing import Optional
+
+from config import CHUNK_SIZE
+from services import container
+from services.codecs import get_codec
+
+
+class CompressedFileReader(io.RawIOBase):
+    """
+    Read-only, seekable file-like view of the original data inside a .zz file.
+
+    Block containers are served through their block index: a read inflates only
+    the blocks it touches, and the most recent block is kept for sequential reads.
+    Legacy headerless files are inflated sequentially; seeking backwards restarts
+    the stream from the beginning.
+    """
+
+    def __init__(self, filepath: Path, chunk_size: int = CHUNK_SIZE,
+                 load_dictionary: Optional[container.DictionaryLoader] = None):
+        super().__init__()
+        self.name = str(filepath)
+        self.chunk_size = chunk_size
+        self._file = open(filepath, "rb")
+        self._position = 0
+
+        # Decompressed piece currently held in memory
+        self._cache_start = 0
+        self._cache_data = b""
+
+        try:
+            is_container = container.is_container(self._file.read(len(container.MAGIC)))
+            self._file.seek(0)
+            if is_container:
+                self.header, self._blocks = container.read_index(self._file)
+                self._codec = get_codec(self.header.get('codec', 'zlib'))
+                self._dictionary = container.load_header_dictionary(self.header, load_dictionary)
+                self._block_starts = [entry.raw_offset for entry in self._blocks]
+                self._size: Optional[int] = sum(entry.raw_length for entry in self._blocks)
+            else:
+                self.header, self._blocks = {}, None
+                self._size = None
+                self._restart_legacy()
+        except Exception:
+            self._file.close()
+            raise
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+            self._cache_data = b""
+        super().close()
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_SET:
+            position = offset
+        elif whence == os.SEEK_CUR:
+            position = self._position + offset
+        elif whence == os.SEEK_END:
+            position = self.size() + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return position
+
+    def size(self) -> int:
+        """Return the uncompressed size, inflating legacy files to the end if needed."""
+        if self._size is None:
+            while self._load_legacy_piece(self._cache_start + len(self._cache_data)):
+                pass
+        return self._size
+
+    def readinto(self, buffer) -> int:
+        if not self._load(self._position):
+            return 0
+        offset = self._position - self._cache_start
+        count = min(len(buffer), len(self._cache_data) - offset)
+        buffer[:count] = self._cache_data[offset:offset + count]
+        self._position += count
+        return count
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return self.readall()
+        parts = []
+        while size > 0:
+            if not self._load(self._position):
+                break
+            offset = self._position - self._cache_start
+            part = self._cache_data[offset:offset + size]
+            parts.append(part)
+            self._position += len(part)
+            size -= len(part)
+        return b"".join(parts)
+
+    def _load(self, position: int) -> bool:
+        """Make the piece covering position current; return False at end of data."""
+        if self._cache_start <= position < self._cache_start + len(self._cache_data):
+            return True
+        if self._blocks is not None:
+            return self._load_block(position)
+
+        if position < self._cache_start:
+            self._restart_legacy()
+        while not (self._cache_start <= position < self._cache_start + len(self._cache_data)):
+            if not self._load_legacy_piece(self._cache_start + len(self._cache_data)):
+                return False
+        return True
+
+    def _load_block(self, position: int) -> bool:
+        """Inflate the single block that contains position."""
+        if position >= self._size:
+            return False
+        entry = self._blocks[bisect.bisect_right(self._block_starts, position) - 1]
+        self._cache_data = container.read_block(self._file, self._codec, entry, self._dictionary)
+        self._cache_start = entry.raw_offset
+        return True
+
+    def _restart_legacy(self):
+        """Rewind a legacy zlib stream to its first byte."""
+        self._file.seek(0)
+        self._decompressor = zlib.decompressobj()
+        self._cache_start = 0
+        self._cache_data = b""
+
+    def _load_legacy_piece(self, start: int) -> bool:
+        """Inflate the next piece of a legacy stream, which begins at start."""
+        while not self._decompressor.eof:
+            chunk = self._decompressor.unconsumed_tail or self._file.read(self.chunk_size)
+            data = self._decompressor.decompress(chunk, self.chunk_size)
+            if not chunk and not data:
+                raise zlib.error("Compressed data is incomplete or truncated")
+            if data:
+                self._cache_start = start
+                self._cache_data = data
+                return True
+        self._size = start
+        return False
@@ -1,133 +1,983 @@
+import mmap
 import os
-import time
+import shutil
+import sqlite3
+import stat
 import zlib
+from functools import partial
 from pathlib import Path
-from typing import Dict, Any, List, Tuple
-from config import COMPRESSED_EXTENSION
+from typing import Dict, Any, Callable, List, NamedTuple, Optional, Set, Tuple, BinaryIO
+from config import (
+    COMPRESSED_EXTENSION, COMPRESSION_LEVEL, CHUNK_SIZE, BLOCK_SIZE, BLOCK_WORKERS, USE_SCAN_INDEX,
+    PROBE_ENABLED, USE_JOURNAL, USE_DICTIONARIES, DICTIONARY_CODECS, USE_PACKS, PACK_NAME,
+    PACK_MAX_FILE_SIZE, PACK_MIN_FILES, USE_DEDUP, USE_MMAP, MMAP_MIN_SIZE
+)
+from services import container
+from services.checksums import new_checksum
+from services.container import ProgressCallback
+from services.codec_policy import CodecPolicy
+from services.compressed_reader import CompressedFileReader
+from services.codecs import Codec
+from services.dedup import DedupGroup, DedupStore, HashingReader, metadata_key, signature_of
+from services.dictionary import DictionaryStore, SharedDictionary
+from services.pack import PackArchive, PackMember, is_pack
+from services.journal import OperationJournal, atomic_write, link_atomically
+from services.metrics import StageTimings
+from services.probe import CompressibilityProbe, ProbeResult
+from services.scan_index import ScanIndex
+from services.scanner import DirectoryScanner
+from services.selection_policy import SelectionPolicy
+
+
+class CompressedStat(NamedTuple):
+    """Size and original metadata of a .zz file, read without inflating it."""
+    path: Path
+    physical_size: int  # Size of the .zz file on disk
+    logical_size: Optional[int]  # Size once decompressed; None for legacy streams
+    mtime: Optional[float]  # Original modification time, if recorded
+    atime: Optional[float]  # Original access time, if recorded
+    mode: Optional[int]  # Original permission bits, if recorded
+    codec: Optional[str]
+
+
+def _stat_metadata(file_stat: os.stat_result,
+                   scanned: Optional[os.stat_result] = None) -> Dict[str, Any]:
+    """
+    Return the parts of a stat result that decompression restores.
+
+    The atime comes from scanned, the stat the file was selected by, unless
+    the file was rewritten since: probing, hashing or sampling it before it
+    is compressed bumps its atime on relatime mounts.
+    """
+    unchanged = (scanned is not None and scanned.st_size == file_stat.st_size
+                 and scanned.st_mtime_ns == file_stat.st_mtime_ns)
+    return {
+        'mtime': file_stat.st_mtime,
+        'atime': scanned.st_atime if unchanged else file_stat.st_atime,
+        'mode': stat.S_IMODE(file_stat.st_mode)
+    }
+
+
+def _restore_metadata(path: str, metadata: Dict[str, Any]) -> None:
+    """Apply recorded timestamps and permission bits to a file."""
+    if metadata.get('mtime') is not None:
+        atime = metadata.get('atime')
+        os.utime(path, (metadata['mtime'] if atime is None else atime, metadata['mtime']))
+    if metadata.get('mode') is not None:
+        os.chmod(path, metadata['mode'])
 
 
 class CompressionService:
     """Service class for handling file compression and decompression operations."""
 
-    def __init__(self):
-        self.compression_level = 9  # Maximum compression
+    def __init__(self, chunk_size: int = CHUNK_SIZE, block_size: int = BLOCK_SIZE,
+                 block_workers: int = BLOCK_WORKERS, use_scan_index: bool = USE_SCAN_INDEX,
+                 probe_enabled: bool = PROBE_ENABLED, use_journal: bool = USE_JOURNAL,
+                 use_dictionaries: bool = USE_DICTIONARIES, use_packs: bool = USE_PACKS,
+                 use_dedup: bool = USE_DEDUP, selection_policy: Optional[SelectionPolicy] = None,
+                 allow_unverified: bool = False):
+        self.codec_policy = CodecPolicy(default_level=COMPRESSION_LEVEL)
+        self.chunk_size = chunk_size  # Streaming buffer size in bytes
+        self.block_size = block_size  # Container block size in bytes
+        self.block_workers = block_workers  # Block compression threads, shared by concurrent files
+        self.concurrent_files = 1  # Files processed at once; set by ParallelExecutor during a run
+        self.use_mmap = USE_MMAP  # Compress large files from a memory mapping
+        self.mmap_min_size = MMAP_MIN_SIZE
+        self.use_scan_index = use_scan_index  # Reuse unchanged directories between scans
+        self.selection_policy = selection_policy or SelectionPolicy()  # Which files are cold candidates
+        self.probe = CompressibilityProbe() if probe_enabled else None
+        self.journal = OperationJournal() if use_journal else None
+        self.use_dictionaries = use_dictionaries  # Compress small files against shared dictionaries
+        self.dictionary_codecs = CodecPolicy(rules=[{'codecs': DICTIONARY_CODECS}])
+        self.dictionaries = DictionaryStore()  # Always available, so dictionary .zz files decompress
+        self.use_packs = use_packs  # Bundle small files of a directory into one pack archive
+        self.pack_max_file_size = PACK_MAX_FILE_SIZE
+        self.pack_min_files = PACK_MIN_FILES
+        self.use_dedup = use_dedup  # Store identical files once and link the copies to it
+        # Replace .zz files whose checksum can't be computed here (xxh64 without xxhash) on the size check alone
+        self.allow_unverified = allow_unverified
+
+    @property
+    def compression_level(self) -> int:
+        """Level for the default codec; kept in the codec policy so both stay in step."""
+        return self.codec_policy.default_level
+
+    @compression_level.setter
+    def compression_level(self, level: int):
+        self.codec_policy.default_level = level
+
+    def _open_scan_index(self) -> Optional[ScanIndex]:
+        """Open the persistent scan index, or return None if it is disabled or unavailable."""
+        if not self.use_scan_index:
+            return None
+        try:
+            return ScanIndex()
+        except Exception:
+            # A missing or locked cache must never block a scan
+            return None
+
+    def _write_atomically(self, target: Path,
+                          write: Callable[[BinaryIO], Optional[Dict[str, Any]]]):
+        """
+        Write target through a temporary file that is renamed into place.
+
+        If write() returns stat metadata, it is applied before the rename,
+        so target never appears with fresh timestamps.
+        """
+        with atomic_write(target) as f:
+            metadata = write(f)
+            if metadata:
+                # Flush first so closing the file cannot bump the mtime again
+                f.flush()
+                _restore_metadata(f.name, metadata)
+
+    def _replace_file(self, operation: str, source: Path, target: Path,
+                      write: Callable[[BinaryIO], Optional[Dict[str, Any]]]):
+        """
+        Replace source with target crash-safely.
+
+        target is written atomically by write(), and the source is only removed
+        once target is durable. The journal entry lets recover_interrupted()
+        finish or roll back the swap if the process dies in between.
+        """
+        self._journaled_replace(operation, source, target,
+                                partial(self._write_atomically, target, write))
+
+    def _journaled_replace(self, operation: str, source: Path, target: Path,
+                           place: Callable[[], Any]):
+        """Run place() to put target durably in place, then remove source, under the journal."""
+        token = self.journal.begin(operation, source, target) if self.journal is not None else None
+        try:
+            place()
+            if token is not None:
+                self.journal.commit(token)
+            os.remove(source)
+        finally:
+            if token is not None:
+                self.journal.complete(token)
+
+    def recover_interrupted(self) -> List[str]:
+        """
+        Finish or roll back operations left behind by a crash or a killed run.
+
+        Returns:
+            Messages describing each recovered operation
+        """
+        if self.journal is None:
+            return []
+        return self.journal.recover(self._holds_original)
+
+    def _holds_original(self, compressed: Path, plain: Path) -> bool:
+        """Return True if a .zz container records exactly the size and checksum of a plain file."""
+        try:
+            with open(compressed, "rb") as source:
+                if not container.is_container(source.read(len(container.MAGIC))):
+                    return False
+                source.seek(0)
+                footer = container.read_metadata(source)['footer']
+            expected = footer.get('checksum')
+            if expected is None or footer.get('original_size') != plain.stat().st_size:
+                return False
+            digest = new_checksum(expected['algorithm'])
+            with open(plain, "rb") as f:
+                for chunk in iter(partial(f.read, self.chunk_size), b""):
+                    digest.update(chunk)
+            return digest.hexdigest() == expected['value']
+        except (OSError, ValueError):
+            return False
+
+    def _require_verified(self, header: Dict[str, Any]):
+        """Refuse to replace a .zz file whose checksum was skipped, unless allow_unverified is set."""
+        skipped = header.get('checksum_skipped')
+        if skipped and not self.allow_unverified:
+            raise ValueError(f"its {skipped} checksum can't be verified without the xxhash package; "
+                             f"install xxhash, or allow unverified decompression to rely on the size alone")
+
+    def _dictionary_loader(self, filepath: Path) -> container.DictionaryLoader:
+        """Resolve dictionary IDs in the header of a .zz file against its directory."""
+        return partial(self.dictionaries.load, filepath.parent)
+
+    def collect_dictionaries(self, folder: Path) -> int:
+        """
+        Delete shared dictionaries under folder that no .zz file refers to any more.
+
+        Args:
+            folder: Root folder to clean up
+
+        Returns:
+            Number of dictionaries removed
+        """
+        return self.dictionaries.collect_garbage(folder, self._referenced_dictionaries)
+
+    @staticmethod
+    def _referenced_dictionaries(directory: Path) -> Optional[Set[str]]:
+        """Return the dictionary IDs the .zz files of a directory use; None if one can't be read."""
+        referenced = set()
+        try:
+            for path in directory.glob(f"*{COMPRESSED_EXTENSION}"):
+                with open(path, "rb") as source:
+                    prefix = source.read(len(container.MAGIC))
+                    source.seek(0)
+                    if container.is_container(prefix):
+                        headers = [container.read_header(source)]
+                    elif is_pack(prefix):
+                        with PackArchive(path) as pack:
+                            headers = []
+                            for name in pack.members:
+                                with pack.open_member(name) as member:
+                                    headers.append(container.read_header(member))
+                    else:
+                        continue
+                referenced.update(header['dictionary'] for header in headers if 'dictionary' in header)
+        except (OSError, ValueError):
+            return None
+        return referenced
+
+    def _select_codec(self, filepath: Path,
+                      size: int) -> Tuple[Codec, int, Optional[SharedDictionary]]:
+        """Pick codec, level and (when enabled) shared dictionary for a file."""
+        codec, level = self.codec_policy.select(filepath, size)
+
+        dictionary = None
+        if self.use_dictionaries:
+            dictionary = self.dictionaries.for_file(filepath, size)
+            if dictionary is not None and not codec.supports_dictionary:
+                codec, level = self.dictionary_codecs.select(filepath, size)
+        return codec, level, dictionary
+
+    def _compress_into(self, filepath: Path, original_stat: os.stat_result, codec: Codec, level: int,
+                       dictionary: Optional[SharedDictionary],
+                       on_progress: Optional[ProgressCallback], target: BinaryIO,
+                       timings: Optional[StageTimings] = None, scanned: Optional[os.stat_result] = None):
+        """
+        Write filepath as a block container to target.
+
+        Large files are memory-mapped so blocks reach the codec as slices of
+        the page cache rather than as copies. A file that was truncated or
+        rewritten since it was stat'ed is read through buffered I/O instead,
+        as touching pages past the new end of a mapping raises SIGBUS.
+        """
+        timings = timings or StageTimings()
+        write = partial(
+            container.write_container,
+            target=timings.wrap(target, 'write'), codec=codec, level=level, block_size=self.block_size,
+            max_workers=self._block_workers_for(original_stat.st_size), on_progress=on_progress,
+            metadata=_stat_metadata(original_stat, scanned), dictionary=dictionary
+        )
+        with open(filepath, "rb") as source:
+            if not self.use_mmap or original_stat.st_size < self.mmap_min_size:
+                with timings.stage('compress', exclude=('read', 'write')):
+                    write(timings.wrap(source, 'read'))
+                return
+            mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+            current_stat = os.fstat(source.fileno())
+            if (len(mapped) != original_stat.st_size or current_stat.st_size != original_stat.st_size
+                    or current_stat.st_mtime_ns != original_stat.st_mtime_ns):
+                mapped.close()
+                with timings.stage('compress', exclude=('read', 'write')):
+                    write(timings.wrap(source, 'read'))
+                return
+            try:
+                if hasattr(mapped, 'madvise'):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                with timings.stage('compress', exclude=('write',)):
+                    write(memoryview(mapped))
+            finally:
+                try:
+                    mapped.close()
+                except BufferError:
+                    # A failed write can leave block slices alive; the mapping is freed with them
+                    pass
+
+    @staticmethod
+    def _is_pack_file(filepath: Path) -> bool:
+        """Return True if a .zz file is a pack archive rather than a single file."""
+        with open(filepath, "rb") as f:
+            return is_pack(f.read(len(container.MAGIC)))
+
+    def _block_workers_for(self, size: int) -> int:
+        """
+        Only spin up block threads when a file spans more than one block, and
+        split them between the files processed at once so a run never starts
+        more than about block_workers threads in total.
+        """
+        if size <= self.block_size:
+            return 1
+        return max(1, self.block_workers // max(1, self.concurrent_files))
+
+    def _stream_decompress(self, source: BinaryIO, target: Optional[BinaryIO],
+                           on_progress: Optional[ProgressCallback] = None) -> None:
+        """
+        Inflate a legacy headerless .zz stream, never holding more than a chunk of output.
+
+        zlib checks the stream's own Adler-32 at the end; a None target discards the output.
+        """
+        decompressor = zlib.decompressobj()
+        while not decompressor.eof:
+            if decompressor.unconsumed_tail:
+                chunk = decompressor.unconsumed_tail
+            else:
+                chunk = source.read(self.chunk_size)
+                if on_progress is not None:
+                    on_progress(len(chunk))
+            data = decompressor.decompress(chunk, self.chunk_size)
+            if not chunk and not data:
+                raise zlib.error("Compressed data is incomplete or truncated")
+            if target is not None:
+                target.write(data)
+        if target is not None:
+            target.write(decompressor.flush())
 
-    def compress_file(self, filepath: Path) -> Dict[str, Any]:
+    def compress_file(self, filepath: Path, on_progress: Optional[ProgressCallback] = None,
+                      probe: Optional[ProbeResult] = None,
+                      scanned: Optional[os.stat_result] = None) -> Dict[str, Any]:
         """
-        Compress a single file using zlib.
+        Compress a single file into the block-parallel .zz container.
+
+        The .zz file is written under a temporary name and renamed into place
+        before the original is removed, so a crash never loses data.
+
+        The codec and level come from the codec policy and are recorded in the
+        container header, so decompression detects them automatically.
+
+        Files the compressibility probe rejects are left untouched and reported
+        with 'skipped' set.
+
+        The recorded atime is taken from scanned when given, as the file may
+        have been read (and its atime bumped) since it was picked as cold.
 
         Args:
             filepath: Path to the file to compress
+            on_progress: Called with the number of input bytes handled after each block
+            probe: Probe result already taken for this file (e.g. by the scheduler)
+            scanned: Stat the scan selected the file by
 
         Returns:
             Dictionary containing operation result and metadata
         """
+        compressed_path = filepath.with_suffix(filepath.suffix + COMPRESSED_EXTENSION)
+        timings = StageTimings()
         try:
-            original_size = filepath.stat().st_size
-
-            # Read and compress file data
-            with open(filepath, "rb") as f:
-                data = f.read()
-            compressed = zlib.compress(data, level=self.compression_level)
+            original_stat = filepath.stat()
+            original_size = original_stat.st_size
+            codec, level, dictionary = self._select_codec(filepath, original_size)
 
-            # Write compressed file
-            compressed_path = filepath.with_suffix(filepath.suffix + COMPRESSED_EXTENSION)
-            with open(compressed_path, "wb") as f:
-                f.write(compressed)
+            if self.probe is not None:
+                if probe is None:
+                    with timings.stage('probe'):
+                        probe = self.probe.check(filepath, original_size, codec, level)
+                if not probe.compress:
+                    if on_progress is not None:
+                        on_progress(original_size)
+                    return {
+                        'success': True,
+                        'skipped': True,
+                        'message': f"⏭️ Skipped: {filepath.name} ({probe.reason})",
+                        'space_saved': 0,
+                        'skipped_bytes': original_size,
+                        'cpu_saved': probe.cpu_saved,
+                        'original_path': filepath,
+                        'timings': timings.seconds
+                    }
 
-            # Remove original file
-            os.remove(filepath)
+            # Stream file data through the block compressor, then swap it for the original
+            write = partial(self._compress_into, filepath, original_stat, codec, level,
+                            dictionary, on_progress, timings=timings, scanned=scanned)
+            with timings.stage('commit', exclude=('read', 'compress', 'write')):
+                self._replace_file("compression", filepath, compressed_path, write)
 
             # Calculate compression statistics
             compressed_size = compressed_path.stat().st_size
             space_saved = original_size - compressed_size
             compression_ratio = (space_saved / original_size) * 100 if original_size > 0 else 0
+            codec_label = codec.name if dictionary is None else f"{codec.name}+dict"
 
             return {
                 'success': True,
-                'message': f"✅ Compressed: {filepath.name} ({compression_ratio:.1f}% reduction)",
+                'message': f"✅ Compressed: {filepath.name} "
+                           f"({codec_label}, {compression_ratio:.1f}% reduction)",
                 'space_saved': space_saved,
                 'original_path': filepath,
                 'compressed_path': compressed_path,
-                'compression_ratio': compression_ratio
+                'compression_ratio': compression_ratio,
+                'codec': codec.name,
+                'dictionary': dictionary.id if dictionary is not None else None,
+                'bytes_in': original_size,
+                'bytes_out': compressed_size,
+                'timings': timings.seconds
             }
         except Exception as e:
             return {
                 'success': False,
                 'message': f"❌ Error compressing {filepath}: {e}",
                 'space_saved': 0,
-                'error': str(e)
+                'error': str(e),
+                'timings': timings.seconds
             }
 
-    def decompress_file(self, filepath: Path) -> Dict[str, Any]:
+    def decompress_file(self, filepath: Path,
+                        on_progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
         """
-        Decompress a .zz file.
+        Decompress a .zz file (block container, pack archive or legacy zlib stream).
+
+        Pack archives are unpacked completely; see extract_pack().
+
+        The output is checked against the stored size and checksum before it
+        replaces the .zz file, so a corrupt archive is never unpacked. If the
+        checksum can't be computed here, the .zz file is kept unless
+        allow_unverified is set. The original timestamps and permission bits
+        are restored, so the file stays cold for the age policy.
 
         Args:
             filepath: Path to the compressed file
+            on_progress: Called with the number of compressed bytes consumed after each chunk
 
         Returns:
             Dictionary containing operation result and metadata
         """
+        # Write decompressed file (remove .zz suffix)
+        original_path = filepath.with_suffix("")
+        timings = StageTimings()
         try:
-            # Read and decompress file data
-            with open(filepath, "rb") as f:
-                data = f.read()
-            decompressed = zlib.decompress(data)
+            if self._is_pack_file(filepath):
+                return self.extract_pack(filepath, on_progress=on_progress)
+            compressed_size = filepath.stat().st_size
+            skipped: Optional[str] = None
 
-            # Write decompressed file (remove .zz suffix)
-            original_path = filepath.with_suffix("")
-            with open(original_path, "wb") as f:
-                f.write(decompressed)
+            # Stream file data through the matching decompressor, then swap it for the .zz
+            def write(target: BinaryIO) -> Optional[Dict[str, Any]]:
+                nonlocal skipped
+                with open(filepath, "rb") as raw_source, \
+                        timings.stage('decompress', exclude=('read', 'write')):
+                    is_container = container.is_container(raw_source.read(len(container.MAGIC)))
+                    raw_source.seek(0)
+                    source, target = timings.wrap(raw_source, 'read'), timings.wrap(target, 'write')
+                    if not is_container:
+                        self._stream_decompress(source, target, on_progress)
+                        return None
+                    header = container.read_container(
+                        source, target,
+                        self._block_workers_for(compressed_size), on_progress,
+                        self._dictionary_loader(filepath)
+                    )
+                    self._require_verified(header)
+                    skipped = header.get('checksum_skipped')
+                    return header
 
-            # Remove compressed file
-            os.remove(filepath)
+            with timings.stage('commit', exclude=('read', 'decompress', 'write')):
+                self._replace_file("decompression", filepath, original_path, write)
 
+            message = f"✅ Decompressed: {filepath.name} → {original_path.name}"
+            if skipped:
+                message += f" (⚠️ {skipped} checksum not verified, only the size)"
             return {
                 'success': True,
-                'message': f"✅ Decompressed: {filepath.name} → {original_path.name}",
+                'message': message,
+                'checksum_skipped': skipped,
                 'original_path': original_path,
-                'compressed_path': filepath
+                'compressed_path': filepath,
+                'bytes_in': compressed_size,
+                'bytes_out': original_path.stat().st_size,
+                'timings': timings.seconds
             }
         except Exception as e:
             return {
                 'success': False,
                 'message': f"❌ Error decompressing {filepath}: {e}",
-                'error': str(e)
+                'error': str(e),
+                'timings': timings.seconds
             }
 
-    def find_old_files(self, folder: Path, threshold_days: int) -> List[Path]:
+    def verify_file(self, filepath: Path,
+                    on_progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
         """
-        Find files older than the specified threshold.
+        Check that a .zz file decompresses cleanly, without writing anything.
+
+        Block containers are checked against the size and checksum in their
+        footer; legacy streams against zlib's built-in Adler-32.
 
         Args:
-            folder: Root folder to scan
-            threshold_days: Age threshold in days
+            filepath: Path to the compressed file
+            on_progress: Called with the number of compressed bytes consumed after each chunk
 
         Returns:
-            List of file paths that are older than threshold
+            Dictionary containing operation result and metadata
         """
-        now = time.time()
-        threshold_seconds = threshold_days * 24 * 60 * 60
-        old_files = []
+        timings = StageTimings()
+        try:
+            if self._is_pack_file(filepath):
+                with PackArchive(filepath) as pack:
+                    for name in pack.members:
+                        with pack.open_member(name) as member:
+                            container.read_container(
+                                member, None, 1, on_progress, self._dictionary_loader(filepath)
+                            )
+                    checksum = f"pack of {len(pack.members)} files"
+                return {
+                    'success': True,
+                    'message': f"✅ Verified: {filepath.name} ({checksum})",
+                    'path': filepath,
+                    'checksum': checksum
+                }
 
-        for root, dirs, files in os.walk(folder):
-            for file in files:
-                filepath = Path(root) / file
+            compressed_size = filepath.stat().st_size
+            with open(filepath, "rb") as raw_source, timings.stage('decompress', exclude=('read',)):
+                is_container = container.is_container(raw_source.read(len(container.MAGIC)))
+                raw_source.seek(0)
+                source = timings.wrap(raw_source, 'read')
+                if is_container:
+                    header = container.read_container(
+                        source, None, self._block_workers_for(compressed_size), on_progress,
+                        self._dictionary_loader(filepath)
+                    )
+                    checksum = header.get('footer', {}).get('checksum', {}).get('algorithm', "size only")
+                    if header.get('checksum_skipped'):
+                        checksum = f"size only, ⚠️ {checksum} unavailable without xxhash"
+                else:
+                    self._stream_decompress(source, None, on_progress)
+                    checksum = "adler32"
 
-                # Skip already compressed files
-                if filepath.suffix.endswith(COMPRESSED_EXTENSION):
-                    continue
+            return {
+                'success': True,
+                'message': f"✅ Verified: {filepath.name} ({checksum})",
+                'path': filepath,
+                'checksum': checksum,
+                'bytes_in': compressed_size,
+                'timings': timings.seconds
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f"❌ Corrupt: {filepath}: {e}",
+                'path': filepath,
+                'error': str(e),
+                'timings': timings.seconds
+            }
+
+    def stat_compressed(self, filepath: Path) -> CompressedStat:
+        """
+        Read the sizes and original metadata of a .zz file without inflating it.
+
+        Only the container header and footer (or a pack's central index) are read.
+
+        Args:
+            filepath: Path to the compressed file
+
+        Returns:
+            Logical and physical size plus the recorded original metadata
+        """
+        with open(filepath, "rb") as source:
+            physical_size = os.fstat(source.fileno()).st_size
+            prefix = source.read(len(container.MAGIC))
+            if is_pack(prefix):
+                with PackArchive(filepath) as pack:
+                    logical_size = sum(member.size for member in pack.members.values())
+                return CompressedStat(filepath, physical_size, logical_size, None, None, None, "pack")
+            if not container.is_container(prefix):
+                return CompressedStat(filepath, physical_size, None, None, None, None, "zlib")
+            source.seek(0)
+            header = container.read_metadata(source)
+
+        return CompressedStat(
+            filepath, physical_size, header['footer'].get('original_size'),
+            header.get('mtime'), header.get('atime'), header.get('mode'), header.get('codec', 'zlib')
+        )
+
+    def pack_files(self, files: List[Path], on_progress: Optional[ProgressCallback] = None,
+                   scanned: Optional[List[os.stat_result]] = None) -> Dict[str, Any]:
+        """
+        Append files of one directory to that directory's pack archive.
+
+        Each file becomes a self-contained container inside the pack. The
+        originals are removed only after the pack's new central index is on
+        disk; a crash before that leaves them in place to be packed again.
+        An interrupted run (e.g. a cancelled job) cuts off what it appended,
+        and removes the pack if it created it.
+
+        Files the compressibility probe rejects are left untouched and listed
+        in 'skipped_files'.
+
+        Args:
+            files: Files to pack, all in the same directory
+            on_progress: Called with the number of input bytes handled after each block
+            scanned: Stats the scan selected the files by, in the same order;
+                their atimes are recorded (see compress_file())
+
+        Returns:
+            Dictionary containing operation result and metadata; 'file_count'
+            covers every file and 'errors' lists the ones that failed
+        """
+        pack_path = files[0].parent / PACK_NAME
+        packed: List[Path] = []
+        errors: List[str] = []
+        skipped: List[str] = []
+        skipped_bytes = 0
+        cpu_saved = 0.0
+        original_bytes = 0
+        timings = StageTimings()
+        try:
+            existed = pack_path.exists()
+            start_size = pack_path.stat().st_size if existed else 0
+            committed = False
+            try:
+                with PackArchive(pack_path, writable=True) as pack:
+                    try:
+                        for filepath, scanned_stat in zip(files, scanned or [None] * len(files)):
+                            try:
+                                original_stat = filepath.stat()
+                                probe = self._add_to_pack(pack, filepath, original_stat,
+                                                          on_progress, timings, scanned_stat)
+                            except Exception as e:
+                                errors.append(f"{filepath.name}: {e}")
+                                continue
+                            if probe is not None:
+                                skipped.append(f"{filepath.name} ({probe.reason})")
+                                skipped_bytes += original_stat.st_size
+                                cpu_saved += probe.cpu_saved
+                                continue
+                            packed.append(filepath)
+                            original_bytes += original_stat.st_size
+                        if packed:
+                            with timings.stage('commit'):
+                                pack.commit()
+                            committed = True
+                    except BaseException:
+                        # Cancelled or failed mid-member: leave only committed data behind
+                        pack.discard()
+                        raise
+            finally:
+                if not existed and not committed:
+                    pack_path.unlink(missing_ok=True)
+            if not packed and not errors:
+                return {
+                    'success': True,
+                    'skipped': True,
+                    'message': f"⏭️ Skipped: {len(files)} files in {pack_path.parent} "
+                               f"({', '.join(skipped)})",
+                    'space_saved': 0,
+                    'file_count': len(files),
+                    'skipped_bytes': skipped_bytes,
+                    'cpu_saved': cpu_saved,
+                    'timings': timings.seconds
+                }
+            if not packed:
+                raise ValueError("; ".join(errors))
+
+            for filepath in packed:
+                os.remove(filepath)
+
+            space_saved = original_bytes - (pack_path.stat().st_size - start_size)
+            compression_ratio = (space_saved / original_bytes) * 100 if original_bytes > 0 else 0
+            message = (f"📦 Packed {len(packed)} files into {pack_path} "
+                       f"({compression_ratio:.1f}% reduction)")
+            if skipped:
+                message += f"; skipped: {', '.join(skipped)}"
+            if errors:
+                message += f"; failed: {', '.join(errors)}"
+            return {
+                'success': True,
+                'message': message,
+                'space_saved': space_saved,
+                'file_count': len(files),
+                'errors': errors,
+                'skipped_files': skipped,
+                'skipped_bytes': skipped_bytes,
+                'cpu_saved': cpu_saved,
+                'original_paths': packed,
+                'compressed_path': pack_path,
+                'compression_ratio': compression_ratio,
+                'bytes_in': original_bytes,
+                'bytes_out': original_bytes - space_saved,
+                'timings': timings.seconds
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f"❌ Error packing {len(files)} files into {pack_path}: {e}",
+                'space_saved': 0,
+                'file_count': len(files),
+                'error': str(e),
+                'timings': timings.seconds
+            }
+
+    def _add_to_pack(self, pack: PackArchive, filepath: Path, original_stat: os.stat_result,
+                     on_progress: Optional[ProgressCallback], timings: StageTimings,
+                     scanned: Optional[os.stat_result] = None) -> Optional[ProbeResult]:
+        """Append one file to a pack, unless the probe rejects it; return the rejecting probe result."""
+        codec, level, dictionary = self._select_codec(filepath, original_stat.st_size)
+        if self.probe is not None:
+            with timings.stage('probe'):
+                probe = self.probe.check(filepath, original_stat.st_size, codec, level)
+            if not probe.compress:
+                if on_progress is not None:
+                    on_progress(original_stat.st_size)
+                return probe
+        pack.add(filepath.name, original_stat.st_size, original_stat.st_mtime,
+                 partial(self._compress_into, filepath, original_stat, codec, level,
+                         dictionary, on_progress, timings=timings, scanned=scanned))
+        return None
+
+    def dedup_files(self, group: DedupGroup,
+                    on_progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        Compress one copy of identical files into the content-addressed store
+        and replace every copy with a hardlink to that blob.
+
+        The blob is hashed while it is compressed, and every copy is checked
+        for changes since it was hashed before it is replaced. Where the
+        filesystem can't hardlink, the compressed blob is copied instead,
+        which still saves the repeated compression work.
+
+        Args:
+            group: Identical files found by services.dedup.find_duplicates
+            on_progress: Called with the size of every file replaced
 
+        Returns:
+            Dictionary containing operation result and metadata; 'file_count'
+            covers every file and 'errors' lists the ones that failed
+        """
+        blob = DedupStore.blob_path(group.store, group.digest, group.metadata_key)
+        originals: List[Path] = []
+        targets: List[Path] = []
+        errors: List[str] = []
+        space_saved = 0
+        try:
+            if not blob.exists():
+                self._store_blob(group, blob)
+                space_saved -= blob.stat().st_size
+            blob_size = blob.stat().st_size
+
+            for filepath, signature in zip(group.paths, group.signatures):
+                target = filepath.with_suffix(filepath.suffix + COMPRESSED_EXTENSION)
                 try:
-                    atime = os.stat(filepath).st_atime
-                    if now - atime > threshold_seconds:
-                        old_files.append(filepath)
-                except Exception:
-                    # Skip files that can't be accessed
+                    file_stat = filepath.stat()
+                    if signature_of(file_stat) != signature:
+                        raise ValueError("changed since it was hashed")
+                    if group.metadata_key and metadata_key(file_stat) != group.metadata_key:
+                        raise ValueError("permissions or owner changed since it was scanned")
+                    linked = []
+                    self._journaled_replace("deduplication", filepath, target,
+                                            partial(self._place_reference, blob, target, linked))
+                except Exception as e:
+                    errors.append(f"{filepath.name}: {e}")
                     continue
+                originals.append(filepath)
+                targets.append(target)
+                space_saved += signature.size - (0 if linked[0] else blob_size)
+                if on_progress is not None:
+                    on_progress(signature.size)
+            if not originals:
+                raise ValueError("; ".join(errors))
+
+            message = (f"🔗 Deduplicated {len(originals)} copies of {group.paths[0].name} "
+                       f"({space_saved / (1024 * 1024):.2f} MB saved)")
+            if errors:
+                message += f"; failed: {', '.join(errors)}"
+            return {
+                'success': True,
+                'message': message,
+                'space_saved': space_saved,
+                'file_count': len(group.paths),
+                'errors': errors,
+                'original_paths': originals,
+                'compressed_paths': targets,
+                'digest': group.digest,
+                'bytes_in': sum(signature.size for signature in group.signatures),
+                'bytes_out': sum(signature.size for signature in group.signatures) - space_saved
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f"❌ Error deduplicating {len(group.paths)} copies of {group.paths[0]}: {e}",
+                'space_saved': 0,
+                'file_count': len(group.paths),
+                'error': str(e)
+            }
+
+    def _store_blob(self, group: DedupGroup, blob: Path):
+        """Compress the first copy of a group into the store, checking its content hash."""
+        filepath = group.paths[0]
+        original_stat = filepath.stat()
+        if signature_of(original_stat) != group.signatures[0]:
+            raise ValueError(f"{filepath.name} changed since it was hashed")
+        # Copies share mode, mtime and owner but not atime, so the blob records none:
+        # decompression then sets each copy's atime to its mtime
+        metadata = _stat_metadata(original_stat)
+        metadata['atime'] = None
+        # Copies may live in other directories, so blobs never use a directory dictionary
+        codec, level = self.codec_policy.select(filepath, original_stat.st_size)
+
+        def write(target: BinaryIO):
+            with open(filepath, "rb") as source:
+                reader = HashingReader(source)
+                container.write_container(
+                    reader, target, codec, level, self.block_size,
+                    self._block_workers_for(original_stat.st_size),
+                    metadata=metadata
+                )
+            if reader.hexdigest() != group.digest:
+                raise ValueError(f"{filepath.name} changed since it was hashed")
+
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        self._write_atomically(blob, write)
+
+    def _place_reference(self, blob: Path, target: Path, linked: List[bool]):
+        """Hardlink target to a store blob, or copy the blob where links are unsupported."""
+        try:
+            link_atomically(blob, target)
+            linked.append(True)
+        except OSError:
+            def write(out: BinaryIO):
+                with open(blob, "rb") as source:
+                    shutil.copyfileobj(source, out, self.chunk_size)
+
+            self._write_atomically(target, write)
+            linked.append(False)
+
+    def extract_pack(self, pack_path: Path, names: Optional[List[str]] = None,
+                     on_progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        Restore files from a pack archive into its directory.
+
+        Only the requested members are read. Extracted members are dropped
+        from the pack, and the pack is deleted once it is empty. Members whose
+        checksum can't be computed here are refused as in decompress_file().
+
+        Args:
+            pack_path: Pack archive
+            names: Members to extract; None extracts everything
+            on_progress: Called with the number of compressed bytes consumed after each block
+
+        Returns:
+            Dictionary containing operation result and metadata
+        """
+        try:
+            restored = []
+            with PackArchive(pack_path, writable=True) as pack:
+                selected = list(pack.members) if names is None else names
+                for name in selected:
+                    target = pack_path.parent / name
+
+                    def write(out: BinaryIO) -> Dict[str, Any]:
+                        with pack.open_member(name) as member:
+                            header = container.read_container(
+                                member, out, 1, on_progress, self._dictionary_loader(pack_path)
+                            )
+                        self._require_verified(header)
+                        return header
+
+                    self._write_atomically(target, write)
+                    restored.append(target)
+
+                pack.remove(selected)
+                remaining = len(pack.members)
+                if remaining:
+                    pack.commit()
+            if not remaining:
+                os.remove(pack_path)
+
+            return {
+                'success': True,
+                'message': f"✅ Unpacked: {len(restored)} files from {pack_path}",
+                'file_count': len(restored),
+                'original_paths': restored,
+                'compressed_path': pack_path
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f"❌ Error unpacking {pack_path}: {e}",
+                'file_count': len(names) if names is not None else 1,
+                'error': str(e)
+            }
+
+    def list_pack(self, pack_path: Path) -> List[PackMember]:
+        """
+        List the members of a pack archive from its central index.
+
+        Args:
+            pack_path: Pack archive
+
+        Returns:
+            Members in the order they were added
+        """
+        with PackArchive(pack_path) as pack:
+            return list(pack.members.values())
+
+    def open_compressed(self, filepath: Path) -> CompressedFileReader:
+        """
+        Open a .zz file as a read-only, seekable file-like object.
+
+        Only the blocks touched by seek/read are inflated; the .zz file is left in place.
+
+        Args:
+            filepath: Path to the compressed file
+
+        Returns:
+            File-like reader over the original (uncompressed) data
+        """
+        return CompressedFileReader(filepath, self.chunk_size, self._dictionary_loader(filepath))
+
+    def read_original(self, filepath: Path, target: BinaryIO, member: Optional[str] = None) -> None:
+        """
+        Write the original data of a .zz file, or of one pack member, to target.
+
+        The output is checked against the stored size and checksum as in
+        decompress_file(), but the .zz file is left in place.
+
+        Args:
+            filepath: Path to the compressed file or pack archive
+            target: Stream receiving the original data
+            member: Pack member to read; required when filepath is a pack
+        """
+        if member is not None:
+            with PackArchive(filepath) as pack, pack.open_member(member) as source:
+                container.read_container(source, target, 1, None, self._dictionary_loader(filepath))
+            return
 
-        return old_files
+        with open(filepath, "rb") as source:
+            is_container = container.is_container(source.read(len(container.MAGIC)))
+            source.seek(0)
+            if not is_container:
+                self._stream_decompress(source, target)
+                return
+            container.read_container(
+                source, target, self._block_workers_for(os.fstat(source.fileno()).st_size), None,
+                self._dictionary_loader(filepath)
+            )
+
+    def scan_folder(self, folder: Path, threshold_days: Optional[int] = None) -> DirectoryScanner:
+        """
+        Create a single-pass scanner for a folder.
+
+        Iterate scanner.scan(folder) to receive cold candidates and compressed files
+        as they are found; scanner.stats holds folder statistics once it finishes.
+        Unchanged directories are served from the persistent scan index when enabled,
+        and cold candidates are chosen by the service's selection policy.
+
+        Args:
+            folder: Root folder to scan
+            threshold_days: Age threshold in days; None skips candidate detection
+
+        Returns:
+            Configured directory scanner
+        """
+        return DirectoryScanner(threshold_days, index=self._open_scan_index(),
+                                policy=self.selection_policy)
+
+    def find_old_files(self, folder: Path, threshold_days: int) -> List[Path]:
+        """
+        Find files older than the specified threshold.
+
+        Args:
+            folder: Root folder to scan
+            threshold_days: Age threshold in days
+
+        Returns:
+            List of file paths that are older than threshold
+        """
+        scanner = self.scan_folder(folder, threshold_days)
+        return [entry.path for entry in scanner.scan(folder) if not entry.compressed]
 
     def find_compressed_files(self, folder: Path) -> List[Path]:
         """
@@ -139,34 +989,37 @@ class CompressionService:
         Returns:
             List of compressed file paths
         """
-        compressed_files = []
-
-        for root, dirs, files in os.walk(folder):
-            for file in files:
-                filepath = Path(root) / file
-                if filepath.suffix.endswith(COMPRESSED_EXTENSION):
-                    compressed_files.append(filepath)
-
-        return compressed_files
+        scanner = self.scan_folder(folder)
+        return [entry.path for entry in scanner.scan(folder)]
 
     def get_folder_stats(self, folder: Path) -> Tuple[int, int]:
         """
         Get statistics about files in the folder.
 
+        Answered from the scan index without touching the filesystem when the
+        folder has been scanned before.
+
         Args:
             folder: Root folder to analyze
 
         Returns:
             Tuple of (total_files, compressed_files)
         """
-        total_files = 0
-        compressed_files = 0
-
-        for root, dirs, files in os.walk(folder):
-            for file in files:
-                filepath = Path(root) / file
-                total_files += 1
-                if filepath.suffix.endswith(COMPRESSED_EXTENSION):
-                    compressed_files += 1
+        index = self._open_scan_index()
+        if index is not None:
+            try:
+                stats = index.folder_stats(os.path.abspath(folder))
+            except sqlite3.Error:
+                stats = None
+            finally:
+                try:
+                    index.close()
+                except sqlite3.Error:
+                    pass
+            if stats is not None:
+                return stats
 
-        return total_files, compressed_files
+        scanner = self.scan_folder(folder)
+        for _ in scanner.scan(folder):
+            pass
+        return scanner.stats.total_files, scanner.stats.compressed_files
@@ -0,0 +1,407 @@
+"""
+Block container format for .zz files.
+
+Layout (all integers little-endian):
+
+    MAGIC (4 bytes) | version (1 byte) | header length (4 bytes) | JSON header
+    block frames: raw length (4 bytes) | compressed length (4 bytes) | codec data
+    end marker: a frame with raw length and compressed length both 0
+    block index: per block, data offset (8) | raw length (4) | compressed length (4)
+    JSON footer
+    trailer: index offset (8) | block count (4) | footer length (4) | TRAILER_MAGIC (4)
+
+The header names the codec and level and records the source file's stat
+metadata (mtime, atime, permission bits). Containers compressed against a
+shared dictionary name its ID; the dictionary itself is stored separately.
+The footer records the original size and a checksum of the original data,
+which decompression and verification check before trusting the output.
+Every block is compressed independently
+with that codec, so blocks can be compressed and decompressed on separate
+cores, and the trailing index lets readers seek to any block without scanning
+the file. Version 1 containers have no index or footer; their index is rebuilt
+by hopping over the frame headers.
+
+Legacy .zz files are a single headerless zlib stream; they never start with
+MAGIC because 0x89 is not a valid zlib header byte.
+"""
+import io
+import json
+import os
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from services.checksums import Checksum, is_available, new_checksum, preferred_checksum
+from services.codecs import Codec, get_codec
+from services.dictionary import SharedDictionary
+
+MAGIC = b"\x89CCZ"
+TRAILER_MAGIC = b"CCZI"
+FORMAT_VERSION = 2
+
+_PREAMBLE = struct.Struct("<4sBI")
+_FRAME = struct.Struct("<II")
+_INDEX_ENTRY = struct.Struct("<QII")
+_TRAILER = struct.Struct("<QII4s")
+
+
+class BlockEntry(NamedTuple):
+    """Location of one block in both the original data and the container."""
+    raw_offset: int
+    raw_length: int
+    data_offset: int
+    compressed_length: int
+
+
+def is_container(prefix: bytes) -> bool:
+    """Return True if the leading bytes of a file identify the block container."""
+    return prefix[:len(MAGIC)] == MAGIC
+
+
+def _ordered_map(func: Callable, items: Iterable, max_workers: int) -> Iterator:
+    """
+    Apply func to items on a thread pool, yielding results in input order.
+
+    The stdlib codecs release the GIL while they work, so threads give real parallelism here.
+    At most two tasks per worker are in flight to keep memory bounded.
+    """
+    if max_workers <= 1:
+        yield from map(func, items)
+        return
+
+    window = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _read_blocks(source: BinaryIO, block_size: int, checksum: Checksum) -> Iterator[bytes]:
+    """Yield consecutive blocks of at most block_size bytes, checksumming them in order."""
+    while True:
+        block = source.read(block_size)
+        if not block:
+            return
+        checksum.update(block)
+        yield block
+
+
+def _slice_blocks(view: memoryview, block_size: int, checksum: Checksum) -> Iterator[memoryview]:
+    """Yield consecutive zero-copy slices of at most block_size bytes, checksumming them in order."""
+    for start in range(0, len(view), block_size):
+        block = view[start:start + block_size]
+        checksum.update(block)
+        yield block
+
+
+def preallocate(target: BinaryIO, size: int) -> None:
+    """
+    Reserve size bytes for a file about to be written sequentially from the start.
+
+    Uses posix_fallocate where available and extends the file otherwise
+    (which allocates on NTFS). Streams without a file descriptor, and
+    filesystems that refuse, are left as they are.
+    """
+    if size <= 0:
+        return
+    try:
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(target.fileno(), 0, size)
+        else:
+            position = target.tell()
+            target.truncate(size)
+            target.seek(position)
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+
+
+# Receives the number of input bytes handled since the previous call
+ProgressCallback = Callable[[int], None]
+
+# Returns the bytes of the shared dictionary with the given ID
+DictionaryLoader = Callable[[str], bytes]
+
+
+def write_container(source: Union[BinaryIO, memoryview], target: BinaryIO, codec: Codec, level: int,
+                    block_size: int, max_workers: int = 1,
+                    on_progress: Optional[ProgressCallback] = None,
+                    metadata: Optional[Dict[str, Any]] = None,
+                    checksum: Optional[str] = None,
+                    dictionary: Optional[SharedDictionary] = None) -> None:
+    """
+    Compress source into target using the block container format.
+
+    Args:
+        source: Readable binary stream with the original data, or a buffer
+            (such as a memory-mapped file) whose blocks are compressed in place
+        target: Writable binary stream for the container
+        codec: Codec used for every block
+        level: Codec compression level
+        block_size: Uncompressed size of each block in bytes
+        max_workers: Number of threads compressing blocks concurrently
+        on_progress: Called with the uncompressed size of every block written
+        metadata: Stat metadata of the original file (mtime, atime, mode), stored in the header
+        checksum: Checksum algorithm for the footer (defaults to preferred_checksum())
+        dictionary: Shared dictionary every block is compressed against; the codec must support it
+    """
+    fields = {'block_size': block_size, 'codec': codec.name, 'level': level, **(metadata or {})}
+    if dictionary is not None:
+        fields['dictionary'] = dictionary.id
+    header = json.dumps(fields).encode()
+    dictionary_data = dictionary.data if dictionary is not None else None
+    target.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+    target.write(header)
+
+    def compress_block(block: bytes):
+        return len(block), codec.compress(block, level, dictionary_data)
+
+    offset = _PREAMBLE.size + len(header)
+    original_size = 0
+    index = []
+    digest = new_checksum(checksum or preferred_checksum())
+    if isinstance(source, memoryview):
+        blocks = _slice_blocks(source, block_size, digest)
+    else:
+        blocks = _read_blocks(source, block_size, digest)
+    for raw_length, compressed in _ordered_map(compress_block, blocks, max_workers):
+        target.write(_FRAME.pack(raw_length, len(compressed)))
+        target.write(compressed)
+        index.append(_INDEX_ENTRY.pack(offset + _FRAME.size, raw_length, len(compressed)))
+        offset += _FRAME.size + len(compressed)
+        original_size += raw_length
+        if on_progress is not None:
+            on_progress(raw_length)
+
+    target.write(_FRAME.pack(0, 0))
+    index_offset = offset + _FRAME.size
+
+    footer = json.dumps({
+        'original_size': original_size,
+        'checksum': {'algorithm': digest.name, 'value': digest.hexdigest()}
+    }).encode()
+    target.write(b"".join(index))
+    target.write(footer)
+    target.write(_TRAILER.pack(index_offset, len(index), len(footer), TRAILER_MAGIC))
+
+
+def read_header(source: BinaryIO) -> Dict[str, Any]:
+    """
+    Read and validate the container preamble and header.
+
+    Args:
+        source: Binary stream positioned at the start of the container
+
+    Returns:
+        Parsed header dictionary, including the format version
+    """
+    preamble = source.read(_PREAMBLE.size)
+    if len(preamble) < _PREAMBLE.size:
+        raise ValueError("Truncated container header")
+    magic, version, header_length = _PREAMBLE.unpack(preamble)
+    if magic != MAGIC:
+        raise ValueError("Not a ColdCompress container")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Unsupported container version {version}")
+
+    header = json.loads(source.read(header_length).decode())
+    header['version'] = version
+    return header
+
+
+def read_index(source: BinaryIO) -> Tuple[Dict[str, Any], List[BlockEntry]]:
+    """
+    Load the header and block index of a container without inflating any data.
+
+    Args:
+        source: Seekable binary stream positioned at the start of the container
+
+    Returns:
+        Tuple of (header, block entries in original data order)
+    """
+    header = read_header(source)
+    if header['version'] < 2:
+        return header, _scan_index(source)
+
+    index_offset, block_count, footer_length = _read_trailer(source)
+    source.seek(index_offset)
+    index_data = source.read(block_count * _INDEX_ENTRY.size)
+    if len(index_data) < block_count * _INDEX_ENTRY.size:
+        raise ValueError("Truncated container block index")
+    header['footer'] = json.loads(source.read(footer_length).decode())
+
+    entries = []
+    raw_offset = 0
+    for data_offset, raw_length, compressed_length in _INDEX_ENTRY.iter_unpack(index_data):
+        entries.append(BlockEntry(raw_offset, raw_length, data_offset, compressed_length))
+        raw_offset += raw_length
+    return header, entries
+
+
+def _read_trailer(source: BinaryIO) -> Tuple[int, int, int]:
+    """Return (index offset, block count, footer length) from a version 2 trailer."""
+    source.seek(-_TRAILER.size, os.SEEK_END)
+    index_offset, block_count, footer_length, magic = _TRAILER.unpack(source.read(_TRAILER.size))
+    if magic != TRAILER_MAGIC:
+        raise ValueError("Truncated container: missing block index")
+    return index_offset, block_count, footer_length
+
+
+def read_footer(source: BinaryIO) -> Dict[str, Any]:
+    """
+    Load the footer of a version 2 container without reading the block index.
+
+    Args:
+        source: Seekable binary stream over the container
+
+    Returns:
+        Parsed footer dictionary
+    """
+    index_offset, block_count, footer_length = _read_trailer(source)
+    source.seek(index_offset + block_count * _INDEX_ENTRY.size)
+    return json.loads(source.read(footer_length).decode())
+
+
+def read_metadata(source: BinaryIO) -> Dict[str, Any]:
+    """
+    Load the header and footer of a container without reading any block data.
+
+    Version 1 containers have no footer; their original size is summed from
+    the frame headers instead.
+
+    Args:
+        source: Seekable binary stream positioned at the start of the container
+
+    Returns:
+        Parsed header dictionary with the footer under 'footer'
+    """
+    header = read_header(source)
+    if header['version'] >= 2:
+        header['footer'] = read_footer(source)
+    else:
+        header['footer'] = {'original_size': sum(entry.raw_length for entry in _scan_index(source))}
+    return header
+
+
+def _scan_index(source: BinaryIO) -> List[BlockEntry]:
+    """Rebuild the block index of a version 1 container by seeking over frames."""
+    entries = []
+    raw_offset = 0
+    while True:
+        frame = source.read(_FRAME.size)
+        if len(frame) < _FRAME.size:
+            raise ValueError("Truncated container: missing end marker")
+        raw_length, compressed_length = _FRAME.unpack(frame)
+        if raw_length == 0 and compressed_length == 0:
+            return entries
+        data_offset = source.tell()
+        entries.append(BlockEntry(raw_offset, raw_length, data_offset, compressed_length))
+        raw_offset += raw_length
+        source.seek(compressed_length, os.SEEK_CUR)
+
+
+def load_header_dictionary(header: Dict[str, Any],
+                           load_dictionary: Optional[DictionaryLoader]) -> Optional[bytes]:
+    """Return the shared dictionary a container header refers to, if any."""
+    if 'dictionary' not in header:
+        return None
+    if load_dictionary is None:
+        raise ValueError(f"Container needs shared dictionary {header['dictionary']}")
+    return load_dictionary(header['dictionary'])
+
+
+def read_block(source: BinaryIO, codec: Codec, entry: BlockEntry,
+               dictionary: Optional[bytes] = None) -> bytes:
+    """Read and inflate a single block described by an index entry."""
+    source.seek(entry.data_offset)
+    compressed = source.read(entry.compressed_length)
+    if len(compressed) < entry.compressed_length:
+        raise ValueError("Truncated container block")
+    return _decompress_block(codec, entry.raw_length, compressed, dictionary)
+
+
+def _read_frames(source: BinaryIO) -> Iterator[tuple]:
+    """Yield (raw_length, compressed_data) for each block until the end marker."""
+    while True:
+        frame = source.read(_FRAME.size)
+        if len(frame) < _FRAME.size:
+            raise ValueError("Truncated container: missing end marker")
+        raw_length, compressed_length = _FRAME.unpack(frame)
+        if raw_length == 0 and compressed_length == 0:
+            return
+        compressed = source.read(compressed_length)
+        if len(compressed) < compressed_length:
+            raise ValueError("Truncated container block")
+        yield raw_length, compressed
+
+
+def _decompress_block(codec: Codec, raw_length: int, compressed: bytes,
+                      dictionary: Optional[bytes] = None) -> bytes:
+    """Inflate one block and check it against its recorded length."""
+    data = codec.decompress(compressed, raw_length, dictionary)
+    if len(data) != raw_length:
+        raise ValueError("Corrupt container block: length mismatch")
+    return data
+
+
+def read_container(source: BinaryIO, target: Optional[BinaryIO], max_workers: int = 1,
+                   on_progress: Optional[ProgressCallback] = None,
+                   load_dictionary: Optional[DictionaryLoader] = None) -> Dict[str, Any]:
+    """
+    Decompress a block container from source into target.
+
+    The original size and checksum recorded in the footer are checked once
+    every block is out; a mismatch raises ValueError. If the checksum's
+    algorithm isn't available here (xxh64 without the xxhash package), only
+    the size is checked and the header gets 'checksum_skipped' set to its name.
+
+    Args:
+        source: Seekable binary stream positioned at the start of the container
+        target: Writable binary stream for the original data; None discards it (verification)
+        max_workers: Number of threads decompressing blocks concurrently
+        on_progress: Called with the compressed size of every block written out
+        load_dictionary: Resolves the shared dictionary named in the header, if any
+
+    Returns:
+        Parsed header dictionary, including the footer for version 2 containers
+    """
+    header = read_header(source)
+    codec = get_codec(header.get('codec', 'zlib'))
+    dictionary = load_header_dictionary(header, load_dictionary)
+    if header['version'] >= 2:
+        data_start = source.tell()
+        header['footer'] = read_footer(source)
+        source.seek(data_start)
+    expected = header.get('footer', {}).get('checksum')
+    if expected and not is_available(expected['algorithm']):
+        header['checksum_skipped'] = expected['algorithm']
+        expected = None
+    digest = new_checksum(expected['algorithm']) if expected else None
+    if target is not None and 'original_size' in header.get('footer', {}):
+        preallocate(target, header['footer']['original_size'])
+
+    def decompress_frame(frame: tuple) -> Tuple[bytes, int]:
+        raw_length, compressed = frame
+        return (_decompress_block(codec, raw_length, compressed, dictionary),
+                _FRAME.size + len(compressed))
+
+    original_size = 0
+    for data, consumed in _ordered_map(decompress_frame, _read_frames(source), max_workers):
+        if digest is not None:
+            digest.update(data)
+        if target is not None:
+            target.write(data)
+        original_size += len(data)
+        if on_progress is not None:
+            on_progress(consumed)
+
+    footer = header.get('footer', {})
+    if 'original_size' in footer and footer['original_size'] != original_size:
+        raise ValueError("Corrupt container: original size mismatch")
+    if digest is not None and digest.hexdigest() != expected['value']:
+        raise ValueError(f"Corrupt container: {digest.name} checksum mismatch")
+    return header
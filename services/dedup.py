@@ -0,0 +1,211 @@
+import hashlib
+import os
+import stat
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from config import (
+    COMPRESSED_EXTENSION, DEDUP_HASH_WORKERS, DEDUP_MIN_SIZE, DEDUP_PREFIX_BYTES, DEDUP_STORE_NAME
+)
+from services.scanner import ScanEntry
+
+_READ_SIZE = 1024 * 1024
+
+
+class FileSignature(NamedTuple):
+    """Size and mtime of a file when it was hashed, to detect later changes."""
+    size: int
+    mtime_ns: int
+
+
+class DedupGroup(NamedTuple):
+    """Files with identical content and metadata, to be stored once in the content-addressed store."""
+    store: Path
+    digest: str
+    paths: List[Path]
+    signatures: List[FileSignature]
+    metadata_key: str = ""
+
+
+def hash_file(filepath: Path, limit: Optional[int] = None) -> str:
+    """
+    Hash a file's content (or its first limit bytes) with BLAKE2b.
+
+    Args:
+        filepath: File to hash
+        limit: Only hash this many leading bytes
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    remaining = limit
+    with open(filepath, "rb") as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(_READ_SIZE if remaining is None else min(_READ_SIZE, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+class HashingReader:
+    """File wrapper that hashes everything read through it."""
+
+    def __init__(self, file):
+        self._file = file
+        self._digest = hashlib.blake2b(digest_size=20)
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self._digest.update(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def signature_of(stat: os.stat_result) -> FileSignature:
+    """Capture the parts of a stat result that change when a file is rewritten."""
+    return FileSignature(stat.st_size, stat.st_mtime_ns)
+
+
+def metadata_key(file_stat: os.stat_result) -> str:
+    """
+    Identify the metadata a shared blob restores to every copy.
+
+    Copies only share a blob if their permission bits, mtime and owner all
+    match, so decompressing any of them restores exactly its own metadata.
+    """
+    identity = (f"{stat.S_IMODE(file_stat.st_mode)}:{file_stat.st_mtime_ns}:"
+                f"{file_stat.st_uid}:{file_stat.st_gid}")
+    return hashlib.blake2b(identity.encode(), digest_size=8).hexdigest()
+
+
+class DedupStore:
+    """
+    Content-addressed store of compressed blobs under a scan root.
+
+    Blobs live in <root>/.coldcompress-store/<ab>/<digest>-<metadata key>.zz
+    and are ordinary block containers. Each duplicate's .zz file is a hardlink to
+    its blob, so decompression needs no special handling. A blob whose
+    link count has dropped to one is no longer referenced.
+    """
+
+    def __init__(self, root: Path):
+        self.path = Path(root) / DEDUP_STORE_NAME
+
+    @staticmethod
+    def blob_path(store: Path, digest: str, metadata_key: str = "") -> Path:
+        """Return where the blob for a content digest and metadata key is stored."""
+        name = f"{digest}-{metadata_key}" if metadata_key else digest
+        return store / digest[:2] / f"{name}{COMPRESSED_EXTENSION}"
+
+    def collect_garbage(self) -> int:
+        """
+        Delete blobs that no .zz file links to any more.
+
+        Returns:
+            Number of blobs removed
+        """
+        if not self.path.is_dir():
+            return 0
+        removed = 0
+        for blob in self.path.glob(f"*/*{COMPRESSED_EXTENSION}"):
+            try:
+                if blob.stat().st_nlink <= 1:
+                    blob.unlink()
+                    removed += 1
+            except OSError:
+                continue
+        for shard in self.path.iterdir():
+            try:
+                shard.rmdir()  # Only succeeds once empty
+            except OSError:
+                pass
+        try:
+            self.path.rmdir()
+        except OSError:
+            pass
+        return removed
+
+
+def find_duplicates(entries: Iterable[ScanEntry], store: Path, min_size: int = DEDUP_MIN_SIZE,
+                    workers: int = DEDUP_HASH_WORKERS) -> Tuple[List[DedupGroup], List[ScanEntry]]:
+    """
+    Split scan entries into groups of identical files and the remaining unique files.
+
+    Files are grouped by size first; only same-size files are hashed, first
+    by a prefix and then in full, so unique files are rarely read at all.
+    Identical files whose permission bits, mtime or owner differ are kept
+    in separate groups, as every copy restores the metadata of its blob.
+    Hashing bumps atimes, so unique entries keep their scan stat for
+    compress_file to record.
+
+    Args:
+        entries: Cold candidates from the scanner (with stat populated)
+        store: Content-addressed store directory the groups will use
+        min_size: Smaller files are never deduplicated
+        workers: Threads hashing files concurrently
+
+    Returns:
+        Tuple of (duplicate groups, unique entries in scan order)
+    """
+    entries = list(entries)
+    by_size: Dict[int, List[ScanEntry]] = defaultdict(list)
+    for entry in entries:
+        if entry.size >= min_size:
+            by_size[entry.size].append(entry)
+    same_size = [group for group in by_size.values() if len(group) > 1]
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        prefix_groups = _split_by_hash(pool, same_size, DEDUP_PREFIX_BYTES)
+        full_groups = _split_by_hash(
+            pool, [group for _, group in prefix_groups if group[0].size > DEDUP_PREFIX_BYTES], None
+        )
+    # Files no longer than the prefix were hashed completely already
+    full_groups += [(digest, group) for digest, group in prefix_groups
+                    if group[0].size <= DEDUP_PREFIX_BYTES]
+
+    groups = []
+    duplicated = set()
+    for digest, group in full_groups:
+        by_metadata: Dict[str, List[ScanEntry]] = defaultdict(list)
+        for entry in group:
+            by_metadata[metadata_key(entry.stat)].append(entry)
+        for key, copies in by_metadata.items():
+            if len(copies) < 2:
+                continue
+            groups.append(DedupGroup(
+                store, digest,
+                [entry.path for entry in copies],
+                [signature_of(entry.stat) for entry in copies],
+                key
+            ))
+            duplicated.update(entry.path for entry in copies)
+    return groups, [entry for entry in entries if entry.path not in duplicated]
+
+
+def _split_by_hash(pool: ThreadPoolExecutor, groups: List[List[ScanEntry]],
+                   limit: Optional[int]) -> List[Tuple[str, List[ScanEntry]]]:
+    """Refine candidate groups by content hash, keeping only hashes shared by two or more files."""
+    candidates = [entry for group in groups for entry in group]
+    digests = pool.map(lambda entry: _try_hash(entry.path, limit), candidates)
+
+    by_hash: Dict[Tuple[int, str], List[ScanEntry]] = defaultdict(list)
+    for entry, digest in zip(candidates, digests):
+        if digest is not None:
+            by_hash[(entry.size, digest)].append(entry)
+    return [(digest, group) for (_, digest), group in by_hash.items() if len(group) > 1]
+
+
+def _try_hash(filepath: Path, limit: Optional[int]) -> Optional[str]:
+    """Hash a file, or return None if it can't be read."""
+    try:
+        return hash_file(filepath, limit)
+    except OSError:
+        return None
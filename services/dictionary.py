@@ -0,0 +1,264 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+from config import (
+    COMPRESSED_EXTENSION, DICTIONARY_EXTENSION, DICTIONARY_GC_MIN_AGE, DICTIONARY_MAX_FILE_SIZE,
+    DICTIONARY_MIN_SAMPLES, DICTIONARY_PREFIX, DICTIONARY_SAMPLE_FILES, DICTIONARY_SIZE, TEMP_SUFFIX
+)
+from services.journal import atomic_write
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency
+    zstandard = None
+
+
+class SharedDictionary(NamedTuple):
+    """A preset dictionary and the ID container headers refer to it by."""
+    id: str
+    data: bytes
+
+
+def dictionary_id(data: bytes) -> str:
+    """Derive the content-addressed ID of a dictionary."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def is_dictionary_file(name: str) -> bool:
+    """Return True if a file name belongs to a stored dictionary."""
+    return name.startswith(DICTIONARY_PREFIX) and name.endswith(DICTIONARY_EXTENSION)
+
+
+def _id_of(name: str) -> str:
+    """Return the dictionary ID in a dictionary file name."""
+    return name[len(DICTIONARY_PREFIX):-len(DICTIONARY_EXTENSION)]
+
+
+def train_dictionary(samples: List[bytes], size: int = DICTIONARY_SIZE) -> bytes:
+    """
+    Build a preset dictionary from sample files.
+
+    Uses zstd's trainer when the zstandard package is installed. The stdlib
+    fallback is a raw-content dictionary: whole samples concatenated, which
+    deflate matches against directly. Whole files beat fragments because
+    small files repeat their neighbours' structure as well as their strings.
+
+    Args:
+        samples: Contents of representative files
+        size: Maximum dictionary size in bytes
+
+    Returns:
+        Dictionary bytes, usable as a zlib zdict or zstd dictionary
+    """
+    if zstandard is not None:
+        try:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        except zstandard.ZstdError:
+            # Too few or too uniform samples; the fallback copes with those
+            pass
+
+    content = bytearray()
+    for sample in samples:
+        if len(content) >= size:
+            break
+        content += sample
+    return bytes(content[-size:])
+
+
+class DictionaryStore:
+    """
+    Per-directory shared dictionaries for small files.
+
+    A dictionary is trained from a sample of the small files in a directory
+    the first time one of them is compressed, then stored beside them as
+    .coldcompress-<id>.dict. Container headers record the ID, and a .zz file
+    can only be decompressed next to its dictionary.
+
+    Once no .zz file refers to a dictionary any more, collect_garbage()
+    deletes it. Dictionaries in use are touched at least every gc_min_age / 2
+    seconds, and only those left untouched for gc_min_age are deleted, so a
+    run still compressing against a dictionary never loses it.
+    """
+
+    def __init__(self, max_file_size: int = DICTIONARY_MAX_FILE_SIZE,
+                 size: int = DICTIONARY_SIZE, min_samples: int = DICTIONARY_MIN_SAMPLES,
+                 sample_files: int = DICTIONARY_SAMPLE_FILES, gc_min_age: float = DICTIONARY_GC_MIN_AGE):
+        """
+        Args:
+            max_file_size: Largest file that is compressed with a dictionary
+            size: Maximum dictionary size in bytes
+            min_samples: Fewest small files a directory needs to get a dictionary
+            sample_files: Most files read when training
+            gc_min_age: Seconds a dictionary must go unused before collect_garbage() may delete it
+        """
+        self.max_file_size = max_file_size
+        self.size = size
+        self.min_samples = min_samples
+        self.sample_files = sample_files
+        self.gc_min_age = gc_min_age
+        # Per-process cache: directory -> dictionary, or None if it cannot have one
+        self._by_directory: Dict[str, Optional[SharedDictionary]] = {}
+        self._by_id: Dict[str, bytes] = {}
+        self._touched: Dict[str, float] = {}  # directory -> when its dictionary was last touched
+
+    def __getstate__(self):
+        # Worker processes start with empty caches
+        state = dict(self.__dict__)
+        state['_by_directory'] = {}
+        state['_by_id'] = {}
+        state['_touched'] = {}
+        return state
+
+    @staticmethod
+    def path_for(directory: Path, dict_id: str) -> Path:
+        """Return where the dictionary with dict_id is stored in directory."""
+        return directory / f"{DICTIONARY_PREFIX}{dict_id}{DICTIONARY_EXTENSION}"
+
+    def load(self, directory: Path, dict_id: str) -> bytes:
+        """
+        Load a stored dictionary by ID.
+
+        Args:
+            directory: Directory of the .zz file that refers to it
+            dict_id: ID recorded in the container header
+
+        Returns:
+            Dictionary bytes
+        """
+        if dict_id not in self._by_id:
+            try:
+                data = self.path_for(directory, dict_id).read_bytes()
+            except FileNotFoundError:
+                raise ValueError(f"Dictionary {dict_id} not found in {directory}") from None
+            if dictionary_id(data) != dict_id:
+                raise ValueError(f"Dictionary {dict_id} in {directory} is corrupt")
+            self._by_id[dict_id] = data
+        return self._by_id[dict_id]
+
+    def for_file(self, filepath: Path, size: int) -> Optional[SharedDictionary]:
+        """
+        Return the dictionary to compress a file with, training one if needed.
+
+        Args:
+            filepath: File about to be compressed
+            size: File size in bytes
+
+        Returns:
+            Shared dictionary, or None if the file is too large or its
+            directory has too few small files
+        """
+        if size > self.max_file_size:
+            return None
+        directory = os.path.dirname(os.path.abspath(filepath))
+        if directory not in self._by_directory:
+            self._by_directory[directory] = self._existing(Path(directory)) or self._train(Path(directory))
+        shared = self._by_directory[directory]
+        if shared is not None:
+            self._keep_alive(directory, shared)
+        return shared
+
+    def _keep_alive(self, directory: str, shared: SharedDictionary):
+        """Refresh a cached dictionary's mtime now and then, restoring it if it was collected."""
+        now = time.monotonic()
+        if now - self._touched.get(directory, float("-inf")) < self.gc_min_age / 2:
+            return
+        path = self.path_for(Path(directory), shared.id)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with atomic_write(path, shared=True) as f:
+                f.write(shared.data)
+        self._touched[directory] = now
+
+    def collect_garbage(self, root: Path, referenced: Callable[[Path], Optional[Set[str]]]) -> int:
+        """
+        Delete dictionaries under root that no .zz file refers to any more.
+
+        Args:
+            root: Folder to clean up
+            referenced: Returns the dictionary IDs the .zz files of a directory
+                refer to, or None if they can't all be read (nothing is deleted then)
+
+        Returns:
+            Number of dictionaries removed
+        """
+        removed = 0
+        cutoff = time.time() - self.gc_min_age
+        for directory, _, names in os.walk(root):
+            stored = [name for name in names if is_dictionary_file(name)]
+            if not stored:
+                continue
+            in_use = referenced(Path(directory))
+            if in_use is None:
+                continue
+            for name in stored:
+                path = Path(directory) / name
+                try:
+                    if _id_of(name) in in_use or path.stat().st_mtime > cutoff:
+                        continue
+                    path.unlink()
+                    removed += 1
+                except OSError:
+                    continue
+                self._by_directory.pop(directory, None)
+                self._by_id.pop(_id_of(name), None)
+        return removed
+
+    def _existing(self, directory: Path) -> Optional[SharedDictionary]:
+        """Reuse the newest dictionary already stored in a directory."""
+        stored = sorted(directory.glob(f"{DICTIONARY_PREFIX}*{DICTIONARY_EXTENSION}"),
+                        key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in stored:
+            dict_id = _id_of(path.name)
+            try:
+                return SharedDictionary(dict_id, self.load(directory, dict_id))
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def _train(self, directory: Path) -> Optional[SharedDictionary]:
+        """Train and store a dictionary from the small files of a directory."""
+        samples = self._collect_samples(directory)
+        if len(samples) < self.min_samples:
+            return None
+        data = train_dictionary(samples, self.size)
+        if not data:
+            return None
+
+        shared = SharedDictionary(dictionary_id(data), data)
+        # Workers compressing the same directory may train the same dictionary at once
+        with atomic_write(self.path_for(directory, shared.id), shared=True) as f:
+            f.write(data)
+        self._by_id[shared.id] = data
+        return shared
+
+    def _collect_samples(self, directory: Path) -> List[bytes]:
+        """
+        Read up to sample_files small, uncompressed files from a directory.
+
+        This bumps their atimes before they are compressed; the pipeline hands
+        compress_file the scan's stat so the original atimes are still recorded.
+        """
+        samples = []
+        try:
+            with os.scandir(directory) as iterator:
+                for entry in iterator:
+                    if len(samples) >= self.sample_files:
+                        break
+                    name = entry.name
+                    if (name.endswith(COMPRESSED_EXTENSION) or name.endswith(TEMP_SUFFIX)
+                            or is_dictionary_file(name)):
+                        continue
+                    try:
+                        if not entry.is_file() or entry.stat().st_size > self.max_file_size:
+                            continue
+                        with open(entry.path, "rb") as f:
+                            samples.append(f.read(self.max_file_size))
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return [sample for sample in samples if sample]
@@ -0,0 +1,163 @@
+"""
+Local HTTP shim serving a folder of compressed files as if they were unpacked.
+
+GET /some/dir/report.csv answers with the original data of report.csv.zz (or
+of the report.csv member of the directory's pack), read through a
+DecompressionCache. Files that aren't compressed are served as they are.
+GET /_stats returns the cache counters as JSON.
+
+Meant for local applications only: it binds to localhost by default and
+serves nothing outside its root.
+"""
+import json
+import mimetypes
+import os
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from config import CHUNK_SIZE, COMPRESSED_EXTENSION, SERVE_HOST, SERVE_PORT
+from services.read_cache import DecompressionCache
+
+STATS_PATH = "/_stats"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves GET and HEAD requests from the server's root through its cache."""
+
+    server: "ColdFileServer"
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _respond(self, send_body: bool):
+        request_path = unquote(urlsplit(self.path).path)
+        if request_path == STATS_PATH:
+            stats = self.server.cache.stats
+            body = json.dumps({**stats._asdict(), 'hit_rate': stats.hit_rate}).encode()
+            self._send_headers(HTTPStatus.OK, "application/json", len(body))
+            if send_body:
+                self.wfile.write(body)
+            return
+
+        path = self.server.resolve(request_path)
+        if path is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        try:
+            stream = self.server.open(path)
+        except FileNotFoundError:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        except Exception as e:
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"Cannot read {path.name}: {e}")
+            return
+
+        with stream:
+            size = stream.seek(0, os.SEEK_END)
+            content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            byte_range = self._byte_range(size)
+            if byte_range is None:
+                self.send_error(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                return
+            start, end = byte_range
+            if (start, end) == (0, size):
+                self._send_headers(HTTPStatus.OK, content_type, size)
+            else:
+                self._send_headers(HTTPStatus.PARTIAL_CONTENT, content_type, end - start,
+                                   f"bytes {start}-{end - 1}/{size}")
+            if send_body:
+                stream.seek(start)
+                self._copy(stream, end - start)
+
+    def _byte_range(self, size: int) -> Optional[Tuple[int, int]]:
+        """Parse a single-range Range header into [start, end); the whole file if absent."""
+        header = self.headers.get("Range")
+        if not header or not header.startswith("bytes=") or "," in header:
+            return 0, size
+        first, _, last = header[len("bytes="):].partition("-")
+        try:
+            if not first:
+                start, end = max(0, size - int(last)), size
+            else:
+                start, end = int(first), min(size, int(last) + 1) if last else size
+        except ValueError:
+            return 0, size
+        return (start, end) if start < end else None
+
+    def _send_headers(self, status: HTTPStatus, content_type: str, length: int,
+                      content_range: Optional[str] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        if content_range is not None:
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+
+    def _copy(self, stream: BinaryIO, length: int):
+        while length > 0:
+            chunk = stream.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            self.wfile.write(chunk)
+            length -= len(chunk)
+
+
+class ColdFileServer(ThreadingHTTPServer):
+    """Threaded HTTP server exposing one folder through a DecompressionCache."""
+
+    daemon_threads = True
+
+    def __init__(self, root: Path, cache: Optional[DecompressionCache] = None,
+                 host: str = SERVE_HOST, port: int = SERVE_PORT, verbose: bool = False):
+        """
+        Args:
+            root: Folder to serve
+            cache: Cache compressed files are read through
+            host: Address to bind
+            port: Port to listen on (0 picks a free one)
+            verbose: Log every request to stderr
+        """
+        self.root = Path(os.path.realpath(root))
+        self.cache = cache or DecompressionCache()
+        self.verbose = verbose
+        super().__init__((host, port), _Handler)
+
+    def resolve(self, request_path: str) -> Optional[Path]:
+        """Map a URL path to a file path under root; None if it would escape root."""
+        path = Path(os.path.realpath(self.root / request_path.lstrip("/")))
+        if path != self.root and self.root not in path.parents:
+            return None
+        return path
+
+    def open(self, path: Path) -> BinaryIO:
+        """Open a plain file directly, or a compressed one through the cache."""
+        if path.is_file() and not path.name.endswith(COMPRESSED_EXTENSION):
+            return open(path, "rb")
+        return self.cache.open(path)
+
+
+def serve(root: Path, host: str = SERVE_HOST, port: int = SERVE_PORT,
+          cache: Optional[DecompressionCache] = None, verbose: bool = False) -> None:
+    """
+    Serve root until interrupted.
+
+    Args:
+        root: Folder to serve
+        host: Address to bind
+        port: Port to listen on
+        cache: Cache compressed files are read through
+        verbose: Log every request to stderr
+    """
+    with ColdFileServer(root, cache, host, port, verbose) as server:
+        server.serve_forever()
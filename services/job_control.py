@@ -0,0 +1,161 @@
+import ctypes
+import multiprocessing
+import os
+import platform
+import sys
+import threading
+import time
+
+from config import JOB_BANDWIDTH_LIMIT, JOB_CPU_SHARE, JOB_LOW_PRIORITY, JOB_PAUSE_POLL
+
+# ioprio_set syscall numbers by architecture; the libc wrapper is not exported
+_IOPRIO_SET = {'x86_64': 251, 'aarch64': 30, 'arm64': 30, 'i386': 289, 'i686': 289}
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+_IOPRIO_WHO_PROCESS = 1
+
+_THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a running operation when its job has been cancelled.
+
+    Like KeyboardInterrupt it is not an Exception, so the per-file error
+    handling in the service lets it through; atomic writes and the journal
+    still clean up, leaving the interrupted file untouched.
+    """
+
+
+def lower_priority():
+    """
+    Drop the calling thread to background CPU and I/O priority.
+
+    On Linux niceness and I/O priority are per thread and inherited by
+    threads started afterwards; on Windows the thread enters background
+    mode, which lowers both. Failures are ignored: a job that can't lower
+    its priority still runs.
+    """
+    try:
+        if sys.platform == "win32":
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), _THREAD_MODE_BACKGROUND_BEGIN)
+            return
+        os.nice(10)
+        syscall = _IOPRIO_SET.get(platform.machine())
+        if sys.platform.startswith("linux") and syscall is not None:
+            libc = ctypes.CDLL(None, use_errno=True)
+            libc.syscall(syscall, _IOPRIO_WHO_PROCESS, 0, _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT)
+    except (AttributeError, OSError):
+        pass
+
+
+class JobController:
+    """
+    Cancel, pause and throttle one run from any thread.
+
+    Workers call start_operation() before each file and checkpoint() after
+    each chunk. That is where cancellation is raised, where a paused job
+    waits, and where the bandwidth and CPU-share limits sleep. The state
+    lives in multiprocessing primitives, so the same controller works in
+    thread and process pools.
+    """
+
+    def __init__(self, bandwidth_limit: float = JOB_BANDWIDTH_LIMIT,
+                 cpu_share: float = JOB_CPU_SHARE, low_priority: bool = JOB_LOW_PRIORITY):
+        """
+        Args:
+            bandwidth_limit: Input MB/s shared by all workers; 0 for no limit
+            cpu_share: Fraction of its time each worker may spend working (0-1]
+            low_priority: Run workers at background CPU and I/O priority
+        """
+        self.bandwidth_limit = bandwidth_limit
+        self.cpu_share = min(max(cpu_share, 0.01), 1.0)
+        self.low_priority = low_priority
+        self._cancelled = multiprocessing.Event()
+        self._running = multiprocessing.Event()
+        self._running.set()
+        # Earliest time the next byte may be read under the bandwidth limit
+        self._next_slot = multiprocessing.Value('d', 0.0)
+        self._local = threading.local()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def cancel(self):
+        """Stop the job: queued files are dropped and running ones stop at their next chunk."""
+        self._cancelled.set()
+        self._running.set()
+
+    def pause(self):
+        """Hold every worker at its next checkpoint until resume() or cancel()."""
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def wait_while_paused(self) -> bool:
+        """
+        Block while the job is paused.
+
+        Returns:
+            False if the job was cancelled
+        """
+        while not self._running.wait(JOB_PAUSE_POLL):
+            pass
+        return not self.cancelled
+
+    def start_operation(self):
+        """Checkpoint before a file starts; time spent waiting for it doesn't count as work."""
+        self._local.resumed = None
+        self.checkpoint()
+
+    def checkpoint(self, count: int = 0):
+        """
+        Honor cancel, pause and the throttles after count input bytes were handled.
+
+        Raises:
+            JobCancelled: If the job was cancelled
+        """
+        if self.paused:
+            self._local.resumed = None  # Time spent paused is not work
+            self.wait_while_paused()
+        if self.cancelled:
+            raise JobCancelled()
+        if count and self.bandwidth_limit > 0:
+            self._throttle_bandwidth(count)
+        if self.cpu_share < 1.0:
+            self._throttle_cpu()
+
+    def _throttle_bandwidth(self, count: int):
+        """Reserve the time count bytes take at the shared rate, and sleep until it comes."""
+        duration = count / (self.bandwidth_limit * 1024 * 1024)
+        with self._next_slot.get_lock():
+            now = time.monotonic()
+            start = max(now, self._next_slot.value)
+            self._next_slot.value = start + duration
+        if start > now:
+            time.sleep(start - now)
+
+    def _throttle_cpu(self):
+        """Sleep long enough that work since the previous checkpoint is cpu_share of the time."""
+        now = time.monotonic()
+        resumed = getattr(self._local, 'resumed', None)
+        if resumed is not None:
+            worked = now - resumed
+            time.sleep(worked * (1.0 - self.cpu_share) / self.cpu_share)
+        self._local.resumed = time.monotonic()
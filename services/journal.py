@@ -0,0 +1,270 @@
+import hashlib
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+from config import FSYNC_WRITES, JOURNAL_DIR, TEMP_SUFFIX
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+
+STAGE_STARTED = "started"
+STAGE_COMMITTED = "committed"
+
+_OWNER_SUFFIX = ".lock"
+
+# Tells whether a .zz file (first argument) holds exactly the data of a plain file (second)
+OriginalCheck = Callable[[Path, Path], bool]
+
+
+def temp_path_for(target: Path) -> Path:
+    """Return the temporary path a target is written to before it is renamed into place."""
+    return target.with_name(target.name + TEMP_SUFFIX)
+
+
+def fsync_directory(directory: Path):
+    """Persist a rename by syncing its directory (POSIX only)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_write(target: Path, fsync: bool = FSYNC_WRITES, shared: bool = False) -> Iterator[BinaryIO]:
+    """
+    Open a temporary file that replaces target only if the block completes.
+
+    The data is flushed and fsync'ed before an atomic rename, so target is
+    either its old content or the complete new content, never a partial file.
+
+    Args:
+        target: Final path of the file
+        fsync: Force data and the rename to disk
+        shared: Several workers may write target at once; give each its own temporary file
+    """
+    temp = temp_path_for(target)
+    if shared:
+        temp = temp.with_name(f"{target.name}.{uuid.uuid4().hex[:8]}{TEMP_SUFFIX}")
+    try:
+        with open(temp, "wb") as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp, target)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+    if fsync:
+        fsync_directory(target.parent)
+
+
+def link_atomically(source: Path, target: Path, fsync: bool = FSYNC_WRITES):
+    """
+    Make target a hardlink to source, replacing any existing target atomically.
+
+    Args:
+        source: Existing file to link to
+        target: Path of the new link
+        fsync: Force the new directory entry to disk
+    """
+    temp = temp_path_for(target)
+    temp.unlink(missing_ok=True)
+    os.link(source, temp)
+    try:
+        os.replace(temp, target)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+    if fsync:
+        fsync_directory(target.parent)
+
+
+def _try_lock(handle: BinaryIO) -> bool:
+    """Take an exclusive lock on an open file without waiting; False if someone else holds it."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+class OperationJournal:
+    """
+    Write-ahead journal of in-flight file replacements.
+
+    Each compression or decompression gets a small entry file that exists only
+    while the operation runs: it is written before the output, marked committed
+    once the output has been renamed into place, and deleted after the source
+    is removed. Entry files are independent, so worker processes can journal
+    concurrently without coordination. recover() finishes or rolls back
+    whatever a crash left behind.
+
+    Every process writing entries holds a lock file in the journal directory
+    for as long as it lives, and its entries name that file. recover() leaves
+    entries of processes that still hold their lock alone, so a second run
+    never touches the temporary files of operations still in flight.
+    """
+
+    def __init__(self, journal_dir: Path = JOURNAL_DIR, fsync: bool = FSYNC_WRITES):
+        self.journal_dir = journal_dir
+        self.fsync = fsync
+        self._owner: Optional[Tuple[int, BinaryIO, str]] = None  # pid, lock file, lock name
+
+    def __getstate__(self):
+        # Worker processes take their own lock
+        state = dict(vars(self))
+        state['_owner'] = None
+        return state
+
+    def _owner_name(self) -> str:
+        """Return the name of this process's lock file, creating and locking it on first use."""
+        if self._owner is None or self._owner[0] != os.getpid():
+            self.journal_dir.mkdir(parents=True, exist_ok=True)
+            name = f"owner-{os.getpid()}-{uuid.uuid4().hex[:8]}{_OWNER_SUFFIX}"
+            path = self.journal_dir / name
+            if fcntl is not None:
+                # Lock before the file appears under its name, so it is never seen unlocked
+                temp = path.with_name(name + TEMP_SUFFIX)
+                handle = open(temp, "a+b")
+                _try_lock(handle)
+                os.replace(temp, path)
+            else:
+                # Windows can't delete an open file, so nobody removes it before it is locked
+                handle = open(path, "a+b")
+                _try_lock(handle)
+            self._owner = (os.getpid(), handle, name)
+        return self._owner[2]
+
+    def _owner_alive(self, name: str) -> bool:
+        """Return True if the process that wrote entries under a lock name still runs."""
+        if self._owner is not None and self._owner[0] == os.getpid() and self._owner[2] == name:
+            return True
+        try:
+            with open(self.journal_dir / name, "rb") as handle:
+                # Closing the handle releases the lock again
+                return not _try_lock(handle)
+        except OSError:
+            return False
+
+    def _remove_stale_owners(self):
+        """Delete lock files left by processes that have exited."""
+        for path in self.journal_dir.glob(f"owner-*{_OWNER_SUFFIX}"):
+            if not self._owner_alive(path.name):
+                path.unlink(missing_ok=True)
+
+    def _entry_path(self, source: Path) -> Path:
+        digest = hashlib.sha1(os.fsencode(os.path.abspath(source))).hexdigest()
+        return self.journal_dir / f"{digest}.json"
+
+    def _write_entry(self, path: Path, entry: dict):
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        with atomic_write(path, self.fsync) as f:
+            f.write(json.dumps(entry).encode())
+
+    def begin(self, operation: str, source: Path, target: Path) -> Path:
+        """
+        Record that source is about to be replaced by target.
+
+        Returns:
+            Token identifying the journal entry
+        """
+        token = self._entry_path(source)
+        self._write_entry(token, {
+            'operation': operation,
+            'source': os.path.abspath(source),
+            'target': os.path.abspath(target),
+            'stage': STAGE_STARTED,
+            'owner': self._owner_name()
+        })
+        return token
+
+    def commit(self, token: Path):
+        """Record that the target is complete and in place, so the source may go."""
+        entry = json.loads(token.read_text())
+        entry['stage'] = STAGE_COMMITTED
+        self._write_entry(token, entry)
+
+    def complete(self, token: Path):
+        """Forget a finished (or cleanly failed) operation."""
+        token.unlink(missing_ok=True)
+
+    def recover(self, holds_original: Optional[OriginalCheck] = None) -> List[str]:
+        """
+        Finish or roll back operations interrupted by a crash.
+
+        Committed operations are rolled forward by removing the source. Started
+        ones lose their partial temporary output; if the target was already
+        renamed into place, the operation is rolled forward when holds_original
+        confirms the target matches the source, and both files are otherwise
+        kept and reported. Operations of processes that are still running are
+        skipped.
+
+        Args:
+            holds_original: Checks that a .zz file holds exactly a plain file's data
+
+        Returns:
+            Messages describing each recovered operation
+        """
+        if not self.journal_dir.is_dir():
+            return []
+
+        messages = []
+        for token in sorted(self.journal_dir.glob("*.json")):
+            try:
+                entry = json.loads(token.read_text())
+            except (OSError, ValueError):
+                token.unlink(missing_ok=True)
+                continue
+            if entry.get('owner') and self._owner_alive(entry['owner']):
+                continue
+
+            source, target = Path(entry['source']), Path(entry['target'])
+            try:
+                if entry['stage'] == STAGE_COMMITTED:
+                    if source.exists() and target.exists():
+                        os.remove(source)
+                    messages.append(f"♻️ Finished interrupted {entry['operation']}: {target.name}")
+                else:
+                    temp_path_for(target).unlink(missing_ok=True)
+                    messages.append(self._recover_started(entry, source, target, holds_original))
+                token.unlink(missing_ok=True)
+            except OSError as e:
+                messages.append(f"❌ Could not recover {entry['operation']} of {source}: {e}")
+        self._remove_stale_owners()
+        return messages
+
+    @staticmethod
+    def _recover_started(entry: dict, source: Path, target: Path,
+                         holds_original: Optional[OriginalCheck]) -> str:
+        """Settle an operation that crashed before it was committed; return what was done."""
+        operation = entry['operation']
+        if not target.exists():
+            return f"♻️ Rolled back interrupted {operation}: {source.name}"
+        if not source.exists():
+            # Renamed into place and source removed; only the journal entry was left
+            return f"♻️ Finished interrupted {operation}: {target.name}"
+
+        # The crash hit between the rename and the commit, or target was there before
+        compressed, plain = (source, target) if operation == "decompression" else (target, source)
+        if holds_original is not None and holds_original(compressed, plain):
+            os.remove(source)
+            return f"♻️ Finished interrupted {operation}: {target.name}"
+        return (f"⚠️ Interrupted {operation} of {source.name} left {target.name} as well, "
+                f"and it does not match; kept both")
@@ -0,0 +1,415 @@
+"""
+Run instrumentation: stage timers, counters, latency histograms and optional profiling.
+
+Each file operation times its own stages in a StageTimings and returns them
+in its result dictionary, so the numbers cross process pools like any other
+result field. The pipeline folds results into a RunMetrics for the run and
+writes it locally as JSON and as Prometheus text exposition (suitable for the
+node_exporter textfile collector).
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from config import LATENCY_BUCKETS, PROFILE_TOP_ENTRIES
+from services.journal import atomic_write
+
+METRIC_PREFIX = "coldcompress"
+
+
+class StageTimings:
+    """
+    Exclusive wall time per stage of one file operation.
+
+    Stages may nest; a stage excludes the time its named inner stages took,
+    so the stages of an operation add up to its duration. Reads and writes
+    are timed by wrapping the streams (see wrap()). Blocks of a memory-mapped
+    file are paged in while they are compressed, so they count as 'compress'.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def _total(self, stages: Iterable[str]) -> float:
+        return sum(self.seconds.get(stage, 0.0) for stage in stages)
+
+    @contextmanager
+    def stage(self, name: str, exclude: Sequence[str] = ()):
+        """
+        Time a block as stage name.
+
+        Args:
+            name: Stage to charge
+            exclude: Stages timed inside the block, whose time is not charged twice
+        """
+        inner = self._total(exclude)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start - (self._total(exclude) - inner))
+
+    def wrap(self, stream: BinaryIO, stage: str) -> BinaryIO:
+        """Return stream with its reads and writes charged to stage."""
+        return _TimedStream(stream, self, stage)
+
+
+class _TimedStream:
+    """Proxy charging the time spent in read() and write() to a stage."""
+
+    def __init__(self, stream: BinaryIO, timings: StageTimings, stage: str):
+        self._stream = stream
+        self._timings = timings
+        self._stage = stage
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    def read(self, *args) -> bytes:
+        start = time.perf_counter()
+        try:
+            return self._stream.read(*args)
+        finally:
+            self._timings.add(self._stage, time.perf_counter() - start)
+
+    def write(self, data) -> int:
+        start = time.perf_counter()
+        try:
+            return self._stream.write(data)
+        finally:
+            self._timings.add(self._stage, time.perf_counter() - start)
+
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus style (cumulative buckets plus sum and count)."""
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(bounds))
+        self.counts = [0] * (len(self.bounds) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Return (upper bound, observations at or below it) pairs, ending with +Inf."""
+        pairs = []
+        running = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            running += count
+            pairs.append(("+Inf" if bound == float("inf") else repr(bound), running))
+        return pairs
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile as its bucket's upper bound (the maximum past the last bucket); None when empty."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        running = 0
+        for bound, count in zip(self.bounds, self.counts):
+            running += count
+            if running >= rank:
+                return bound
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': dict(self.cumulative())
+        }
+
+
+class RunMetrics:
+    """
+    Counters, stage timers and per-file latency for one pipeline run.
+
+    Results are recorded on the thread draining the executor, while other
+    threads (the scan, the GUI) may add stage time at once; a lock keeps the
+    totals consistent.
+    """
+
+    def __init__(self, operation: str, latency_buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.operation = operation
+        self.started = time.time()
+        self.elapsed = 0.0
+        self.counters: Dict[str, int] = dict.fromkeys(
+            ('files', 'files_succeeded', 'files_failed', 'files_skipped', 'files_cancelled',
+             'errors', 'bytes_in', 'bytes_out'), 0
+        )
+        self.stages: Dict[str, float] = {}
+        self.latency = Histogram(latency_buckets)
+        self.memory: Optional[Dict[str, Any]] = None
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage: str, seconds: float):
+        """Charge seconds to a stage; safe to call from any thread."""
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block as stage name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def timed(self, items: Iterable, stage: str) -> Iterator:
+        """Pass items through, charging the time spent producing each one to stage."""
+        iterator = iter(items)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_stage(stage, time.perf_counter() - start)
+                return
+            self.add_stage(stage, time.perf_counter() - start)
+            yield item
+
+    def record_result(self, result: Dict[str, Any]):
+        """Fold one per-file (or per-pack) result dictionary into the totals."""
+        count = result.get('file_count', 1)
+        failed = len(result.get('errors', ()))
+        skipped = len(result.get('skipped_files', ()))
+        with self._lock:
+            counters = self.counters
+            counters['files'] += count
+            if result.get('cancelled'):
+                counters['files_cancelled'] += count
+            elif result.get('skipped'):
+                counters['files_skipped'] += count
+            elif result['success']:
+                counters['files_succeeded'] += count - failed - skipped
+                counters['files_skipped'] += skipped
+                counters['files_failed'] += failed
+                counters['errors'] += failed
+            else:
+                counters['files_failed'] += count
+                counters['errors'] += 1
+            counters['bytes_in'] += result.get('bytes_in', 0)
+            counters['bytes_out'] += result.get('bytes_out', 0)
+            for stage, seconds in result.get('timings', {}).items():
+                self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+            if 'duration' in result:
+                self.latency.observe(result['duration'])
+
+    def finish(self):
+        """Freeze the run's wall time."""
+        self.elapsed = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the metrics as a JSON-serializable dictionary."""
+        with self._lock:
+            report = {
+                'operation': self.operation,
+                'started': self.started,
+                'elapsed': self.elapsed,
+                'counters': dict(self.counters),
+                'stages': dict(sorted(self.stages.items(), key=lambda item: -item[1])),
+                'file_latency': self.latency.to_dict()
+            }
+        if self.memory is not None:
+            report['memory'] = self.memory
+        return report
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        labels = f'operation="{self.operation}"'
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[str, float]]):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            for suffix_labels, value in samples:
+                lines.append(f"{METRIC_PREFIX}_{name}{suffix_labels} {value}")
+
+        with self._lock:
+            counters = dict(self.counters)
+            stages = dict(self.stages)
+            buckets = self.latency.cumulative()
+            latency_sum, latency_count = self.latency.sum, self.latency.count
+
+        outcomes = ('succeeded', 'failed', 'skipped', 'cancelled')
+        metric("files_total", "counter", "Files processed in the last run, by outcome",
+               [(f'{{{labels},outcome="{outcome}"}}', counters[f'files_{outcome}']) for outcome in outcomes])
+        metric("errors_total", "counter", "Failed operations in the last run",
+               [(f"{{{labels}}}", counters['errors'])])
+        metric("bytes_total", "counter", "Bytes read and written by file operations in the last run",
+               [(f'{{{labels},direction="in"}}', counters['bytes_in']),
+                (f'{{{labels},direction="out"}}', counters['bytes_out'])])
+        metric("stage_seconds_total", "counter", "Time spent per stage in the last run (summed over workers)",
+               [(f'{{{labels},stage="{stage}"}}', round(seconds, 6)) for stage, seconds in sorted(stages.items())])
+        metric("file_duration_seconds", "histogram", "Per-file operation latency in the last run",
+               [(f'_bucket{{{labels},le="{bound}"}}', count) for bound, count in buckets]
+               + [(f"_sum{{{labels}}}", round(latency_sum, 6)), (f"_count{{{labels}}}", latency_count)])
+        metric("run_duration_seconds", "gauge", "Wall time of the last run",
+               [(f"{{{labels}}}", round(self.elapsed, 6))])
+        metric("run_timestamp_seconds", "gauge", "Start time of the last run",
+               [(f"{{{labels}}}", round(self.started, 3))])
+        if self.memory is not None:
+            metric("memory_peak_bytes", "gauge", "Peak memory traced by tracemalloc in the last run",
+                   [(f"{{{labels}}}", self.memory['peak_bytes'])])
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: Path) -> List[Path]:
+        """
+        Write the metrics as <operation>.json and <operation>.prom under directory.
+
+        Args:
+            directory: Output directory; created if missing
+
+        Returns:
+            Paths of the written files
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        base = directory / f"{METRIC_PREFIX}-{self.operation}"
+        json_path = base.with_name(base.name + ".json")
+        prom_path = base.with_name(base.name + ".prom")
+        with atomic_write(json_path, fsync=False) as f:
+            f.write(json.dumps(self.to_dict(), indent=2).encode())
+        # Collectors read the file at any time, so it is only ever replaced whole
+        with atomic_write(prom_path, fsync=False) as f:
+            f.write(self.to_prometheus().encode())
+        return [json_path, prom_path]
+
+
+class _CollectedStats:
+    """Raw cProfile stats in the shape pstats.Stats loads from."""
+
+    def __init__(self, stats: Dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+# cProfile can only run one profiler at a time on Python 3.12+, so pool threads take turns
+_profile_lock = threading.Lock()
+
+
+def profile_call(func, *args) -> Tuple[Any, Optional[Dict]]:
+    """
+    Run func(*args) under cProfile if no other thread of this process is profiling.
+
+    Returns:
+        func's result and the raw profile stats, or None if the call ran unprofiled
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return func(*args), None
+    try:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool is active
+            return func(*args), None
+        try:
+            result = func(*args)
+        finally:
+            profiler.disable()
+        profiler.create_stats()
+        return result, profiler.stats
+    finally:
+        _profile_lock.release()
+
+
+class RunProfiler:
+    """
+    Optional cProfile and tracemalloc hooks for one run.
+
+    CPU profiles are taken inside the workers, one file operation at a time
+    per process, and merged here. Memory is traced in the process running the
+    pipeline, which covers the workers only with the thread pool.
+    """
+
+    def __init__(self, cpu: bool = False, memory: bool = False, top_entries: int = PROFILE_TOP_ENTRIES):
+        self.cpu = cpu
+        self.memory = memory
+        self.top_entries = top_entries
+        self.stats: Optional[pstats.Stats] = None
+        self.profiled_calls = 0
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._peak = 0
+        self._started_tracing = False
+
+    def __enter__(self) -> "RunProfiler":
+        if self.memory:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.memory:
+            self._peak = tracemalloc.get_traced_memory()[1]
+            self._snapshot = tracemalloc.take_snapshot()
+            if self._started_tracing:
+                tracemalloc.stop()
+
+    def add(self, raw_stats: Optional[Dict]):
+        """Merge the profile returned with one worker result."""
+        if raw_stats is None:
+            return
+        self.profiled_calls += 1
+        if self.stats is None:
+            self.stats = pstats.Stats(_CollectedStats(raw_stats))
+        else:
+            self.stats.add(_CollectedStats(raw_stats))
+
+    def memory_summary(self) -> Optional[Dict[str, Any]]:
+        """Peak traced memory and the top allocation sites, or None if memory wasn't traced."""
+        if self._snapshot is None:
+            return None
+        top = self._snapshot.statistics("lineno")[:self.top_entries]
+        return {
+            'peak_bytes': self._peak,
+            'top_allocations': [{'site': str(stat.traceback), 'bytes': stat.size, 'count': stat.count}
+                                for stat in top]
+        }
+
+    def write(self, directory: Path, operation: str) -> List[Path]:
+        """
+        Write the CPU profile (.prof for pstats/snakeviz, plus a text top list).
+
+        Returns:
+            Paths of the written files
+        """
+        if self.stats is None:
+            return []
+        directory.mkdir(parents=True, exist_ok=True)
+        base = directory / f"{METRIC_PREFIX}-{operation}"
+        prof_path = base.with_name(base.name + ".prof")
+        text_path = base.with_name(base.name + "-profile.txt")
+        self.stats.dump_stats(os.fspath(prof_path))
+        text = io.StringIO()
+        self.stats.stream = text
+        self.stats.sort_stats("cumulative").print_stats(self.top_entries)
+        text_path.write_text(f"{self.profiled_calls} profiled file operations\n{text.getvalue()}",
+                             encoding="utf-8")
+        return [prof_path, text_path]
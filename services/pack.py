@@ -0,0 +1,250 @@
+"""
+Pack archives: many small files in one append-only .zz file.
+
+Layout (all integers little-endian):
+
+    PACK_MAGIC (4 bytes) | version (1 byte)
+    members: each a complete block container (see services.container)
+    central index: zlib-compressed JSON list of members
+    trailer: index offset (8) | index length (4) | PACK_TRAILER_MAGIC (4)
+
+Adding or removing members appends the new members and a fresh central
+index after the last trailer; earlier bytes are never rewritten, so a crash
+can only leave an incomplete tail. Readers use the last valid trailer, and
+writers cut any incomplete tail off before appending.
+
+Every member is a self-contained container with its own codec, metadata and
+checksum, read through a window onto the pack file, so a member can be
+extracted by name without reading any other member.
+"""
+import io
+import json
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from config import FSYNC_WRITES
+
+PACK_MAGIC = b"\x89CCP"
+PACK_TRAILER_MAGIC = b"CCPI"
+PACK_VERSION = 1
+
+_PREAMBLE = struct.Struct("<4sB")
+_TRAILER = struct.Struct("<QI4s")
+
+# How far back to look for an intact trailer when the tail is damaged
+_RECOVERY_CHUNK = 1024 * 1024
+
+
+class PackMember(NamedTuple):
+    """Location and summary of one file inside a pack."""
+    name: str
+    offset: int  # Start of the member container in the pack
+    length: int  # Size of the member container
+    size: int  # Original file size
+    mtime: float
+
+
+def is_pack(prefix: bytes) -> bool:
+    """Return True if the leading bytes of a file identify a pack archive."""
+    return prefix[:len(PACK_MAGIC)] == PACK_MAGIC
+
+
+class _Window(io.RawIOBase):
+    """Read-only view of a byte range of a file, seekable relative to the range."""
+
+    def __init__(self, file: BinaryIO, start: int, length: int):
+        super().__init__()
+        self._file = file
+        self._start = start
+        self._length = length
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self._length
+        self._position = min(max(offset, 0), self._length)
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        count = min(len(buffer), self._length - self._position)
+        if count <= 0:
+            return 0
+        self._file.seek(self._start + self._position)
+        read = self._file.readinto(memoryview(buffer)[:count])
+        self._position += read
+        return read
+
+
+class PackArchive:
+    """
+    Reader and appender for a pack archive.
+
+    Members added or removed are only visible to other readers once
+    commit() has written and synced a new central index.
+    """
+
+    def __init__(self, path: Path, writable: bool = False, fsync: bool = FSYNC_WRITES):
+        """
+        Args:
+            path: Pack file; created if missing when writable
+            writable: Open for adding and removing members
+            fsync: Force appended data to disk on commit
+        """
+        self.path = path
+        self.fsync = fsync
+        self.members: Dict[str, PackMember] = {}
+
+        if writable and not path.exists():
+            self._file = open(path, "w+b")
+            self._file.write(_PREAMBLE.pack(PACK_MAGIC, PACK_VERSION))
+            self._end = _PREAMBLE.size
+        else:
+            self._file = open(path, "r+b" if writable else "rb")
+            try:
+                self._end = self._load_index()
+                if writable:
+                    # Drop an incomplete tail left by an interrupted append
+                    self._file.truncate(self._end)
+            except Exception:
+                self._file.close()
+                raise
+        self._append_offset = self._end
+
+    def __enter__(self) -> "PackArchive":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def _load_index(self) -> int:
+        """Read the members from the last intact trailer; return where valid data ends."""
+        preamble = self._file.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size or not is_pack(preamble):
+            raise ValueError("Not a ColdCompress pack")
+        magic, version = _PREAMBLE.unpack(preamble)
+        if version > PACK_VERSION:
+            raise ValueError(f"Unsupported pack version {version}")
+
+        trailer = self._find_trailer()
+        if trailer is None:
+            # Nothing was ever committed
+            return _PREAMBLE.size
+        index_offset, index_length, end = trailer
+        self._file.seek(index_offset)
+        entries = json.loads(zlib.decompress(self._file.read(index_length)).decode())
+        self.members = {entry[0]: PackMember(*entry) for entry in entries}
+        return end
+
+    def _trailer_at(self, end: int) -> Optional[Tuple[int, int, int]]:
+        """Return (index offset, index length, end) if an intact trailer ends at end."""
+        if end - _TRAILER.size < _PREAMBLE.size:
+            return None
+        self._file.seek(end - _TRAILER.size)
+        index_offset, index_length, magic = _TRAILER.unpack(self._file.read(_TRAILER.size))
+        if magic != PACK_TRAILER_MAGIC or index_offset + index_length + _TRAILER.size != end:
+            return None
+        self._file.seek(index_offset)
+        try:
+            zlib.decompress(self._file.read(index_length))
+        except zlib.error:
+            return None
+        return index_offset, index_length, end
+
+    def _find_trailer(self) -> Optional[Tuple[int, int, int]]:
+        """Locate the last intact trailer, searching backwards past a damaged tail."""
+        size = self._file.seek(0, os.SEEK_END)
+        trailer = self._trailer_at(size)
+        if trailer is not None:
+            return trailer
+
+        position = size
+        while position > _PREAMBLE.size:
+            start = max(_PREAMBLE.size, position - _RECOVERY_CHUNK)
+            self._file.seek(start)
+            # Overlap chunks so a magic split across a boundary is still found
+            chunk = self._file.read(position - start + len(PACK_TRAILER_MAGIC) - 1)
+            found = chunk.rfind(PACK_TRAILER_MAGIC)
+            while found >= 0:
+                trailer = self._trailer_at(start + found + len(PACK_TRAILER_MAGIC))
+                if trailer is not None:
+                    return trailer
+                found = chunk.rfind(PACK_TRAILER_MAGIC, 0, found)
+            position = start
+        return None
+
+    def add(self, name: str, size: int, mtime: float, write: Callable[[BinaryIO], None]):
+        """
+        Append a member; write() receives the pack file positioned where it goes.
+
+        A member with the same name is replaced. If write() raises, the
+        partial member is discarded.
+
+        Args:
+            name: Member name (file name relative to the pack's directory)
+            size: Original file size
+            mtime: Original modification time
+            write: Writes the member container
+        """
+        offset = self._append_offset
+        self._file.seek(offset)
+        write(self._file)
+        length = self._file.tell() - offset
+        self.members[name] = PackMember(name, offset, length, size, mtime)
+        self._append_offset = offset + length
+
+    def discard(self):
+        """Cut off members appended since the last commit."""
+        self._file.truncate(self._end)
+        self._file.flush()
+        self._append_offset = self._end
+
+    def remove(self, names: List[str]):
+        """Drop members from the index; their bytes stay until the pack is deleted."""
+        for name in names:
+            self.members.pop(name, None)
+
+    def commit(self):
+        """Append the central index and trailer, making all changes durable."""
+        index = zlib.compress(json.dumps([list(member) for member in self.members.values()]).encode())
+        self._file.seek(self._append_offset)
+        self._file.write(index)
+        self._file.write(_TRAILER.pack(self._append_offset, len(index), PACK_TRAILER_MAGIC))
+        self._file.truncate()
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._end = self._append_offset + len(index) + _TRAILER.size
+        self._append_offset = self._end
+
+    def open_member(self, name: str) -> BinaryIO:
+        """
+        Open one member's container for reading.
+
+        Args:
+            name: Member name
+
+        Returns:
+            Seekable stream over the member container
+        """
+        try:
+            member = self.members[name]
+        except KeyError:
+            raise ValueError(f"{name} is not in {self.path.name}") from None
+        return io.BufferedReader(_Window(self._file, member.offset, member.length))
@@ -0,0 +1,266 @@
+import multiprocessing
+import time
+from functools import partial
+from concurrent.futures import (
+    BrokenExecutor, CancelledError, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor,
+    FIRST_COMPLETED, wait
+)
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from config import MAX_WORKERS, USE_PROCESS_POOL, PROFILE_CPU
+from services.compression_service import CompressionService
+from services.job_control import JobCancelled, JobController, lower_priority
+from services.metrics import profile_call
+
+# Service instance, shared progress counter and job controller owned by each worker process
+_worker_service: Optional[CompressionService] = None
+_worker_counter = None
+_worker_controller: Optional[JobController] = None
+
+
+def _init_worker(service: CompressionService, counter, controller: JobController) -> None:
+    """Install the service copy, progress counter and job controller used by a pool worker process."""
+    global _worker_service, _worker_counter, _worker_controller
+    _worker_service = service
+    _worker_counter = counter
+    _worker_controller = controller
+    if controller.low_priority:
+        lower_priority()
+
+
+def _add_to_counter(counter, count: int) -> None:
+    """Add processed bytes to a shared counter."""
+    with counter.get_lock():
+        counter.value += count
+
+
+def _report_worker_progress(count: int) -> None:
+    _add_to_counter(_worker_counter, count)
+    _worker_controller.checkpoint(count)
+
+
+def _timed_call(service: CompressionService, operation: str, item: Any, on_progress,
+                profile: bool, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a CompressionService operation, recording its duration (and profile) in the result."""
+    method = partial(getattr(service, operation), **options)
+    start = time.perf_counter()
+    if profile:
+        result, stats = profile_call(method, item, on_progress)
+        result['profile'] = stats
+    else:
+        result = method(item, on_progress)
+    result['duration'] = time.perf_counter() - start
+    return result
+
+
+def _run_in_worker(operation: str, item: Any, profile: bool, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a CompressionService operation inside a pool worker process."""
+    _worker_controller.start_operation()
+    return _timed_call(_worker_service, operation, item, _report_worker_progress, profile, options)
+
+
+# A CompressionService method name and its first argument (a path, or a list of paths),
+# optionally followed by a dict of keyword arguments, e.g. ("compress_file", path, {'probe': result})
+Task = Tuple[Any, ...]
+
+
+class ParallelExecutor:
+    """
+    Runs compression and decompression operations across a pool of workers.
+
+    Every operation reports progress through the job controller, which can
+    cancel, pause or throttle the run between chunks and between files.
+    Results carry the operation's wall time in 'duration', and with profile
+    set its cProfile stats in 'profile' (see services.metrics.profile_call).
+
+    If a worker process dies (e.g. killed by a signal), the tasks it took down
+    with it are reported as errors and a fresh pool takes the remaining tasks.
+    """
+
+    def __init__(self, service: CompressionService, max_workers: int = MAX_WORKERS,
+                 use_processes: bool = USE_PROCESS_POOL,
+                 controller: Optional[JobController] = None, profile: bool = PROFILE_CPU):
+        self.service = service
+        self.max_workers = max(1, max_workers)
+        self.use_processes = use_processes
+        self.controller = controller or JobController()
+        self.profile = profile
+        # Input bytes processed in the current run, shared with worker processes
+        self._counter = multiprocessing.Value('q', 0)
+
+    @property
+    def bytes_processed(self) -> int:
+        """Input bytes processed so far in the current run; safe to read from any thread."""
+        return self._counter.value
+
+    def compress_files(self, files: Iterable[Path]) -> Iterator[Dict[str, Any]]:
+        """
+        Compress files concurrently.
+
+        Args:
+            files: Paths of the files to compress
+
+        Returns:
+            Iterator of per-file result dictionaries, in completion order
+        """
+        return self.run(("compress_file", filepath) for filepath in files)
+
+    def decompress_files(self, files: Iterable[Path]) -> Iterator[Dict[str, Any]]:
+        """
+        Decompress .zz files concurrently.
+
+        Args:
+            files: Paths of the compressed files
+
+        Returns:
+            Iterator of per-file result dictionaries, in completion order
+        """
+        return self.run(("decompress_file", filepath) for filepath in files)
+
+    def verify_files(self, files: Iterable[Path]) -> Iterator[Dict[str, Any]]:
+        """
+        Verify .zz files concurrently without writing anything.
+
+        Args:
+            files: Paths of the compressed files
+
+        Returns:
+            Iterator of per-file result dictionaries, in completion order
+        """
+        return self.run(("verify_file", filepath) for filepath in files)
+
+    def _create_pool(self) -> Executor:
+        """Create the worker pool for a single run."""
+        if self.use_processes:
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.service, self._counter, self.controller)
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=lower_priority if self.controller.low_priority else None
+        )
+
+    def _submit(self, pool: Executor, task: Task) -> Future:
+        """Queue one operation on the pool."""
+        operation, item, *rest = task
+        options = rest[0] if rest else {}
+        if self.use_processes:
+            return pool.submit(_run_in_worker, operation, item, self.profile, options)
+        return pool.submit(self._run_in_thread, operation, item, options)
+
+    def _run_in_thread(self, operation: str, item: Any, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a CompressionService operation on a pool thread."""
+        self.controller.start_operation()
+        return _timed_call(self.service, operation, item, self._report_progress, self.profile, options)
+
+    def _report_progress(self, count: int) -> None:
+        _add_to_counter(self._counter, count)
+        self.controller.checkpoint(count)
+
+    def _collect(self, future: Future, task: Task) -> Dict[str, Any]:
+        """Return a finished task's result, turning pool failures into error results."""
+        try:
+            return future.result()
+        except (JobCancelled, CancelledError):
+            return self._cancelled_result(task)
+        except Exception as e:
+            operation, item = task[:2]
+            if operation == 'pack_files':
+                return {
+                    'success': False,
+                    'message': f"❌ Error packing {len(item)} files in {item[0].parent}: {e}",
+                    'space_saved': 0,
+                    'file_count': len(item),
+                    'error': str(e)
+                }
+            if operation == 'dedup_files':
+                return {
+                    'success': False,
+                    'message': f"❌ Error deduplicating {len(item.paths)} copies of {item.paths[0]}: {e}",
+                    'space_saved': 0,
+                    'file_count': len(item.paths),
+                    'error': str(e)
+                }
+            verb = {
+                'compress_file': "compressing",
+                'decompress_file': "decompressing",
+                'verify_file': "verifying"
+            }[operation]
+            return {
+                'success': False,
+                'message': f"❌ Error {verb} {item}: {e}",
+                'space_saved': 0,
+                'error': str(e)
+            }
+
+    def run(self, tasks: Iterable[Task]) -> Iterator[Dict[str, Any]]:
+        """
+        Run a mixed stream of service operations concurrently.
+
+        Args:
+            tasks: (operation, argument) pairs, e.g. ("pack_files", [paths])
+
+        Returns:
+            Iterator of result dictionaries, in completion order
+        """
+        # Bound the number of queued tasks so lazy inputs are consumed gradually
+        max_pending = self.max_workers * 2
+        pending: Dict[Future, Task] = {}
+        self._counter.value = 0
+
+        # Share the block threads between files instead of starting them per file;
+        # process workers get their own copy of the service with this setting
+        concurrent_files = self.service.concurrent_files
+        self.service.concurrent_files = self.max_workers
+        pool = self._create_pool()
+        try:
+            for task in tasks:
+                # Hold new files back while paused, and queue none once cancelled
+                if not self.controller.wait_while_paused():
+                    break
+                try:
+                    future = self._submit(pool, task)
+                except BrokenExecutor:
+                    # A worker died; its tasks fail on their own, later ones get a new pool
+                    pool.shutdown(wait=False)
+                    pool = self._create_pool()
+                    future = self._submit(pool, task)
+                pending[future] = task
+                if len(pending) >= max_pending:
+                    yield from self._drain(pending)
+
+            while pending:
+                if self.controller.cancelled:
+                    for future in pending:
+                        future.cancel()
+                yield from self._drain(pending)
+        finally:
+            pool.shutdown()
+            self.service.concurrent_files = concurrent_files
+
+    def _drain(self, pending: Dict[Future, Task]) -> Iterator[Dict[str, Any]]:
+        """Wait for at least one pending task and yield every finished result."""
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield self._collect(future, pending.pop(future))
+
+    @staticmethod
+    def _cancelled_result(task: Task) -> Dict[str, Any]:
+        """Describe a task the job controller stopped before it finished."""
+        operation, item = task[:2]
+        if operation == 'pack_files':
+            count, label = len(item), f"{len(item)} files in {item[0].parent}"
+        elif operation == 'dedup_files':
+            count, label = len(item.paths), f"{len(item.paths)} copies of {item.paths[0]}"
+        else:
+            count, label = 1, str(item)
+        return {
+            'success': False,
+            'cancelled': True,
+            'message': f"⏹️ Cancelled: {label}",
+            'space_saved': 0,
+            'file_count': count
+        }
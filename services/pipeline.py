@@ -0,0 +1,432 @@
+import sqlite3
+import time
+from pathlib import Path
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from config import MAX_WORKERS, USE_SCHEDULER, METRICS_ENABLED, METRICS_DIR, PROFILE_CPU, PROFILE_MEMORY
+from services.compression_service import CompressionService
+from services.dedup import DedupStore, find_duplicates
+from services.job_control import JobController
+from services.metrics import RunMetrics, RunProfiler
+from services.parallel_executor import ParallelExecutor, Task
+from services.progress import ProgressTracker
+from services.scheduler import CompressionScheduler
+from services.scanner import DirectoryScanner, ScanEntry
+
+
+class RunSummary:
+    """Totals for one pipeline run."""
+
+    def __init__(self, operation: str, dry_run: bool = False):
+        self.operation = operation
+        self.dry_run = dry_run
+        self.files_processed = 0
+        self.files_succeeded = 0
+        self.files_failed = 0
+        self.files_skipped = 0
+        self.files_cancelled = 0
+        self.cancelled = False  # The run was stopped before every file was processed
+        self.space_saved = 0
+        self.skipped_bytes = 0
+        self.cpu_saved = 0.0
+        self.scanned_files = 0
+        self.candidate_files = 0
+        self.candidate_bytes = 0
+        self.bytes_processed = 0
+        self.elapsed = 0.0
+        self.recovered = []  # Messages for interrupted operations finished or rolled back
+        self.metrics_files = []  # Metrics and profile reports written for this run
+
+    def add_result(self, result: Dict[str, Any]):
+        """Fold one result dictionary (a single file, or a pack of 'file_count' files) into the totals."""
+        count = result.get('file_count', 1)
+        self.files_processed += count
+        if result.get('cancelled'):
+            self.files_cancelled += count
+        elif result.get('skipped'):
+            self.files_skipped += count
+            self.skipped_bytes += result['skipped_bytes']
+            self.cpu_saved += result['cpu_saved']
+        elif result['success']:
+            failed = len(result.get('errors', ()))
+            skipped = len(result.get('skipped_files', ()))
+            self.files_succeeded += count - failed - skipped
+            self.files_failed += failed
+            self.files_skipped += skipped
+            self.skipped_bytes += result.get('skipped_bytes', 0)
+            self.cpu_saved += result.get('cpu_saved', 0.0)
+            self.space_saved += result.get('space_saved', 0)
+        else:
+            self.files_failed += count
+
+    def add_scan_stats(self, scanner: DirectoryScanner):
+        """Record the statistics of the scan that fed this run."""
+        self.scanned_files = scanner.stats.total_files
+        self.candidate_files = scanner.stats.candidate_files
+        self.candidate_bytes = scanner.stats.candidate_bytes
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the totals as a JSON-serializable dictionary."""
+        return dict(vars(self))
+
+
+# Called with each per-file result and the running summary
+ResultCallback = Callable[[Dict[str, Any], RunSummary], None]
+
+
+class CompressionPipeline:
+    """
+    Scan-then-process orchestration shared by the GUI and the command line.
+
+    Candidates stream from the scanner straight into the parallel executor, so
+    processing starts before the scan finishes. Nothing here depends on tkinter.
+
+    Runs are resumable: finished files are already in their target form and
+    are not picked up again, and operations a crash interrupted are settled
+    from the service journal before the scan starts.
+
+    self.progress tracks the current run; any thread may take snapshots of it,
+    and self.controller cancels, pauses or throttles it from any thread.
+    self.metrics instruments the current run; once it finishes, the metrics
+    (and any profiles) are written to metrics_dir as JSON and Prometheus text.
+    """
+
+    def __init__(self, service: Optional[CompressionService] = None, max_workers: int = MAX_WORKERS,
+                 controller: Optional[JobController] = None, use_scheduler: bool = USE_SCHEDULER,
+                 metrics_dir: Optional[Path] = METRICS_DIR if METRICS_ENABLED else None,
+                 profile_cpu: bool = PROFILE_CPU, profile_memory: bool = PROFILE_MEMORY):
+        self.service = service or CompressionService()
+        self.max_workers = max_workers
+        self.progress = ProgressTracker()
+        self.controller = controller or JobController()
+        self.metrics = RunMetrics("idle")
+        self.metrics_dir = metrics_dir  # None keeps metrics in memory only
+        self.profile_cpu = profile_cpu
+        self.profile_memory = profile_memory
+        # Compress the candidates that reclaim the most space per unit of work first
+        self.scheduler = (CompressionScheduler(self.service.codec_policy, self.service.probe)
+                          if use_scheduler else None)
+
+    def scan(self, folder: Path, threshold_days: Optional[int] = None) -> Iterator[ScanEntry]:
+        """
+        Scan a folder without modifying anything.
+
+        Args:
+            folder: Root folder to scan
+            threshold_days: Age threshold in days; None lists only compressed files
+
+        Returns:
+            Iterator of cold candidates and compressed files
+        """
+        return self.service.scan_folder(folder, threshold_days).scan(folder)
+
+    def compress(self, folder: Path, threshold_days: int, dry_run: bool = False,
+                 on_result: Optional[ResultCallback] = None) -> RunSummary:
+        """
+        Compress every file in folder older than threshold_days.
+
+        With pack mode enabled on the service, the small candidates of each
+        directory are bundled into that directory's pack archive instead.
+        With deduplication enabled, identical candidates are stored once and
+        linked; this needs the whole scan before any file is processed.
+        Otherwise candidates are ordered by the scheduler, best savings per
+        unit of work first, within a window of the scan.
+
+        Args:
+            folder: Root folder to process
+            threshold_days: Age threshold in days
+            dry_run: Report what would be compressed without touching any file
+            on_result: Callback invoked for every per-file result
+
+        Returns:
+            Summary of the run
+        """
+        summary = RunSummary("compress", dry_run)
+        self._start_run(summary)
+        with self._profiler() as profiler:
+            if not dry_run:
+                # Settle anything a previous run left half-done before scanning
+                with self.metrics.stage("recover"):
+                    summary.recovered = self.service.recover_interrupted()
+            scanner = self.service.scan_folder(folder, threshold_days)
+            entries = (entry for entry in self._timed_scan(scanner, folder) if not entry.compressed)
+            if self.scheduler is not None and not self.service.use_packs:
+                # Pack mode groups candidates by directory, so it keeps scan order
+                entries = self.scheduler.order(entries, self.max_workers)
+            entries = self._within_budget(entries, self.service.selection_policy.max_bytes_per_run)
+            candidates = self._track_totals(self.progress, entries)
+
+            if dry_run:
+                results = (self._dry_run_result("compress", entry) for entry in candidates)
+                executor = None
+            else:
+                executor = self._executor()
+                self.progress.attach(lambda: executor.bytes_processed)
+                results = executor.run(self._compress_tasks(folder, candidates))
+
+            self._consume(results, summary, on_result, scanner, executor, self.metrics, profiler)
+        summary.add_scan_stats(scanner)
+        self._finish_run(summary, profiler)
+        return summary
+
+    def decompress(self, folder: Path, dry_run: bool = False,
+                   on_result: Optional[ResultCallback] = None) -> RunSummary:
+        """
+        Decompress every .zz file in folder.
+
+        Args:
+            folder: Root folder to process
+            dry_run: Report what would be decompressed without touching any file
+            on_result: Callback invoked for every per-file result
+
+        Returns:
+            Summary of the run
+        """
+        summary = RunSummary("decompress", dry_run)
+        self._start_run(summary)
+        with self._profiler() as profiler:
+            if not dry_run:
+                # Settle anything a previous run left half-done before scanning
+                with self.metrics.stage("recover"):
+                    summary.recovered = self.service.recover_interrupted()
+            scanner = self.service.scan_folder(folder)
+            entries = (entry for entry in self._timed_scan(scanner, folder) if entry.compressed)
+            compressed = self._track_totals(self.progress, entries)
+
+            if dry_run:
+                results = (self._dry_run_result("decompress", entry) for entry in compressed)
+                executor = None
+            else:
+                executor = self._executor()
+                self.progress.attach(lambda: executor.bytes_processed)
+                results = executor.decompress_files(entry.path for entry in compressed)
+
+            self._consume(results, summary, on_result, scanner, executor, self.metrics, profiler)
+            if not dry_run:
+                # Drop store blobs and shared dictionaries no .zz file refers to any more
+                with self.metrics.stage("collect_garbage"):
+                    DedupStore(folder).collect_garbage()
+                    self.service.collect_dictionaries(folder)
+        summary.add_scan_stats(scanner)
+        self._finish_run(summary, profiler)
+        return summary
+
+    def verify(self, folder: Path, on_result: Optional[ResultCallback] = None) -> RunSummary:
+        """
+        Check every .zz file in folder by decompressing it to a null sink.
+
+        Nothing is written, so this is safe to run as a periodic scrub.
+
+        Args:
+            folder: Root folder to check
+            on_result: Callback invoked for every per-file result
+
+        Returns:
+            Summary of the run
+        """
+        summary = RunSummary("verify")
+        self._start_run(summary)
+        with self._profiler() as profiler:
+            scanner = self.service.scan_folder(folder)
+            entries = (entry for entry in self._timed_scan(scanner, folder) if entry.compressed)
+            compressed = self._track_totals(self.progress, entries)
+
+            executor = self._executor()
+            self.progress.attach(lambda: executor.bytes_processed)
+            results = executor.verify_files(entry.path for entry in compressed)
+
+            self._consume(results, summary, on_result, scanner, executor, self.metrics, profiler)
+        summary.add_scan_stats(scanner)
+        self._finish_run(summary, profiler)
+        return summary
+
+    def stats(self, folder: Path) -> Dict[str, Any]:
+        """
+        Get folder statistics.
+
+        Args:
+            folder: Root folder to analyze
+
+        Returns:
+            Dictionary with the total and compressed file counts
+        """
+        total_files, compressed_files = self.service.get_folder_stats(folder)
+        return {'folder': str(folder), 'total_files': total_files, 'compressed_files': compressed_files}
+
+    def sizes(self, folder: Path) -> Dict[str, Any]:
+        """
+        Total the logical and physical sizes of every .zz file in folder.
+
+        Sizes come from container headers and footers, so nothing is inflated.
+
+        Args:
+            folder: Root folder to analyze
+
+        Returns:
+            Dictionary with file counts and byte totals
+        """
+        report = {
+            'folder': str(folder),
+            'compressed_files': 0,
+            'physical_bytes': 0,
+            'logical_bytes': 0,
+            'unknown_files': 0  # Legacy streams and unreadable headers
+        }
+        for entry in self.scan(folder):
+            report['compressed_files'] += 1
+            try:
+                compressed_stat = self.service.stat_compressed(entry.path)
+            except (OSError, ValueError):
+                report['unknown_files'] += 1
+                continue
+            report['physical_bytes'] += compressed_stat.physical_size
+            if compressed_stat.logical_size is None:
+                report['unknown_files'] += 1
+            else:
+                report['logical_bytes'] += compressed_stat.logical_size
+        return report
+
+    def _start_run(self, summary: RunSummary):
+        """Reset progress and metrics for a new run."""
+        self.progress = ProgressTracker()
+        self.metrics = RunMetrics(summary.operation)
+
+    def _profiler(self) -> RunProfiler:
+        return RunProfiler(cpu=self.profile_cpu, memory=self.profile_memory)
+
+    def _executor(self) -> ParallelExecutor:
+        return ParallelExecutor(self.service, max_workers=self.max_workers,
+                                controller=self.controller, profile=self.profile_cpu)
+
+    def _timed_scan(self, scanner: DirectoryScanner, folder: Path) -> Iterator[ScanEntry]:
+        """Scan folder, charging the time spent walking it to the 'scan' stage."""
+        return self.metrics.timed(scanner.scan(folder), "scan")
+
+    def _finish_run(self, summary: RunSummary, profiler: RunProfiler):
+        """Close the run's metrics and write them (and any profiles) out."""
+        self.metrics.finish()
+        self.metrics.memory = profiler.memory_summary()
+        if self.metrics_dir is None or summary.dry_run:
+            return
+        try:
+            summary.metrics_files = (self.metrics.write(self.metrics_dir)
+                                     + profiler.write(self.metrics_dir, summary.operation))
+        except OSError:
+            # Instrumentation must never fail a run
+            pass
+
+    def _compress_tasks(self, folder: Path, candidates: Iterable[ScanEntry]) -> Iterator[Task]:
+        """Turn cold candidates into dedup, pack and single-file compression tasks."""
+        if self.service.use_dedup:
+            groups, candidates = find_duplicates(candidates, DedupStore(folder).path)
+            for group in groups:
+                yield "dedup_files", group
+        if self.service.use_packs:
+            yield from self._pack_tasks(candidates)
+        else:
+            for entry in candidates:
+                # Record the atime the scan saw, not one bumped by probing or hashing
+                options = {'scanned': entry.stat}
+                if self.scheduler is not None:
+                    # Large files were probed while scheduling; spare the worker a second probe
+                    probe = self.scheduler.take_probe(entry.path)
+                    if probe is not None:
+                        options['probe'] = probe
+                yield "compress_file", entry.path, options
+
+    def _pack_tasks(self, candidates: Iterable[ScanEntry]) -> Iterator[Task]:
+        """
+        Group small candidates by directory into pack tasks; compress the rest individually.
+
+        Relies on the scanner yielding each directory's entries together.
+        """
+        for _, group in groupby(candidates, key=lambda entry: entry.path.parent):
+            small = []
+            for entry in group:
+                if entry.size <= self.service.pack_max_file_size:
+                    small.append(entry)
+                else:
+                    yield "compress_file", entry.path, {'scanned': entry.stat}
+            if len(small) >= self.service.pack_min_files:
+                yield ("pack_files", [entry.path for entry in small],
+                       {'scanned': [entry.stat for entry in small]})
+            else:
+                for entry in small:
+                    yield "compress_file", entry.path, {'scanned': entry.stat}
+
+    @staticmethod
+    def _within_budget(entries: Iterable[ScanEntry], budget: int) -> Iterator[ScanEntry]:
+        """
+        Pass candidates through until the per-run byte budget is spent.
+
+        Files that don't fit the remaining budget are left for a later run; the
+        scan stops once the budget is used up exactly. A budget of 0 is unlimited.
+        """
+        if not budget:
+            yield from entries
+            return
+        remaining = budget
+        for entry in entries:
+            if entry.size > remaining:
+                continue
+            remaining -= entry.size
+            yield entry
+            if not remaining:
+                return
+
+    @staticmethod
+    def _track_totals(tracker: ProgressTracker, entries: Iterable[ScanEntry]) -> Iterator[ScanEntry]:
+        """Add each scanned file to the run's byte total as it streams past."""
+        for entry in entries:
+            tracker.add_total(entry.size)
+            yield entry
+        tracker.finish_scan()
+
+    @staticmethod
+    def _consume(results: Iterable[Dict[str, Any]], summary: RunSummary,
+                 on_result: Optional[ResultCallback], scanner: DirectoryScanner,
+                 executor: Optional[ParallelExecutor], metrics: RunMetrics, profiler: RunProfiler):
+        """Drain a result stream into the summary and metrics, notifying the callback."""
+        moves_files = summary.operation in ("compress", "decompress") and not summary.dry_run
+        start = time.perf_counter()
+        for result in results:
+            profiler.add(result.pop('profile', None))
+            summary.add_result(result)
+            metrics.record_result(result)
+            index = scanner.active_index if moves_files else None
+            if index is not None and result['success'] and ('compressed_path' in result
+                                                            or 'compressed_paths' in result):
+                # Keep the scan index in step so stats stay accurate between scans;
+                # commit at once so other processes are never locked out for long
+                originals = result.get('original_paths', [result.get('original_path')])
+                compressed = result.get('compressed_paths', [result.get('compressed_path')] * len(originals))
+                try:
+                    with metrics.stage("index"):
+                        for original, compressed_path in zip(originals, compressed):
+                            if summary.operation == "compress":
+                                index.record_move(original, compressed_path)
+                            else:
+                                index.record_move(compressed_path, original)
+                        index.flush()
+                except sqlite3.Error:
+                    # Stale entries are corrected by the next scan of their directory
+                    scanner.disable_index()
+            if on_result is not None:
+                with metrics.stage("report"):
+                    on_result(result, summary)
+        if executor is not None:
+            summary.bytes_processed = executor.bytes_processed
+            summary.cancelled = executor.controller.cancelled
+        summary.elapsed = time.perf_counter() - start
+
+    @staticmethod
+    def _dry_run_result(operation: str, entry: ScanEntry) -> Dict[str, Any]:
+        """Describe what a real run would do with a scanned file."""
+        return {
+            'success': True,
+            'dry_run': True,
+            'message': f"🔎 Would {operation}: {entry.path}",
+            'original_path': entry.path,
+            'size': entry.size
+        }
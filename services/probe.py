@@ -0,0 +1,103 @@
+import time
+import zlib
+from pathlib import Path
+from typing import NamedTuple
+
+from config import (
+    PROBE_SAMPLE_SIZE, PROBE_LEVEL, PROBE_MIN_SAVINGS, INCOMPRESSIBLE_EXTENSIONS
+)
+from services import container
+from services.codecs import Codec
+
+# Leading bytes of already-compressed formats (offset, signature)
+MAGIC_SIGNATURES = (
+    (0, b"\xff\xd8\xff", "JPEG image"),
+    (0, b"\x89PNG", "PNG image"),
+    (0, b"GIF8", "GIF image"),
+    (0, b"PK\x03\x04", "ZIP archive"),
+    (0, b"\x1f\x8b", "gzip data"),
+    (0, b"BZh", "bzip2 data"),
+    (0, b"\xfd7zXZ\x00", "xz data"),
+    (0, b"7z\xbc\xaf\x27\x1c", "7z archive"),
+    (0, b"Rar!", "RAR archive"),
+    (0, b"\x28\xb5\x2f\xfd", "zstd data"),
+    (0, container.MAGIC, "ColdCompress container"),
+    (4, b"ftyp", "MP4/QuickTime media"),
+)
+
+
+class ProbeResult(NamedTuple):
+    """Outcome of a compressibility probe."""
+    compress: bool
+    reason: str
+    estimated_savings: float  # Percentage saved on the sample
+    cpu_saved: float  # Estimated CPU seconds avoided when the file is skipped
+
+
+class CompressibilityProbe:
+    """
+    Decides whether a file is worth compressing before the full run.
+
+    Files are rejected by extension, then by magic bytes, then by compressing
+    samples from the head, middle and tail at a fast level.
+    """
+
+    def __init__(self, min_savings: float = PROBE_MIN_SAVINGS,
+                 sample_size: int = PROBE_SAMPLE_SIZE, level: int = PROBE_LEVEL):
+        self.min_savings = min_savings
+        self.sample_size = sample_size
+        self.level = level
+        self.denylist = frozenset(ext.lower() for ext in INCOMPRESSIBLE_EXTENSIONS)
+
+    def check(self, filepath: Path, size: int, codec: Codec, level: int) -> ProbeResult:
+        """
+        Probe a file.
+
+        Args:
+            filepath: File to probe
+            size: File size in bytes
+            codec: Codec the real compression would use, for the CPU estimate
+            level: Level the real compression would use
+
+        Returns:
+            Probe result with the decision and the estimated savings
+        """
+        if filepath.suffix.lower() in self.denylist:
+            return ProbeResult(False, f"{filepath.suffix} files are already compressed", 0.0, 0.0)
+
+        sample = self._read_sample(filepath, size)
+        for offset, signature, description in MAGIC_SIGNATURES:
+            if sample[offset:offset + len(signature)] == signature:
+                return ProbeResult(False, f"detected {description}", 0.0, 0.0)
+
+        if not sample:
+            return ProbeResult(False, "empty file", 0.0, 0.0)
+
+        savings = (1 - len(zlib.compress(sample, self.level)) / len(sample)) * 100
+        if savings >= self.min_savings:
+            return ProbeResult(True, "compressible", savings, 0.0)
+
+        if savings < 0:
+            reason = f"sample grew by {-savings:.1f}%"
+        else:
+            reason = f"sample shrank by only {savings:.1f}%"
+        return ProbeResult(False, reason, savings, self._estimate_cpu(sample, size, codec, level))
+
+    def _read_sample(self, filepath: Path, size: int) -> bytes:
+        """Read the head, middle and tail of a file, or all of it if it is small."""
+        with open(filepath, "rb") as f:
+            if size <= self.sample_size * 3:
+                return f.read()
+            parts = [f.read(self.sample_size)]
+            for offset in ((size - self.sample_size) // 2, size - self.sample_size):
+                f.seek(offset)
+                parts.append(f.read(self.sample_size))
+        return b"".join(parts)
+
+    @staticmethod
+    def _estimate_cpu(sample: bytes, size: int, codec: Codec, level: int) -> float:
+        """Extrapolate the cost of compressing the whole file from timing the sample."""
+        start = time.process_time()
+        codec.compress(sample, level)
+        elapsed = time.process_time() - start
+        return elapsed * size / len(sample)
@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, NamedTuple, Optional
+
+from config import PROGRESS_RATE_WINDOW
+
+
+class ProgressSnapshot(NamedTuple):
+    """Point-in-time view of a run's byte-level progress."""
+    processed_bytes: int
+    total_bytes: int
+    percent: float
+    rate: float  # Bytes per second, averaged over the rate window
+    eta: Optional[float]  # Seconds remaining, or None while unknown
+    scan_complete: bool
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Format seconds as H:MM:SS, or '--:--' when unknown."""
+    if seconds is None:
+        return "--:--"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}"
+
+
+def format_progress(snapshot: ProgressSnapshot) -> str:
+    """Render a snapshot as a one-line status."""
+    total_mb = snapshot.total_bytes / (1024 * 1024)
+    total = f"{total_mb:.1f} MB" if snapshot.scan_complete else f"{total_mb:.1f}+ MB"
+    return (f"{snapshot.percent:.1f}% of {total} — {snapshot.rate / (1024 * 1024):.1f} MB/s — "
+            f"ETA {format_duration(snapshot.eta)}")
+
+
+class ProgressTracker:
+    """
+    Byte-level progress for a pipeline run.
+
+    The scan adds to the total as it finds files, while the processed count is
+    read on demand from a counter the workers bump once per chunk. Rates and
+    ETAs are only computed when a snapshot is taken, so reporting frequency is
+    up to the reader and never slows the workers down.
+    """
+
+    def __init__(self, window: float = PROGRESS_RATE_WINDOW, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            window: Seconds of samples the rate is averaged over
+            clock: Monotonic time source, in seconds
+        """
+        self.window = window
+        self.clock = clock
+        self.total_bytes = 0
+        self.scan_complete = False
+        self._source: Callable[[], int] = lambda: 0
+        self._samples: deque = deque()
+        self._lock = threading.Lock()
+
+    def add_total(self, size: int):
+        """Add a newly discovered file to the total."""
+        self.total_bytes += size
+
+    def finish_scan(self):
+        """Mark the total as final."""
+        self.scan_complete = True
+
+    def attach(self, source: Callable[[], int]):
+        """Set the callable that returns the bytes processed so far."""
+        self._source = source
+
+    def snapshot(self) -> ProgressSnapshot:
+        """Sample the processed counter and return current progress."""
+        processed = self._source()
+        now = self.clock()
+        with self._lock:
+            samples = self._samples
+            samples.append((now, processed))
+            while len(samples) > 2 and now - samples[0][0] > self.window:
+                samples.popleft()
+            elapsed = now - samples[0][0]
+            rate = (processed - samples[0][1]) / elapsed if elapsed > 0 else 0.0
+
+        total = max(self.total_bytes, processed)
+        percent = processed / total * 100 if total else (100.0 if self.scan_complete else 0.0)
+        eta = (total - processed) / rate if rate > 0 else None
+        return ProgressSnapshot(processed, total, percent, rate, eta, self.scan_complete)
@@ -0,0 +1,281 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Dict, NamedTuple, Optional
+
+from config import (
+    COMPRESSED_EXTENSION, PACK_NAME, READ_CACHE_DIR, READ_CACHE_DISK_BYTES,
+    READ_CACHE_MEMORY_BYTES, READ_CACHE_MEMORY_MAX_FILE
+)
+from services.compression_service import CompressionService
+from services.journal import atomic_write
+from services.pack import PackArchive
+
+_CACHE_EXTENSION = ".orig"
+
+
+class CacheStats(NamedTuple):
+    """Counters of a read-through cache."""
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    evictions: int
+    memory_bytes: int
+    disk_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+class _Source(NamedTuple):
+    """Where the original data of a requested file is stored."""
+    compressed: Path  # .zz file or pack archive
+    member: Optional[str]  # Pack member name, or None for a single-file container
+    key: str  # Changes whenever the stored data does
+
+
+class DecompressionCache:
+    """
+    Read-through access to compressed files, backed by a bounded LRU cache.
+
+    A read of a compressed file inflates it once into an on-disk cache
+    (READ_CACHE_DIR); small files are also kept in memory. Later reads are
+    served from the cache until the .zz changes or the entry is evicted.
+    The .zz files themselves are never touched.
+
+    Entries are keyed by the .zz path and its size and mtime (for pack
+    members, their offset and length, as packs only ever append), so stale
+    data is never served. The disk tier survives restarts: its LRU order is
+    rebuilt from file mtimes, which hits refresh. Safe to use from many threads.
+    """
+
+    def __init__(self, service: Optional[CompressionService] = None, cache_dir: Path = READ_CACHE_DIR,
+                 disk_bytes: int = READ_CACHE_DISK_BYTES, memory_bytes: int = READ_CACHE_MEMORY_BYTES,
+                 memory_max_file: int = READ_CACHE_MEMORY_MAX_FILE):
+        """
+        Args:
+            service: Service used to inflate files
+            cache_dir: Directory of the on-disk tier
+            disk_bytes: Size limit of the on-disk tier
+            memory_bytes: Size limit of the in-memory tier
+            memory_max_file: Largest file kept in memory
+        """
+        self.service = service or CompressionService()
+        self.cache_dir = cache_dir
+        self.disk_bytes = disk_bytes
+        self.memory_bytes = memory_bytes
+        self.memory_max_file = memory_max_file
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> size, least recent first
+        self._memory_total = 0
+        self._disk_total = 0
+        self._loading: Dict[str, threading.Lock] = {}
+        self._hits_memory = self._hits_disk = self._misses = self._evictions = 0
+        self._load_disk_index()
+
+    def _load_disk_index(self):
+        """Rebuild the on-disk LRU order from a previous process's cache files."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self.cache_dir.glob(f"*{_CACHE_EXTENSION}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_total += size
+        with self._lock:
+            self._evict_disk()
+
+    def _cache_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{_CACHE_EXTENSION}"
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits_memory, self._hits_disk, self._misses, self._evictions,
+                              self._memory_total, self._disk_total)
+
+    def locate(self, path: Path) -> _Source:
+        """
+        Find where the original data of path is stored.
+
+        Args:
+            path: Original file path, or the path of a .zz file
+
+        Returns:
+            Source of the data
+
+        Raises:
+            FileNotFoundError: If path was not compressed by ColdCompress
+        """
+        path = Path(os.path.abspath(path))
+        candidates = [path] if path.name.endswith(COMPRESSED_EXTENSION) else []
+        candidates.append(path.with_name(path.name + COMPRESSED_EXTENSION))
+        for compressed in candidates:
+            if compressed.name == PACK_NAME:
+                continue
+            try:
+                stat = compressed.stat()
+            except FileNotFoundError:
+                continue
+            return _Source(compressed, None, self._key(compressed, None, stat.st_size, stat.st_mtime_ns))
+
+        pack_path = path.parent / PACK_NAME
+        if pack_path.is_file():
+            with PackArchive(pack_path) as pack:
+                member = pack.members.get(path.name)
+            if member is not None:
+                return _Source(pack_path, member.name,
+                               self._key(pack_path, member.name, member.offset, member.length))
+        raise FileNotFoundError(f"{path} is not a compressed file")
+
+    @staticmethod
+    def _key(compressed: Path, member: Optional[str], *version: int) -> str:
+        identity = f"{compressed}\0{member or ''}\0" + ":".join(map(str, version))
+        return hashlib.sha1(os.fsencode(identity)).hexdigest()
+
+    def open(self, path: Path) -> BinaryIO:
+        """
+        Open the original data of a compressed file for reading.
+
+        Args:
+            path: Original file path, or the path of a .zz file
+
+        Returns:
+            Seekable binary stream; close it when done
+        """
+        source = self.locate(path)
+        stream = self._lookup(source.key)
+        if stream is not None:
+            return stream
+
+        # One thread inflates a given file; others wait for it and then hit
+        with self._lock:
+            loading = self._loading.setdefault(source.key, threading.Lock())
+        with loading:
+            stream = self._lookup(source.key)
+            if stream is not None:
+                return stream
+            with self._lock:
+                self._misses += 1
+            try:
+                return self._fill(source)
+            finally:
+                with self._lock:
+                    self._loading.pop(source.key, None)
+
+    def read(self, path: Path) -> bytes:
+        """Return the whole original data of a compressed file."""
+        with self.open(path) as f:
+            return f.read()
+
+    def _lookup(self, key: str) -> Optional[BinaryIO]:
+        """Serve a cached entry, refreshing its recency; None on a miss."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._hits_memory += 1
+                return io.BytesIO(data)
+            if key not in self._disk:
+                return None
+            self._disk.move_to_end(key)
+            size = self._disk[key]
+        cache_path = self._cache_path(key)
+        try:
+            stream = open(cache_path, "rb")
+        except FileNotFoundError:
+            # Evicted by another process sharing the cache directory
+            with self._lock:
+                self._forget_disk(key)
+            return None
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
+        with self._lock:
+            self._hits_disk += 1
+        if size <= self.memory_max_file:
+            data = stream.read()
+            stream.close()
+            self._remember(key, data)
+            return io.BytesIO(data)
+        return stream
+
+    def _fill(self, source: _Source) -> BinaryIO:
+        """Inflate a file into the cache and open the cached copy."""
+        cache_path = self._cache_path(source.key)
+        # Other processes may share the cache directory, so never share a temporary file
+        with atomic_write(cache_path, fsync=False, shared=True) as f:
+            self.service.read_original(source.compressed, f, source.member)
+            size = f.tell()
+
+        if size > self.disk_bytes:
+            # Too big to keep; serve this read from the copy and drop it
+            stream = open(cache_path, "rb")
+            self._delete(source.key)
+            return stream
+
+        with self._lock:
+            self._disk[source.key] = size
+            self._disk_total += size
+            self._evict_disk(keep=source.key)
+        if size <= self.memory_max_file:
+            data = cache_path.read_bytes()
+            self._remember(source.key, data)
+            return io.BytesIO(data)
+        return open(cache_path, "rb")
+
+    def _remember(self, key: str, data: bytes):
+        """Keep a small file in memory, evicting the least recently used ones."""
+        with self._lock:
+            if key in self._memory:
+                return
+            self._memory[key] = data
+            self._memory_total += len(data)
+            while self._memory_total > self.memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_total -= len(evicted)
+                self._evictions += 1
+
+    def _forget_disk(self, key: str):
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_total -= size
+
+    def _delete(self, key: str):
+        try:
+            self._cache_path(key).unlink(missing_ok=True)
+        except OSError:
+            # Still open for a reader on Windows; it is swept up on a later start
+            pass
+
+    def _evict_disk(self, keep: Optional[str] = None):
+        """Delete least recently used cache files until the disk tier fits; call with the lock held."""
+        for key in list(self._disk):
+            if self._disk_total <= self.disk_bytes:
+                break
+            if key == keep:
+                continue
+            self._forget_disk(key)
+            self._delete(key)
+            self._evictions += 1
+
+    def clear(self):
+        """Drop every cached entry from memory and disk."""
+        with self._lock:
+            for key in list(self._disk):
+                self._delete(key)
+            self._disk.clear()
+            self._memory.clear()
+            self._disk_total = self._memory_total = 0
@@ -0,0 +1,234 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+from config import SCAN_INDEX_PATH, SCAN_INDEX_TIMEOUT, COMPRESSED_EXTENSION
+
+# Commit after this many directory updates to keep transactions short
+_COMMIT_INTERVAL = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    atime REAL NOT NULL,
+    compressed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+"""
+
+
+class FileRecord(NamedTuple):
+    """Indexed metadata of a single file."""
+    path: str
+    size: int
+    mtime: float
+    atime: float
+    compressed: bool
+
+
+def _subtree_range(folder: str) -> Tuple[str, str]:
+    """Return the [low, high) key range covering every path below folder."""
+    prefix = folder.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class ScanIndex:
+    """
+    Persistent SQLite index of scanned directories and files.
+
+    Each directory is stored with the mtime it had when it was listed. A later
+    scan that finds the same directory mtime can reuse the stored listing instead
+    of reading the directory again, because adding, removing or renaming entries
+    always changes the directory mtime. In-place content changes and atime
+    updates do not, so callers re-stat files before acting on them.
+    """
+
+    def __init__(self, db_path: Path = SCAN_INDEX_PATH, timeout: float = SCAN_INDEX_TIMEOUT):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(db_path), timeout=timeout, check_same_thread=False)
+        try:
+            # Readers in other processes don't block on a writer, and commits stay cheap
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error:
+            pass
+        self._connection.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+
+    def load_directory(self, directory: str, mtime: float) -> Optional[Tuple[List[FileRecord], List[str]]]:
+        """
+        Return the stored listing of a directory if it is still current.
+
+        Args:
+            directory: Directory path
+            mtime: Current directory mtime
+
+        Returns:
+            Tuple of (file records, subdirectory paths), or None if the directory
+            is unknown or has changed since it was indexed
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT mtime FROM directories WHERE path = ?", (directory,)
+            ).fetchone()
+            if row is None or row[0] != mtime:
+                return None
+
+            files = [FileRecord(path, size, file_mtime, atime, bool(compressed))
+                     for path, size, file_mtime, atime, compressed in self._connection.execute(
+                         "SELECT path, size, mtime, atime, compressed FROM files "
+                         "WHERE directory = ? ORDER BY path", (directory,))]
+            subdirs = [path for (path,) in self._connection.execute(
+                "SELECT path FROM directories WHERE parent = ? ORDER BY path", (directory,))]
+        return files, subdirs
+
+    def store_directory(self, directory: str, mtime: float,
+                        files: List[FileRecord], subdirs: List[str]):
+        """
+        Replace the stored listing of a directory.
+
+        Subdirectories that no longer exist are dropped together with everything below them.
+
+        Args:
+            directory: Directory path
+            mtime: Directory mtime observed before it was listed
+            files: Records of every file in the directory
+            subdirs: Paths of its subdirectories
+        """
+        with self._lock:
+            connection = self._connection
+            existing = {path for (path,) in connection.execute(
+                "SELECT path FROM directories WHERE parent = ?", (directory,))}
+            for removed in existing.difference(subdirs):
+                self._delete_subtree(removed)
+
+            connection.execute("DELETE FROM files WHERE directory = ?", (directory,))
+            connection.executemany(
+                "INSERT OR REPLACE INTO files (path, directory, size, mtime, atime, compressed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(record.path, directory, record.size, record.mtime, record.atime,
+                  int(record.compressed)) for record in files]
+            )
+            # A stored subdirectory is refreshed when it is visited; new ones get mtime -1
+            # so their first lookup always misses. A subdirectory first scanned as a root
+            # has no parent yet, and must get one or its parent's cached listing loses it.
+            connection.executemany(
+                "INSERT INTO directories (path, parent, mtime) VALUES (?, ?, -1) "
+                "ON CONFLICT (path) DO UPDATE SET parent = excluded.parent",
+                [(subdir, directory) for subdir in subdirs]
+            )
+            connection.execute(
+                "INSERT INTO directories (path, parent, mtime) VALUES (?, NULL, ?) "
+                "ON CONFLICT (path) DO UPDATE SET mtime = excluded.mtime, "
+                "parent = COALESCE(excluded.parent, parent)",
+                (directory, mtime)
+            )
+
+            self._uncommitted += 1
+            if self._uncommitted >= _COMMIT_INTERVAL:
+                self._commit()
+
+    def update_file(self, record: FileRecord):
+        """Refresh the stored metadata of a single file."""
+        with self._lock:
+            self._connection.execute(
+                "UPDATE files SET size = ?, mtime = ?, atime = ?, compressed = ? WHERE path = ?",
+                (record.size, record.mtime, record.atime, int(record.compressed), record.path)
+            )
+
+    def record_move(self, removed: Path, created: Path):
+        """
+        Reflect a compression or decompression that replaced one file with another.
+
+        Keeps folder statistics current between scans; the directory itself is
+        relisted on the next scan because its mtime changed.
+
+        Args:
+            removed: Path that no longer exists
+            created: Path that now exists in its place
+        """
+        try:
+            stat = os.stat(created)
+        except OSError:
+            return
+        created_path = str(created)
+        with self._lock:
+            self._connection.execute("DELETE FROM files WHERE path = ?", (str(removed),))
+            self._connection.execute(
+                "INSERT OR REPLACE INTO files (path, directory, size, mtime, atime, compressed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (created_path, os.path.dirname(created_path), stat.st_size, stat.st_mtime,
+                 stat.st_atime, int(created_path.endswith(COMPRESSED_EXTENSION)))
+            )
+
+    def folder_stats(self, folder: str) -> Optional[Tuple[int, int]]:
+        """
+        Answer folder statistics from the index alone.
+
+        Args:
+            folder: Root folder
+
+        Returns:
+            Tuple of (total_files, compressed_files), or None if the folder was never scanned
+        """
+        low, high = _subtree_range(folder)
+        with self._lock:
+            if self._connection.execute(
+                    "SELECT 1 FROM directories WHERE path = ? AND mtime >= 0", (folder,)
+            ).fetchone() is None:
+                return None
+            total, compressed = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(compressed), 0) FROM files "
+                "WHERE directory = ? OR (directory >= ? AND directory < ?)",
+                (folder, low, high)
+            ).fetchone()
+        return total, compressed
+
+    def flush(self):
+        """Commit pending updates."""
+        with self._lock:
+            self._commit()
+
+    def discard(self):
+        """Roll back pending updates, releasing the write lock; errors are ignored."""
+        with self._lock:
+            try:
+                self._connection.rollback()
+            except sqlite3.Error:
+                pass
+            self._uncommitted = 0
+
+    def close(self):
+        """Commit pending updates and close the database."""
+        try:
+            self.flush()
+        finally:
+            self._connection.close()
+
+    def _commit(self):
+        self._connection.commit()
+        self._uncommitted = 0
+
+    def _delete_subtree(self, directory: str):
+        """Remove a directory and everything indexed below it."""
+        low, high = _subtree_range(directory)
+        self._connection.execute(
+            "DELETE FROM files WHERE directory = ? OR (directory >= ? AND directory < ?)",
+            (directory, low, high)
+        )
+        self._connection.execute(
+            "DELETE FROM directories WHERE path = ? OR (path >= ? AND path < ?)",
+            (directory, low, high)
+        )
@@ -0,0 +1,370 @@
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from config import COMPRESSED_EXTENSION, SCAN_WORKERS, SCAN_ORDERED, TEMP_SUFFIX, DEDUP_STORE_NAME, POLICY_FILE
+from services.dictionary import is_dictionary_file
+from services.scan_index import FileRecord, ScanIndex
+from services.selection_policy import CompiledRules, PolicyMatcher, SelectionPolicy
+
+
+class ScanEntry(NamedTuple):
+    """A file of interest found during a scan."""
+    path: Path
+    compressed: bool
+    stat: Optional[os.stat_result]  # Only populated for cold candidates
+    size: int  # File size in bytes (compressed size for .zz files)
+
+
+class ScanStats:
+    """Counters gathered while a scan runs."""
+
+    def __init__(self):
+        self.total_files = 0
+        self.compressed_files = 0
+        self.candidate_files = 0
+        self.candidate_bytes = 0
+        self.compressed_bytes = 0
+
+    def merge(self, other: "ScanStats"):
+        """Add the counters of another (per-directory) stats object."""
+        self.total_files += other.total_files
+        self.compressed_files += other.compressed_files
+        self.candidate_files += other.candidate_files
+        self.candidate_bytes += other.candidate_bytes
+        self.compressed_bytes += other.compressed_bytes
+
+
+class DirectoryScanner:
+    """
+    Single-pass directory scanner built on os.scandir.
+
+    One traversal yields cold candidates and compressed files as they are found
+    and fills in folder statistics, so consumers can start work before the scan
+    finishes. Files are stat'ed through the DirEntry cache, and only when needed.
+    A directory is classified completely before its entries are yielded, so
+    no candidate's stat is taken after a consumer has read its neighbours
+    (e.g. to train a dictionary).
+
+    With more than one worker, directories are listed concurrently on a bounded
+    thread pool, which hides per-directory latency on network mounts. In ordered
+    mode entries are sorted by name and yielded in depth-first order regardless
+    of which listing finishes first.
+
+    With a ScanIndex, directories whose mtime is unchanged since the last scan
+    are served from the index without being listed; only files whose name and
+    path the rules could select are re-stat'ed.
+    Index updates are committed before a directory's entries are handed out.
+    If the index fails (e.g. another process holds its write lock), it is
+    dropped for the rest of the scan and directories are listed directly.
+
+    Which files are cold candidates is decided by a SelectionPolicy, compiled
+    once per directory (default: last access older than threshold_days).
+    """
+
+    def __init__(self, threshold_days: Optional[int] = None, now: Optional[float] = None,
+                 workers: int = SCAN_WORKERS, ordered: bool = SCAN_ORDERED,
+                 index: Optional[ScanIndex] = None, policy: Optional[SelectionPolicy] = None):
+        """
+        Args:
+            threshold_days: Age threshold for cold candidates; None disables candidate detection
+            now: Reference time for age checks (defaults to the current time)
+            workers: Number of directories listed concurrently
+            ordered: Yield entries in a deterministic, name-sorted depth-first order
+            index: Persistent scan index used to skip unchanged directories
+            policy: Candidate selection rules (defaults to config.SELECTION_POLICY)
+        """
+        self.threshold_days = threshold_days
+        self.now = time.time() if now is None else now
+        self.workers = max(1, workers)
+        self.ordered = ordered
+        self.index = index
+        self._index_failed = False
+        self.policy = policy or SelectionPolicy()
+        self._matcher: Optional[PolicyMatcher] = None
+        self.stats = ScanStats()
+
+    def scan(self, folder: Path) -> Iterator[ScanEntry]:
+        """
+        Walk folder recursively, yielding cold candidates and compressed files.
+
+        Args:
+            folder: Root folder to scan
+
+        Returns:
+            Iterator of scan entries; self.stats is complete once it is exhausted
+        """
+        self.stats = ScanStats()
+        self._index_failed = False
+        root = os.fspath(folder) if self.index is None else os.path.abspath(folder)
+        self._matcher = (self.policy.bind(root, self.threshold_days, self.now)
+                         if self.threshold_days is not None else None)
+        if self.index is None:
+            return self._scan(root)
+        return self._scan_with_index(root)
+
+    def _scan(self, root: str) -> Iterator[ScanEntry]:
+        """Dispatch to the traversal strategy selected by workers/ordered."""
+        if self.workers == 1:
+            return self._scan_sequential(root)
+        if self.ordered:
+            return self._scan_parallel_ordered(root)
+        return self._scan_parallel(root)
+
+    @property
+    def active_index(self) -> Optional[ScanIndex]:
+        """The scan index, or None if there is none or it failed during this scan."""
+        return None if self._index_failed else self.index
+
+    def disable_index(self):
+        """Stop using the index for the rest of this scan; a locked cache must never block a scan."""
+        self._index_failed = True
+        self.index.discard()
+
+    def _scan_with_index(self, root: str) -> Iterator[ScanEntry]:
+        """Run a scan and commit the index updates it made, even if it is abandoned."""
+        try:
+            yield from self._scan(root)
+        finally:
+            if not self._index_failed:
+                try:
+                    self.index.flush()
+                except sqlite3.Error:
+                    self.disable_index()
+
+    def _scan_sequential(self, root: str) -> Iterator[ScanEntry]:
+        """Depth-first traversal on the calling thread."""
+        stack = [root]
+        while stack:
+            subdirs = []
+            yield from self._scan_directory(stack.pop(), subdirs, self.stats)
+            stack.extend(reversed(subdirs))
+
+    def _list_directory(self, directory: str) -> Tuple[List[ScanEntry], List[str], ScanStats]:
+        """Scan one directory completely; runs on a pool thread."""
+        subdirs = []
+        stats = ScanStats()
+        entries = list(self._scan_directory(directory, subdirs, stats))
+        return entries, subdirs, stats
+
+    def _scan_parallel(self, root: str) -> Iterator[ScanEntry]:
+        """Fan out across subdirectories, yielding each listing as soon as it completes."""
+        max_pending = self.workers * 2
+        waiting = deque([root])
+        pending: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while waiting or pending:
+                while waiting and len(pending) < max_pending:
+                    directory = waiting.popleft()
+                    pending[pool.submit(self._list_directory, directory)] = directory
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del pending[future]
+                    entries, subdirs, stats = future.result()
+                    self.stats.merge(stats)
+                    waiting.extend(subdirs)
+                    yield from entries
+
+    def _scan_parallel_ordered(self, root: str) -> Iterator[ScanEntry]:
+        """Prefetch listings concurrently but yield them in depth-first order."""
+        max_pending = self.workers * 2
+        # Directories still to visit, nearest last; those being prefetched are futures
+        stack: List[Union[str, Future]] = [root]
+        prefetched = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while stack:
+                # Prefetch the directories visited next, keeping at most max_pending listings in flight
+                for position in range(len(stack) - 1, max(-1, len(stack) - 1 - max_pending), -1):
+                    if prefetched >= max_pending:
+                        break
+                    if not isinstance(stack[position], Future):
+                        stack[position] = pool.submit(self._list_directory, stack[position])
+                        prefetched += 1
+
+                future = stack.pop()
+                if isinstance(future, Future):
+                    prefetched -= 1
+                else:
+                    future = pool.submit(self._list_directory, future)
+                entries, subdirs, stats = future.result()
+                self.stats.merge(stats)
+                stack.extend(reversed(subdirs))
+                yield from entries
+
+    def _scan_directory(self, directory: str, subdirs: List[str],
+                        stats: ScanStats) -> Iterator[ScanEntry]:
+        """Scan the entries of one directory, collecting subdirectories to visit."""
+        if self.index is not None and not self._index_failed:
+            listing = self._load_indexed(directory)
+            if listing is not None:
+                yield from self._scan_directory_indexed(directory, subdirs, stats, *listing)
+                return
+            if not self._index_failed:
+                # The directory can't be read
+                return
+
+        rules = self._matcher.for_directory(directory) if self._matcher is not None else None
+        entries: List[ScanEntry] = []
+        try:
+            with os.scandir(directory) as iterator:
+                dir_entries = sorted(iterator, key=lambda e: e.name) if self.ordered else iterator
+                for entry in dir_entries:
+                    scan_entry = self._classify_entry(entry, subdirs, stats, rules)
+                    if scan_entry is not None:
+                        entries.append(scan_entry)
+        except OSError:
+            # Skip directories that can't be accessed
+            return
+        yield from entries
+
+    @staticmethod
+    def _collect_subdir(entry: os.DirEntry, subdirs: List[str]) -> bool:
+        """Record entry if it is a directory to descend into; return True for any directory."""
+        try:
+            if entry.is_dir():
+                # Like os.walk, do not descend into symlinked directories; the
+                # dedup store is reached only through links to its blobs
+                if not entry.is_symlink() and entry.name != DEDUP_STORE_NAME:
+                    subdirs.append(entry.path)
+                return True
+        except OSError:
+            pass
+        return False
+
+    @staticmethod
+    def _is_internal(name: str) -> bool:
+        """Return True for files ColdCompress manages itself and never compresses."""
+        # Temporary outputs belong to an in-flight (or interrupted) operation
+        return name.endswith(TEMP_SUFFIX) or is_dictionary_file(name) or name == POLICY_FILE
+
+    def _classify_entry(self, entry: os.DirEntry, subdirs: List[str], stats: ScanStats,
+                        rules: Optional[CompiledRules]) -> Optional[ScanEntry]:
+        """Sort a directory entry into subdirectory, compressed file or cold candidate."""
+        if self._collect_subdir(entry, subdirs) or self._is_internal(entry.name):
+            return None
+
+        stats.total_files += 1
+        if entry.name.endswith(COMPRESSED_EXTENSION):
+            try:
+                size = entry.stat().st_size
+            except OSError:
+                size = 0
+            stats.compressed_files += 1
+            stats.compressed_bytes += size
+            return ScanEntry(Path(entry.path), True, None, size)
+
+        if rules is None:
+            return None
+        try:
+            stat = entry.stat()
+        except OSError:
+            # Skip files that can't be accessed
+            return None
+        return self._check_candidate(entry.path, entry.name, stat, stats, rules)
+
+    @staticmethod
+    def _check_candidate(path: str, name: str, stat: os.stat_result, stats: ScanStats,
+                         rules: CompiledRules) -> Optional[ScanEntry]:
+        """Return a candidate entry if the selection rules pick the file."""
+        if not rules.matches(path, name, stat):
+            return None
+        stats.candidate_files += 1
+        stats.candidate_bytes += stat.st_size
+        return ScanEntry(Path(path), False, stat, stat.st_size)
+
+    def _load_indexed(self, directory: str) -> Optional[Tuple[List[FileRecord], List[str], bool]]:
+        """
+        Serve an unchanged directory from the index, or list it and refresh the index.
+
+        Returns:
+            Tuple of (file records, subdirectories, served from cache), or None if the
+            directory can't be read or the index failed (see self._index_failed)
+        """
+        try:
+            # Read the mtime before listing so concurrent changes trigger a later rescan
+            directory_mtime = os.stat(directory).st_mtime
+        except OSError:
+            return None
+
+        try:
+            cached = self.index.load_directory(directory, directory_mtime)
+            if cached is not None:
+                return cached[0], cached[1], True
+            subdirs: List[str] = []
+            records = self._list_records(directory, subdirs)
+            if records is None:
+                return None
+            self.index.store_directory(directory, directory_mtime, records, subdirs)
+            # Never hold the write lock while the consumer works through the entries
+            self.index.flush()
+        except sqlite3.Error:
+            self.disable_index()
+            return None
+        return records, subdirs, False
+
+    def _scan_directory_indexed(self, directory: str, subdirs: List[str], stats: ScanStats,
+                                records: List[FileRecord], listed_subdirs: List[str],
+                                cached: bool) -> Iterator[ScanEntry]:
+        """Yield the entries of a directory listing taken from (or just stored in) the index."""
+        subdirs.extend(listed_subdirs)
+        rules = self._matcher.for_directory(directory) if self._matcher is not None else None
+        entries: List[ScanEntry] = []
+        refreshed: List[FileRecord] = []
+        for record in records:
+            stats.total_files += 1
+            if record.compressed:
+                stats.compressed_files += 1
+                stats.compressed_bytes += record.size
+                entries.append(ScanEntry(Path(record.path), True, None, record.size))
+            elif rules is not None and rules.may_match(record.path, os.path.basename(record.path)):
+                # Size and timestamp changes never touch the directory mtime, so
+                # judge cached files by a fresh stat
+                try:
+                    stat = os.stat(record.path)
+                except OSError:
+                    continue
+                fresh = self._record(record.path, stat)
+                if cached and fresh != record:
+                    refreshed.append(fresh)
+                scan_entry = self._check_candidate(record.path, os.path.basename(record.path),
+                                                   stat, stats, rules)
+                if scan_entry is not None:
+                    entries.append(scan_entry)
+
+        if refreshed and not self._index_failed:
+            try:
+                for record in refreshed:
+                    self.index.update_file(record)
+                self.index.flush()
+            except sqlite3.Error:
+                self.disable_index()
+        yield from entries
+
+    def _list_records(self, directory: str, subdirs: List[str]) -> Optional[List[FileRecord]]:
+        """Stat every file in a directory for the index."""
+        records = []
+        try:
+            with os.scandir(directory) as iterator:
+                for entry in sorted(iterator, key=lambda e: e.name):
+                    if self._collect_subdir(entry, subdirs) or self._is_internal(entry.name):
+                        continue
+                    try:
+                        records.append(self._record(entry.path, entry.stat()))
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return records
+
+    @staticmethod
+    def _record(path: str, stat: os.stat_result) -> FileRecord:
+        """Build an index record from a stat result."""
+        return FileRecord(path, stat.st_size, stat.st_mtime, stat.st_atime,
+                          path.endswith(COMPRESSED_EXTENSION))
@@ -0,0 +1,151 @@
+import heapq
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from config import (
+    COMPRESSIBILITY_PRIORS, DEFAULT_COMPRESSIBILITY, CODEC_COSTS, INCOMPRESSIBLE_EXTENSIONS,
+    SCHEDULER_WINDOW, SCHEDULER_WARMUP, SCHEDULER_FILE_OVERHEAD, SCHEDULER_PROBE_MIN_SIZE,
+    SCHEDULER_LARGE_FILE
+)
+from services.codec_policy import CodecPolicy
+from services.codecs import Codec
+from services.probe import CompressibilityProbe, ProbeResult
+from services.scanner import ScanEntry
+
+
+class Estimate(NamedTuple):
+    """Expected payoff and cost of compressing one file."""
+    savings: float  # Bytes expected to be reclaimed
+    work: float  # Cost in byte-equivalents of zlib work, including per-file overhead
+
+    @property
+    def score(self) -> float:
+        """Bytes reclaimed per unit of work."""
+        return self.savings / self.work if self.work > 0 else 0.0
+
+
+class CompressionScheduler:
+    """
+    Orders cold candidates so the most space is reclaimed per unit of work.
+
+    Each file is scored by its expected savings (size times a compressibility
+    ratio) over its expected work (size times the relative cost of the codec
+    the policy picks, plus a fixed per-file overhead). Ratios come from
+    per-extension priors; files of at least probe_min_size are sampled by the
+    compressibility probe instead, and the result is kept for the worker (see
+    take_probe), so no file is probed twice. Scoring uses only the scan's stat,
+    so small files are never read twice.
+
+    Candidates are ordered within a sliding window, so memory stays bounded and
+    work starts before the scan finishes: the first candidate is dispatched
+    once warmup candidates are in sight, and the window then grows towards
+    its full size as candidates are dispatched. Large files are spread out so that
+    they never occupy more than half of the workers at once, keeping small
+    jobs flowing and avoiding a tail of stragglers.
+    """
+
+    def __init__(self, codec_policy: CodecPolicy, probe: Optional[CompressibilityProbe] = None,
+                 window: int = SCHEDULER_WINDOW, warmup: int = SCHEDULER_WARMUP,
+                 file_overhead: int = SCHEDULER_FILE_OVERHEAD, probe_min_size: int = SCHEDULER_PROBE_MIN_SIZE,
+                 large_file: int = SCHEDULER_LARGE_FILE):
+        """
+        Args:
+            codec_policy: Policy the service compresses with, for the codec cost
+            probe: Compressibility probe for large files; None relies on priors alone
+            window: Most candidates held for ordering at once; 0 orders the whole scan
+            warmup: Candidates collected before the first one is dispatched
+            file_overhead: Fixed per-file cost in bytes (open, journal, fsync, rename)
+            probe_min_size: Files at least this large are probed rather than judged by extension
+            large_file: Files at least this large count as large jobs when balancing
+        """
+        self.codec_policy = codec_policy
+        self.probe = probe
+        self.window = window
+        self.warmup = warmup
+        self.file_overhead = file_overhead
+        self.probe_min_size = probe_min_size
+        self.large_file = large_file
+        self.incompressible = frozenset(ext.lower() for ext in INCOMPRESSIBLE_EXTENSIONS)
+        self._probed: Dict[Path, ProbeResult] = {}
+
+    def estimate(self, entry: ScanEntry) -> Estimate:
+        """
+        Estimate the savings and work of compressing a candidate.
+
+        Args:
+            entry: Cold candidate from the scanner
+
+        Returns:
+            Estimate for the file
+        """
+        size = entry.size
+        codec, level = self.codec_policy.select(entry.path, size)
+        work = size * CODEC_COSTS.get(codec.name, 1.0) + self.file_overhead
+        return Estimate(size * self._ratio(entry.path, size, codec, level), work)
+
+    def _ratio(self, path: Path, size: int, codec: Codec, level: int) -> float:
+        """Expected fraction of a file's size that compression reclaims."""
+        extension = path.suffix.lower()
+        if extension in self.incompressible:
+            return 0.0
+        if self.probe is not None and size >= self.probe_min_size:
+            try:
+                result = self.probe.check(path, size, codec, level)
+            except OSError:
+                return 0.0
+            self._probed[path] = result
+            return result.estimated_savings / 100 if result.compress else 0.0
+        return COMPRESSIBILITY_PRIORS.get(extension, DEFAULT_COMPRESSIBILITY)
+
+    def take_probe(self, path: Path) -> Optional[ProbeResult]:
+        """Hand over the probe result the scheduler took for a file, if it probed it."""
+        return self._probed.pop(path, None)
+
+    def order(self, entries: Iterable[ScanEntry], workers: int) -> Iterator[ScanEntry]:
+        """
+        Yield candidates best-first, with large files spread across the workers.
+
+        Args:
+            entries: Cold candidates in scan order
+            workers: Number of files processed concurrently
+
+        Returns:
+            Iterator over the same candidates in scheduling order
+        """
+        self._probed.clear()
+        return self._balance(self._by_score(entries), workers)
+
+    def _by_score(self, entries: Iterable[ScanEntry]) -> Iterator[ScanEntry]:
+        """Order candidates by score within a window that grows from warmup to window."""
+        heap: List[Tuple[float, int, ScanEntry]] = []
+        limit = min(self.warmup, self.window)
+        for sequence, entry in enumerate(entries):
+            heapq.heappush(heap, (-self.estimate(entry).score, sequence, entry))
+            if self.window and len(heap) > limit:
+                yield heapq.heappop(heap)[2]
+                # Widen by one per dispatch, so the window fills at half the scan rate
+                limit = min(limit + 1, self.window)
+        while heap:
+            yield heapq.heappop(heap)[2]
+
+    def _balance(self, ordered: Iterator[ScanEntry], workers: int) -> Iterator[ScanEntry]:
+        """Hold back large files while they would take more than half of the last workers dispatches."""
+        if workers <= 1:
+            yield from ordered
+            return
+        max_large = workers // 2
+        recent: Deque[bool] = deque(maxlen=workers)  # Whether each recent dispatch was large
+        deferred: Deque[ScanEntry] = deque()
+
+        for entry in ordered:
+            if entry.size >= self.large_file:
+                deferred.append(entry)
+            else:
+                recent.append(False)
+                yield entry
+            # Only large files left in sight: let them through rather than stall
+            while deferred and (sum(recent) < max_large or len(deferred) > workers):
+                recent.append(True)
+                yield deferred.popleft()
+        yield from deferred
@@ -0,0 +1,213 @@
+import fnmatch
+import json
+import os
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Pattern
+
+from config import EXTENSION_CLASSES, POLICY_FILE, SELECTION_POLICY
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+AGE_FIELDS = ('atime', 'mtime', 'ctime', 'newest')
+
+# Rules a per-directory policy file may not change
+_RUN_ONLY_RULES = ('max_bytes_per_run',)
+
+
+def _compile_globs(patterns: Iterable[str]) -> Optional[Pattern]:
+    """Fold glob patterns into one case-insensitive regex, or None if there are none."""
+    patterns = list(patterns)
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns), re.IGNORECASE)
+
+
+class CompiledRules:
+    """
+    The rules in force for one directory, reduced to a few comparisons per file.
+
+    Glob lists become single regexes, extension classes become one set and the
+    age becomes an absolute cutoff, so matching a file costs no allocation
+    beyond its relative path (and that only when path globs are in use).
+    """
+
+    __slots__ = ('rules', 'root', 'age_field', 'cutoff', 'min_size', 'max_size',
+                 'include_names', 'include_paths', 'exclude_names', 'exclude_paths',
+                 'include_extensions', 'exclude_extensions')
+
+    def __init__(self, rules: Dict[str, Any], root: str, cutoff: Optional[float],
+                 extension_classes: Dict[str, Iterable[str]]):
+        self.rules = rules
+        self.root = root
+        self.age_field = rules.get('age_field', 'atime')
+        if self.age_field not in AGE_FIELDS:
+            raise ValueError(f"Unknown age_field '{self.age_field}'; expected one of {AGE_FIELDS}")
+        self.cutoff = cutoff
+        self.min_size = rules.get('min_size') or 0
+        self.max_size = rules.get('max_size')
+
+        # Globs without a separator match the file name, others the path below the scan root
+        include = rules.get('include') or []
+        exclude = rules.get('exclude') or []
+        self.include_names = _compile_globs(p for p in include if '/' not in p)
+        self.include_paths = _compile_globs(p for p in include if '/' in p)
+        self.exclude_names = _compile_globs(p for p in exclude if '/' not in p)
+        self.exclude_paths = _compile_globs(p for p in exclude if '/' in p)
+        self.include_extensions = self._extensions(rules.get('include_classes'), extension_classes)
+        self.exclude_extensions = self._extensions(rules.get('exclude_classes'), extension_classes) or frozenset()
+
+    @staticmethod
+    def _extensions(classes: Optional[List[str]],
+                    extension_classes: Dict[str, Iterable[str]]) -> Optional[FrozenSet[str]]:
+        if not classes:
+            return None
+        try:
+            return frozenset(ext.lower() for name in classes for ext in extension_classes[name])
+        except KeyError as e:
+            raise ValueError(f"Unknown extension class {e}") from None
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def _matches_name(self, path: str, name: str) -> bool:
+        """Check the rules on a file's name and path, which only change along with its directory."""
+        extension = os.path.splitext(name)[1].lower()
+        if extension in self.exclude_extensions:
+            return False
+        if self.include_extensions is not None and extension not in self.include_extensions:
+            return False
+        if self.exclude_names is not None and self.exclude_names.match(name):
+            return False
+        if self.exclude_paths is not None and self.exclude_paths.match(self._relative(path)):
+            return False
+        if self.include_names is None and self.include_paths is None:
+            return True
+        return bool((self.include_names is not None and self.include_names.match(name))
+                    or (self.include_paths is not None and self.include_paths.match(self._relative(path))))
+
+    def age_of(self, stat: os.stat_result) -> float:
+        """Return the timestamp the age rule compares against the cutoff."""
+        if self.age_field == 'newest':
+            return max(stat.st_atime, stat.st_mtime)
+        return getattr(stat, f"st_{self.age_field}")
+
+    def matches(self, path: str, name: str, stat: os.stat_result) -> bool:
+        """Return True if a file is a cold candidate under these rules."""
+        if self.cutoff is not None and self.age_of(stat) >= self.cutoff:
+            return False
+        size = stat.st_size
+        if size < self.min_size or (self.max_size is not None and size > self.max_size):
+            return False
+        return self._matches_name(path, name)
+
+    def may_match(self, path: str, name: str) -> bool:
+        """
+        Pre-filter an indexed file by its name and path, before paying for a fresh stat.
+
+        Size and timestamps are left to matches(): appending to or truncating
+        a file, or setting its timestamps back, never changes the mtime of its
+        directory, so indexed values of them can't rule a file out.
+        """
+        return self._matches_name(path, name)
+
+
+class SelectionPolicy:
+    """
+    Declarative rules deciding which files are cold candidates.
+
+    The base rules come from config.SELECTION_POLICY. A directory may hold a
+    policy file (.coldcompress.json) whose keys override the rules for that
+    directory and everything below it. Rules are compiled once per directory
+    per scan; see CompiledRules.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None, policy_file: Optional[str] = POLICY_FILE,
+                 extension_classes: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Args:
+            rules: Base rules (see config.SELECTION_POLICY)
+            policy_file: Name of per-directory override files; None disables them
+            extension_classes: Named extension lists usable in include_classes/exclude_classes
+        """
+        self.rules = dict(SELECTION_POLICY if rules is None else rules)
+        self.policy_file = policy_file
+        self.extension_classes = EXTENSION_CLASSES if extension_classes is None else extension_classes
+        # Fail on bad rules now rather than halfway through a scan
+        CompiledRules(self.rules, os.getcwd(), None, self.extension_classes)
+
+    @property
+    def max_bytes_per_run(self) -> int:
+        """Most candidate bytes one run may process; 0 for no limit."""
+        return self.rules.get('max_bytes_per_run') or 0
+
+    def bind(self, root: str, threshold_days: Optional[int], now: float) -> "PolicyMatcher":
+        """
+        Prepare the rules for one scan.
+
+        Args:
+            root: Scan root; path globs are relative to it
+            threshold_days: Age threshold from the caller, used unless the rules set 'days'
+            now: Reference time for age checks
+
+        Returns:
+            Matcher resolving the rules of each directory
+        """
+        return PolicyMatcher(self, root, threshold_days, now)
+
+
+class PolicyMatcher:
+    """Per-scan cache of the compiled rules of every directory."""
+
+    def __init__(self, policy: SelectionPolicy, root: str, threshold_days: Optional[int], now: float):
+        self.policy = policy
+        self.root = root
+        self.threshold_days = threshold_days
+        self.now = now
+        self._by_directory: Dict[str, CompiledRules] = {}
+        self.base = self._compile(policy.rules)
+
+    def _compile(self, rules: Dict[str, Any]) -> CompiledRules:
+        days = rules.get('days', self.threshold_days)
+        cutoff = self.now - days * SECONDS_PER_DAY if days is not None else None
+        return CompiledRules(rules, self.root, cutoff, self.policy.extension_classes)
+
+    def for_directory(self, directory: str) -> CompiledRules:
+        """
+        Return the rules in force for files in directory.
+
+        Directories are scanned top-down, so a directory's parent has normally
+        been resolved already; policy files are only looked for once per directory.
+        """
+        compiled = self._by_directory.get(directory)
+        if compiled is not None:
+            return compiled
+
+        parent = os.path.dirname(directory)
+        if directory == self.root or parent == directory:
+            inherited = self.base
+        else:
+            inherited = self.for_directory(parent)
+        compiled = self._with_overrides(directory, inherited)
+        self._by_directory[directory] = compiled
+        return compiled
+
+    def _with_overrides(self, directory: str, inherited: CompiledRules) -> CompiledRules:
+        """Apply a directory's policy file on top of the inherited rules."""
+        if self.policy.policy_file is None:
+            return inherited
+        try:
+            with open(os.path.join(directory, self.policy.policy_file), encoding="utf-8") as f:
+                overrides = json.load(f)
+        except FileNotFoundError:
+            return inherited
+        except (OSError, ValueError):
+            # An unreadable or malformed policy file must not widen the selection
+            overrides = {'exclude': ['*']}
+        if not isinstance(overrides, dict):
+            overrides = {'exclude': ['*']}
+        rules = {**inherited.rules, **{key: value for key, value in overrides.items()
+                                       if key not in _RUN_ONLY_RULES}}
+        try:
+            return self._compile(rules)
+        except (TypeError, ValueError):
+            return self._compile({**inherited.rules, 'exclude': ['*']})
@@ -0,0 +1,22 @@
+import pytest
+
+from services import benchmark
+
+
+def test_unknown_codec_is_rejected_before_any_corpus_is_built(monkeypatch, capsys):
+    def generate(*args, **kwargs):
+        raise AssertionError("corpus generated before validation")
+
+    monkeypatch.setattr(benchmark, "generate_corpus", generate)
+    assert benchmark.main(["--codecs", "zlib,nope", "--size-mb", "0.01"]) == 2
+    assert "Unknown codec: nope" in capsys.readouterr().err
+
+    with pytest.raises(ValueError, match="Unknown layout: tiny"):
+        next(benchmark.run_benchmark(layouts=("tiny",)))
+
+
+def test_small_run_reports_one_row_per_configuration():
+    rows = list(benchmark.run_benchmark(corpora=("text",), layouts=("large",), levels=(1, 6),
+                                        size_mb=0.05))
+    assert [(row['codec'], row['level']) for row in rows] == [("zlib", 1), ("zlib", 6)]
+    assert all(row['errors'] == 0 and row['ratio'] > 1 for row in rows)
@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+CLI = Path(__file__).resolve().parent.parent / "cli.py"
+OLD = 1_000_000_000
+
+
+def _run(tmp_path, *args):
+    # Keep the scan index, journal and metrics of the run inside tmp_path
+    env = dict(os.environ, LOCALAPPDATA=str(tmp_path / "cache"))
+    return subprocess.run([sys.executable, str(CLI), *map(str, args)], env=env,
+                          capture_output=True, text=True, timeout=120)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    root = tmp_path / "data"
+    (root / "sub").mkdir(parents=True)
+    for path in (root / "a.txt", root / "sub" / "b.csv"):
+        path.write_bytes(b"cold,row,of,data\n" * 2000)
+        os.utime(path, (OLD, OLD))
+    (root / "hot.txt").write_bytes(b"recently used\n" * 100)
+    return root
+
+
+def test_compress_verify_decompress_round_trip(tmp_path, folder):
+    result = _run(tmp_path, "compress", folder, "--json")
+    assert result.returncode == 0, result.stderr
+    summary = json.loads(result.stdout)['summary']
+    assert (summary['candidate_files'], summary['files_succeeded']) == (2, 2)
+    assert sorted(p.name for p in folder.rglob("*.zz")) == ["a.txt.zz", "b.csv.zz"]
+    assert (folder / "hot.txt").exists()
+
+    result = _run(tmp_path, "verify", folder)
+    assert result.returncode == 0, result.stdout
+    assert "Files processed: 2 (succeeded 2" in result.stdout
+
+    result = _run(tmp_path, "decompress", folder)
+    assert result.returncode == 0, result.stdout
+    assert not list(folder.rglob("*.zz"))
+    assert (folder / "sub" / "b.csv").read_bytes() == b"cold,row,of,data\n" * 2000
+    assert (folder / "a.txt").stat().st_mtime == OLD
+
+
+def test_dry_run_changes_nothing(tmp_path, folder):
+    result = _run(tmp_path, "compress", folder, "--dry-run")
+    assert result.returncode == 0
+    assert result.stdout.count("Would compress") == 2
+    assert not list(folder.rglob("*.zz"))
+
+
+def test_failed_files_exit_with_one(tmp_path, folder):
+    assert _run(tmp_path, "compress", folder).returncode == 0
+    damaged = folder / "a.txt.zz"
+    data = bytearray(damaged.read_bytes())
+    data[len(data) // 3] ^= 0xFF
+    damaged.write_bytes(bytes(data))
+
+    result = _run(tmp_path, "verify", folder)
+    assert result.returncode == 1
+    assert "❌ Corrupt" in result.stdout
+    assert _run(tmp_path, "decompress", folder).returncode == 1
+    assert damaged.exists() and not (folder / "a.txt").exists()
+
+
+def test_usage_errors_exit_with_two(tmp_path, folder):
+    assert _run(tmp_path, "compress", tmp_path / "missing").returncode == 2
+    policy = tmp_path / "policy.json"
+    policy.write_text("[1, 2]")
+    result = _run(tmp_path, "compress", folder, "--policy", policy)
+    assert result.returncode == 2
+    assert "invalid selection policy" in result.stderr
+    assert _run(tmp_path, "extract", tmp_path / "missing.zz").returncode == 2
+    assert _run(tmp_path, "compress").returncode == 2  # argparse: missing folder
+
+
+def test_stats_and_scan_report_json(tmp_path, folder):
+    assert _run(tmp_path, "compress", folder).returncode == 0
+    stats = json.loads(_run(tmp_path, "stats", folder, "--sizes", "--json").stdout)
+    assert (stats['total_files'], stats['compressed_files']) == (3, 2)
+    assert stats['logical_bytes'] == 2 * len(b"cold,row,of,data\n" * 2000)
+    entries = json.loads(_run(tmp_path, "scan", folder, "--json").stdout)['entries']
+    assert sorted(Path(entry['path']).name for entry in entries) == ["a.txt.zz", "b.csv.zz"]
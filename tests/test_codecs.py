@@ -0,0 +1,69 @@
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+from services import codecs, container
+from services.codec_policy import CodecPolicy
+from services.codecs import available_codecs, get_codec
+
+DATA = b"".join(b"%d,cold,archived,row\n" % i for i in range(5000)) + os.urandom(2000)
+
+RULES = [
+    {'min_size': 1000, 'max_size': 5000, 'codecs': [('zstd', 3), ('zlib', 1)]},
+    {'extensions': {'.log', '.txt'}, 'codecs': [('lzma', 6)]},
+    {'extensions': {'.bin'}, 'codecs': [('missing', 1)]},
+]
+
+
+@pytest.mark.parametrize("name", available_codecs())
+def test_every_codec_round_trips_a_block(name):
+    codec = get_codec(name)
+    compressed = codec.compress(DATA, codec.default_level)
+    assert len(compressed) < len(DATA)
+    assert codec.decompress(compressed, len(DATA)) == DATA
+
+
+@pytest.mark.parametrize("name", [name for name in available_codecs() if get_codec(name).supports_dictionary])
+def test_dictionary_codecs_round_trip_with_a_dictionary(name):
+    codec = get_codec(name)
+    dictionary = DATA[:4096]
+    compressed = codec.compress(DATA[4096:8192], codec.default_level, dictionary)
+    assert codec.decompress(compressed, 4096, dictionary) == DATA[4096:8192]
+
+
+@pytest.mark.parametrize("name", ["lzma", "bz2"])
+def test_container_round_trips_with_stdlib_codecs(name):
+    target = io.BytesIO()
+    container.write_container(io.BytesIO(DATA), target, get_codec(name), get_codec(name).default_level,
+                              4096, max_workers=2)
+    out = io.BytesIO()
+    header = container.read_container(io.BytesIO(target.getvalue()), out)
+    assert header['codec'] == name
+    assert out.getvalue() == DATA
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError, match="not available"):
+        get_codec("missing")
+
+
+def test_rules_select_by_size_then_extension():
+    policy = CodecPolicy(rules=RULES, default_codec="bz2", default_level=7)
+    first_choice = "zstd" if "zstd" in available_codecs() else "zlib"
+    assert policy.select(Path("a.txt"), 2000)[0].name == first_choice
+    assert policy.select(Path("a.txt"), 10000) == (get_codec("lzma"), 6)
+    assert policy.select(Path("A.LOG"), 10) == (get_codec("lzma"), 6)
+    assert policy.select(Path("a.csv"), 10000) == (get_codec("bz2"), 7)
+
+
+def test_missing_zstd_falls_back_to_the_next_choice(monkeypatch):
+    monkeypatch.delitem(codecs._CODECS, "zstd", raising=False)
+    policy = CodecPolicy(rules=RULES)
+    assert policy.select(Path("a.csv"), 2000) == (get_codec("zlib"), 1)
+
+
+def test_rule_without_an_available_codec_falls_through_to_the_default():
+    policy = CodecPolicy(rules=RULES, default_codec="zlib", default_level=6)
+    assert policy.select(Path("image.bin"), 10) == (get_codec("zlib"), 6)
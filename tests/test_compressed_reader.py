@@ -0,0 +1,83 @@
+import io
+import os
+import zlib
+
+import pytest
+
+from services import container
+from services.codecs import get_codec
+from services.compressed_reader import CompressedFileReader
+
+BLOCK_SIZE = 4096
+DATA = b"".join(b"record %d of a cold file\n" % i for i in range(3000)) + os.urandom(5000)
+
+
+@pytest.fixture
+def block_file(tmp_path):
+    target = io.BytesIO()
+    container.write_container(io.BytesIO(DATA), target, get_codec("zlib"), 6, BLOCK_SIZE)
+    path = tmp_path / "data.bin.zz"
+    path.write_bytes(target.getvalue())
+    return path
+
+
+@pytest.fixture
+def legacy_file(tmp_path):
+    # Headerless zlib stream written before the block container existed
+    path = tmp_path / "old.bin.zz"
+    path.write_bytes(zlib.compress(DATA))
+    return path
+
+
+def test_reads_span_block_boundaries(block_file):
+    with CompressedFileReader(block_file) as reader:
+        assert reader.size() == len(DATA)
+        reader.seek(BLOCK_SIZE - 10)
+        assert reader.read(BLOCK_SIZE + 20) == DATA[BLOCK_SIZE - 10:2 * BLOCK_SIZE + 10]
+        assert reader.tell() == 2 * BLOCK_SIZE + 10
+
+        reader.seek(3)  # Backwards into an earlier block
+        assert reader.read(5) == DATA[3:8]
+        reader.seek(-100, os.SEEK_END)
+        assert reader.read(1000) == DATA[-100:]
+        assert reader.read(10) == b""
+
+
+def test_readinto_stops_at_the_end_of_a_block(block_file):
+    with CompressedFileReader(block_file) as reader:
+        reader.seek(BLOCK_SIZE - 4)
+        buffer = bytearray(16)
+        assert reader.readinto(buffer) == 4
+        assert bytes(buffer[:4]) == DATA[BLOCK_SIZE - 4:BLOCK_SIZE]
+        assert reader.read() == DATA[BLOCK_SIZE:]
+
+
+def test_legacy_stream_reads_sequentially_and_seeks_backwards(legacy_file):
+    with CompressedFileReader(legacy_file, chunk_size=1024) as reader:
+        assert reader.header == {}
+        assert reader.read(3000) == DATA[:3000]
+        reader.seek(5000, os.SEEK_CUR)
+        assert reader.read(100) == DATA[8000:8100]
+
+        reader.seek(10)  # Behind the current piece: the stream restarts
+        assert reader.read(2000) == DATA[10:2010]
+        assert reader.seek(0, os.SEEK_END) == len(DATA)
+        assert reader.read(1) == b""
+        reader.seek(0)
+        assert reader.read() == DATA
+
+
+def test_truncated_legacy_stream_is_an_error(tmp_path):
+    path = tmp_path / "cut.bin.zz"
+    path.write_bytes(zlib.compress(DATA)[:-50])
+    with CompressedFileReader(path, chunk_size=1024) as reader:
+        with pytest.raises(zlib.error):
+            reader.read()
+
+
+def test_invalid_seeks_are_rejected(block_file):
+    with CompressedFileReader(block_file) as reader:
+        with pytest.raises(ValueError):
+            reader.seek(-1)
+        with pytest.raises(ValueError):
+            reader.seek(0, 7)
@@ -0,0 +1,78 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from services import container
+from services.codec_policy import CodecPolicy
+from services.compression_service import CompressionService
+
+
+def test_compression_level_is_the_default_codec_level():
+    service = CompressionService(use_scan_index=False, use_journal=False)
+    service.codec_policy = CodecPolicy(rules=[], default_level=6)
+    assert service.compression_level == 6
+    service.compression_level = 1
+    assert service.codec_policy.default_level == 1
+    assert service.codec_policy.select(Path("data.bin"), 1024)[1] == 1
+
+
+def _compressed(tmp_path, name="data.txt"):
+    path = tmp_path / name
+    path.write_bytes(b"cold data\n" * 2000)
+    service = CompressionService(use_scan_index=False, use_journal=False)
+    assert service.compress_file(path)['success']
+    return path.with_name(name + ".zz")
+
+
+@pytest.fixture
+def checksum_unavailable(monkeypatch):
+    # As on a machine without xxhash reading an xxh64 footer
+    monkeypatch.setattr(container, "is_available", lambda name: False)
+
+
+def test_decompress_keeps_the_zz_when_its_checksum_cant_be_verified(tmp_path, checksum_unavailable):
+    compressed = _compressed(tmp_path)
+    service = CompressionService(use_scan_index=False, use_journal=False)
+
+    result = service.decompress_file(compressed)
+    assert not result['success']
+    assert "xxhash" in result['message']
+    assert compressed.exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["data.txt.zz"]
+
+
+def test_decompress_on_size_alone_when_allowed(tmp_path, checksum_unavailable):
+    compressed = _compressed(tmp_path)
+    service = CompressionService(use_scan_index=False, use_journal=False, allow_unverified=True)
+
+    result = service.decompress_file(compressed)
+    assert result['success'], result['message']
+    assert result['checksum_skipped'] == "crc32"
+    assert "⚠️" in result['message']
+    assert (tmp_path / "data.txt").read_bytes() == b"cold data\n" * 2000
+
+
+def test_verify_and_read_only_warn_when_a_checksum_cant_be_verified(tmp_path, checksum_unavailable):
+    compressed = _compressed(tmp_path)
+    service = CompressionService(use_scan_index=False, use_journal=False)
+
+    result = service.verify_file(compressed)
+    assert result['success'] and "size only" in result['checksum']
+    target = io.BytesIO()
+    service.read_original(compressed, target)
+    assert target.getvalue() == b"cold data\n" * 2000
+
+
+def test_extract_pack_keeps_members_whose_checksum_cant_be_verified(tmp_path, checksum_unavailable):
+    files = []
+    for i in range(3):
+        files.append(tmp_path / f"small{i}.txt")
+        files[-1].write_bytes(b"small cold file %d\n" % i * 100)
+    service = CompressionService(use_scan_index=False, use_journal=False)
+    pack_path = service.pack_files(files)['compressed_path']
+
+    result = service.extract_pack(pack_path)
+    assert not result['success']
+    assert len(service.list_pack(pack_path)) == 3
+    assert not any(path.exists() for path in files)
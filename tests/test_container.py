@@ -0,0 +1,140 @@
+import io
+import json
+import os
+import struct
+
+import pytest
+
+from services import container
+from services.checksums import available_checksums
+from services.codecs import get_codec
+
+BLOCK_SIZE = 4096
+DATA = b"".join(f"line {i} of some fairly repetitive text\n".encode() for i in range(2000)) + os.urandom(3000)
+
+
+def _pack(data=DATA, max_workers=1, checksum=None, metadata=None):
+    target = io.BytesIO()
+    container.write_container(io.BytesIO(data), target, get_codec("zlib"), 6, BLOCK_SIZE,
+                              max_workers=max_workers, metadata=metadata, checksum=checksum)
+    return target.getvalue()
+
+
+def _unpack(blob):
+    out = io.BytesIO()
+    header = container.read_container(io.BytesIO(blob), out)
+    return header, out.getvalue()
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_round_trip(max_workers):
+    blob = _pack(max_workers=max_workers, metadata={'mtime': 1.5, 'mode': 0o640})
+    assert container.is_container(blob)
+    header, data = _unpack(blob)
+    assert data == DATA
+    assert header['version'] == container.FORMAT_VERSION
+    assert header['mtime'] == 1.5 and header['mode'] == 0o640
+    assert header['footer']['original_size'] == len(DATA)
+
+
+def test_parallel_output_is_identical_to_sequential():
+    assert _pack(max_workers=1) == _pack(max_workers=4)
+
+
+def test_empty_input():
+    header, data = _unpack(_pack(b""))
+    assert data == b""
+    assert header['footer']['original_size'] == 0
+
+
+@pytest.mark.parametrize("checksum", available_checksums())
+def test_every_available_checksum_round_trips(checksum):
+    header, data = _unpack(_pack(checksum=checksum))
+    assert data == DATA
+    assert header['footer']['checksum']['algorithm'] == checksum
+
+
+def test_index_allows_random_block_access():
+    blob = _pack()
+    source = io.BytesIO(blob)
+    header, entries = container.read_index(source)
+    assert len(entries) == -(-len(DATA) // BLOCK_SIZE)
+    assert sum(entry.raw_length for entry in entries) == len(DATA)
+    codec = get_codec(header['codec'])
+    entry = entries[len(entries) // 2]
+    assert (container.read_block(source, codec, entry)
+            == DATA[entry.raw_offset:entry.raw_offset + entry.raw_length])
+
+
+def test_metadata_is_read_without_inflating():
+    metadata = container.read_metadata(io.BytesIO(_pack(metadata={'mtime': 7.0})))
+    assert metadata['mtime'] == 7.0
+    assert metadata['footer']['original_size'] == len(DATA)
+
+
+def _footer_span(blob):
+    index_offset, block_count, footer_length, _ = struct.unpack("<QII4s", blob[-20:])
+    start = index_offset + block_count * 16
+    return start, start + footer_length
+
+
+def _replace_footer(blob, **changes):
+    start, end = _footer_span(blob)
+    footer = json.loads(blob[start:end])
+    footer.update(changes)
+    encoded = json.dumps(footer).encode()
+    index_offset, block_count, _, magic = struct.unpack("<QII4s", blob[-20:])
+    return blob[:start] + encoded + struct.pack("<QII4s", index_offset, block_count, len(encoded), magic)
+
+
+def test_checksum_mismatch_is_detected():
+    blob = _pack()
+    start, end = _footer_span(blob)
+    footer = json.loads(blob[start:end])
+    value = footer['checksum']['value']
+    footer['checksum']['value'] = ("0" if value[0] != "0" else "1") + value[1:]
+    corrupt = _replace_footer(blob, checksum=footer['checksum'])
+    with pytest.raises(ValueError, match="checksum mismatch"):
+        _unpack(corrupt)
+
+
+def test_new_containers_default_to_crc32():
+    header, _ = _unpack(_pack())
+    assert header['footer']['checksum']['algorithm'] == "crc32"
+
+
+def test_unavailable_checksum_is_skipped_but_size_is_checked():
+    blob = _replace_footer(_pack(), checksum={'algorithm': "missing", 'value': "00"})
+    header, data = _unpack(blob)
+    assert data == DATA
+    assert header['checksum_skipped'] == "missing"
+    with pytest.raises(ValueError, match="size mismatch"):
+        _unpack(_replace_footer(blob, original_size=len(DATA) + 1))
+
+
+def test_size_mismatch_is_detected():
+    corrupt = _replace_footer(_pack(), original_size=len(DATA) + 1)
+    with pytest.raises(ValueError, match="size mismatch"):
+        _unpack(corrupt)
+
+
+def test_damaged_block_is_detected():
+    blob = bytearray(_pack())
+    _, entries = container.read_index(io.BytesIO(bytes(blob)))
+    blob[entries[1].data_offset + 10] ^= 0xFF
+    with pytest.raises(Exception):
+        _unpack(bytes(blob))
+
+
+def test_truncated_container_is_rejected():
+    blob = _pack()
+    with pytest.raises(ValueError, match="block index"):
+        container.read_index(io.BytesIO(blob[:-5]))
+    with pytest.raises(ValueError):
+        _unpack(blob[:len(blob) // 2])
+
+
+def test_foreign_data_is_rejected():
+    assert not container.is_container(b"PK\x03\x04")
+    with pytest.raises(ValueError, match="Not a ColdCompress container"):
+        _unpack(b"not a container at all")
@@ -0,0 +1,58 @@
+import os
+import time
+from pathlib import Path
+
+from config import DEDUP_STORE_NAME
+from services.compression_service import CompressionService
+from services.dedup import DedupStore, find_duplicates
+from services.scanner import DirectoryScanner
+
+CONTENT = os.urandom(1024) * 64
+
+
+def _entries(root):
+    scanner = DirectoryScanner(threshold_days=0, now=time.time() + 60)
+    return [entry for entry in scanner.scan(root) if not entry.compressed]
+
+
+def _write(path: Path, mode: int, mtime: float):
+    path.write_bytes(CONTENT)
+    os.chmod(path, mode)
+    os.utime(path, (mtime, mtime))
+
+
+def test_copies_with_different_metadata_are_not_grouped(tmp_path):
+    _write(tmp_path / "a.bin", 0o644, 1_000_000_000)
+    _write(tmp_path / "b.bin", 0o644, 1_000_000_000)
+    _write(tmp_path / "c.bin", 0o600, 1_000_000_000)
+    _write(tmp_path / "d.bin", 0o644, 1_500_000_000)
+
+    groups, unique = find_duplicates(_entries(tmp_path), tmp_path / DEDUP_STORE_NAME, min_size=1)
+
+    assert [sorted(path.name for path in group.paths) for group in groups] == [["a.bin", "b.bin"]]
+    assert sorted(entry.path.name for entry in unique) == ["c.bin", "d.bin"]
+
+
+def test_dedup_round_trip_restores_each_copy(tmp_path):
+    for name, mode in (("a.bin", 0o640), ("b.bin", 0o640), ("c.bin", 0o600), ("d.bin", 0o600)):
+        _write(tmp_path / name, mode, 1_000_000_000)
+    service = CompressionService(use_scan_index=False, use_journal=False)
+    groups, _ = find_duplicates(_entries(tmp_path), tmp_path / DEDUP_STORE_NAME, min_size=1)
+    assert len(groups) == 2
+    assert len({DedupStore.blob_path(g.store, g.digest, g.metadata_key) for g in groups}) == 2
+
+    for group in groups:
+        result = service.dedup_files(group)
+        assert result['success'], result['message']
+        assert not result['errors']
+
+    for name, mode in (("a.bin", 0o640), ("b.bin", 0o640), ("c.bin", 0o600), ("d.bin", 0o600)):
+        result = service.decompress_file(tmp_path / f"{name}.zz")
+        assert result['success'], result['message']
+        restored = tmp_path / name
+        assert restored.read_bytes() == CONTENT
+        assert os.stat(restored).st_mode & 0o777 == mode
+        assert os.stat(restored).st_mtime == 1_000_000_000
+
+    assert DedupStore(tmp_path).collect_garbage() == 2
+    assert not (tmp_path / DEDUP_STORE_NAME).exists()
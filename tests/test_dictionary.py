@@ -0,0 +1,70 @@
+from config import DICTIONARY_EXTENSION, DICTIONARY_PREFIX
+from services.compression_service import CompressionService
+from services.dictionary import DictionaryStore
+
+
+def _service():
+    service = CompressionService(use_scan_index=False, use_journal=False, use_dictionaries=True)
+    service.dictionaries = DictionaryStore(gc_min_age=0)
+    return service
+
+
+def _small_files(directory, count=10):
+    paths = []
+    for i in range(count):
+        path = directory / f"record{i}.json"
+        path.write_text('{"id": %d, "status": "archived", "owner": "ops", "tags": ["cold", "old"]}\n' % i * 20)
+        paths.append(path)
+    return paths
+
+
+def _dictionaries(directory):
+    return sorted(directory.glob(f"{DICTIONARY_PREFIX}*{DICTIONARY_EXTENSION}"))
+
+
+def _compress_all(service, paths):
+    results = [service.compress_file(path) for path in paths]
+    assert all(result['success'] for result in results), results
+    assert all(result['dictionary'] for result in results)
+    return [result['compressed_path'] for result in results]
+
+
+def test_unreferenced_dictionary_is_collected(tmp_path):
+    service = _service()
+    compressed = _compress_all(service, _small_files(tmp_path))
+    assert len(_dictionaries(tmp_path)) == 1
+
+    for path in compressed[:-1]:
+        assert service.decompress_file(path)['success']
+    assert service.collect_dictionaries(tmp_path) == 0
+    assert len(_dictionaries(tmp_path)) == 1
+
+    assert service.decompress_file(compressed[-1])['success']
+    assert service.collect_dictionaries(tmp_path) == 1
+    assert _dictionaries(tmp_path) == []
+
+
+def test_recently_used_dictionary_is_kept(tmp_path):
+    service = _service()
+    compressed = _compress_all(service, _small_files(tmp_path))
+    for path in compressed:
+        assert service.decompress_file(path)['success']
+    service.dictionaries.gc_min_age = 3600
+    assert service.collect_dictionaries(tmp_path) == 0
+    assert len(_dictionaries(tmp_path)) == 1
+
+
+def test_collected_dictionary_is_restored_for_a_running_compression(tmp_path):
+    service = _service()
+    paths = _small_files(tmp_path)
+    compressed = _compress_all(service, paths[:5])
+    for path in compressed:
+        assert service.decompress_file(path)['success']
+    other = CompressionService(use_scan_index=False, use_journal=False)
+    other.dictionaries = DictionaryStore(gc_min_age=0)
+    assert other.collect_dictionaries(tmp_path) == 1
+
+    # The first service still has the dictionary cached and keeps using it
+    for path in _compress_all(service, paths[5:]):
+        assert service.decompress_file(path)['success']
+    assert all(path.exists() for path in paths)
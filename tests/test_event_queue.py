@@ -0,0 +1,100 @@
+import threading
+
+from gui.event_queue import UIEventQueue
+
+
+class _FakeRoot:
+    """Stands in for Tk: records root.after callbacks so tests run the main loop by hand."""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay_ms, callback):
+        self.scheduled.append((delay_ms, callback))
+
+    def tick(self):
+        _, callback = self.scheduled.pop(0)
+        callback()
+
+
+class _FakeLog:
+    def __init__(self):
+        self.batches = []
+
+    def append_lines(self, lines, dropped):
+        self.batches.append(([message for _, message, _ in lines], dropped))
+
+
+def _queue(**kwargs):
+    root, log = _FakeRoot(), _FakeLog()
+    return UIEventQueue(root, log, interval_ms=50, **kwargs), root, log
+
+
+def test_drain_is_scheduled_on_the_main_loop():
+    _, root, _ = _queue()
+    assert [delay for delay, _ in root.scheduled] == [50]
+    root.tick()
+    assert len(root.scheduled) == 1
+
+
+def test_full_ring_buffer_drops_the_oldest_lines_and_counts_them():
+    queue, root, log = _queue(log_buffer_size=3)
+    for i in range(5):
+        queue.log(f"line {i}")
+    root.tick()
+    assert log.batches == [(["line 2", "line 3", "line 4"], 2)]
+
+    queue.log("next")
+    root.tick()
+    assert log.batches[-1] == (["next"], 0)
+
+
+def test_one_batch_applies_logs_latest_values_and_calls_in_order():
+    queue, root, log = _queue()
+    applied = []
+    queue.log("hello", "SUCCESS")
+    for value in range(100):
+        queue.post_latest("progress", applied.append, ("progress", value))
+    queue.post_latest("status", applied.append, ("status", "done"))
+    queue.call(applied.append, ("call", 1))
+    queue.call(applied.append, ("call", 2))
+
+    root.tick()
+    assert log.batches == [(["hello"], 0)]
+    assert applied == [("progress", 99), ("status", "done"), ("call", 1), ("call", 2)]
+
+    root.tick()  # Nothing queued: nothing applied
+    assert len(log.batches) == 1 and len(applied) == 4
+
+
+def test_drain_reports_its_duration_and_reschedules_after_errors():
+    durations = []
+    queue, root, _ = _queue(on_drain=durations.append)
+
+    def fail():
+        raise RuntimeError("widget gone")
+
+    queue.call(fail)
+    try:
+        root.tick()
+    except RuntimeError:
+        pass
+    assert len(durations) == 1 and durations[0] >= 0
+    assert len(root.scheduled) == 1
+
+
+def test_producers_on_many_threads_lose_no_counted_lines():
+    queue, root, log = _queue(log_buffer_size=100)
+
+    def produce():
+        for i in range(500):
+            queue.log(f"line {i}")
+
+    threads = [threading.Thread(target=produce) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    root.tick()
+    lines, dropped = log.batches[0]
+    assert len(lines) == 100 and len(lines) + dropped == 2000
@@ -0,0 +1,129 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from config import TEMP_SUFFIX
+from services.compression_service import CompressionService
+from services.job_control import JobCancelled, JobController, lower_priority
+from services.parallel_executor import ParallelExecutor
+
+DATA = b"".join(b"line %d of a cold file\n" % i for i in range(20000))
+
+
+def _service():
+    service = CompressionService(use_scan_index=False, use_journal=False, probe_enabled=False)
+    service.block_size = 16 * 1024  # Many blocks, so many checkpoints
+    return service
+
+
+def test_cancel_between_chunks_leaves_the_file_untouched(tmp_path):
+    path = tmp_path / "cold.txt"
+    path.write_bytes(DATA)
+    os.utime(path, (1_000_000_000, 1_000_000_000))
+    controller = JobController()
+    checkpoints = []
+
+    def on_progress(count):
+        checkpoints.append(count)
+        if len(checkpoints) == 3:
+            controller.cancel()
+        controller.checkpoint(count)
+
+    with pytest.raises(JobCancelled):
+        _service().compress_file(path, on_progress)
+
+    assert len(checkpoints) == 3
+    assert path.read_bytes() == DATA
+    assert path.stat().st_mtime == 1_000_000_000
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cold.txt"]
+    assert not list(tmp_path.glob(f"*{TEMP_SUFFIX}"))
+
+
+def test_cancelled_run_reports_unstarted_files_as_cancelled(tmp_path):
+    paths = []
+    for i in range(6):
+        paths.append(tmp_path / f"f{i}.txt")
+        paths[-1].write_bytes(DATA)
+    controller = JobController()
+    controller.cancel()
+    executor = ParallelExecutor(_service(), max_workers=2, use_processes=False, controller=controller)
+
+    results = list(executor.compress_files(paths))
+    assert all(result.get('cancelled') for result in results)
+    assert all(path.read_bytes() == DATA for path in paths)
+    assert not list(tmp_path.glob("*.zz"))
+
+
+def test_checkpoint_waits_while_paused():
+    controller = JobController()
+    controller.pause()
+    passed = threading.Event()
+
+    def worker():
+        controller.checkpoint(1)
+        passed.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not passed.wait(0.3)
+    controller.resume()
+    assert passed.wait(5)
+    thread.join()
+
+
+def test_cancel_releases_a_paused_checkpoint():
+    controller = JobController()
+    controller.pause()
+    raised = []
+
+    def worker():
+        try:
+            controller.checkpoint(1)
+        except JobCancelled:
+            raised.append(True)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    time.sleep(0.1)
+    controller.cancel()
+    thread.join(5)
+    assert raised == [True]
+
+
+def test_bandwidth_limit_spreads_reads_over_time():
+    controller = JobController(bandwidth_limit=1.0)  # 1 MB/s
+    start = time.monotonic()
+    for _ in range(3):
+        controller.checkpoint(256 * 1024)
+    # The first quarter second is free; the next two wait for their slots
+    assert time.monotonic() - start >= 0.45
+
+
+def test_cpu_share_sleeps_in_proportion_to_work():
+    controller = JobController(cpu_share=0.5)
+    controller.start_operation()
+    start = time.monotonic()
+    while time.monotonic() - start < 0.1:
+        pass
+    controller.checkpoint(1)
+    assert time.monotonic() - start >= 0.19
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="per-thread niceness is Linux behaviour")
+def test_lower_priority_raises_niceness_of_the_calling_thread():
+    seen = []
+
+    def worker():
+        thread_id = threading.get_native_id()
+        before = os.getpriority(os.PRIO_PROCESS, thread_id)
+        lower_priority()
+        seen.append((before, os.getpriority(os.PRIO_PROCESS, thread_id)))
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    before, after = seen[0]
+    assert after == min(before + 10, 19)
@@ -0,0 +1,192 @@
+import json
+import multiprocessing
+import os
+from pathlib import Path
+from typing import Optional
+
+from services import container
+from services.codecs import get_codec
+from services.compression_service import CompressionService
+from services.journal import STAGE_COMMITTED, STAGE_STARTED, OperationJournal, atomic_write, temp_path_for
+
+DATA = b"journaled data\n" * 1000
+
+
+def _crash(journal_dir: Path, source: Path, target: Path, stage: str, replaced: bool):
+    """Leave behind what a process dying at the given stage would."""
+    journal = OperationJournal(journal_dir)
+    token = journal.begin("compression", source, target)
+    temp_path_for(target).write_bytes(b"partial output")
+    if replaced:
+        temp_path_for(target).unlink()
+        with open(source, "rb") as original, atomic_write(target, fsync=False) as f:
+            container.write_container(original, f, get_codec("zlib"), 6, 4096)
+    if stage == STAGE_COMMITTED:
+        journal.commit(token)
+    os._exit(1)
+
+
+def _crash_after(journal: OperationJournal, stage: str, source: Path, target: Path,
+                 replaced: Optional[bool] = None):
+    """Run _crash in a child process, so the journal entry's owner is really gone."""
+    if replaced is None:
+        replaced = stage == STAGE_COMMITTED
+    child = multiprocessing.get_context("fork").Process(
+        target=_crash, args=(journal.journal_dir, source, target, stage, replaced))
+    child.start()
+    child.join()
+
+
+def test_started_operation_is_rolled_back(tmp_path):
+    journal = OperationJournal(tmp_path / "journal")
+    source, target = tmp_path / "a.txt", tmp_path / "a.txt.zz"
+    source.write_bytes(DATA)
+    _crash_after(journal, STAGE_STARTED, source, target)
+
+    messages = journal.recover()
+
+    assert len(messages) == 1 and "Rolled back" in messages[0]
+    assert source.read_bytes() == DATA
+    assert not temp_path_for(target).exists()
+    assert not target.exists()
+    assert list((tmp_path / "journal").iterdir()) == []
+
+
+def test_committed_operation_is_rolled_forward(tmp_path):
+    journal = OperationJournal(tmp_path / "journal")
+    source, target = tmp_path / "b.txt", tmp_path / "b.txt.zz"
+    source.write_bytes(DATA)
+    _crash_after(journal, STAGE_COMMITTED, source, target)
+
+    messages = journal.recover()
+
+    assert len(messages) == 1 and "Finished" in messages[0]
+    assert not source.exists()
+    assert target.exists()
+    assert list((tmp_path / "journal").iterdir()) == []
+
+
+def test_started_operation_with_target_in_place_is_rolled_forward(tmp_path):
+    # The crash hit after the rename but before the journal entry was committed
+    journal = OperationJournal(tmp_path / "journal")
+    service = CompressionService(use_scan_index=False)
+    source, target = tmp_path / "g.txt", tmp_path / "g.txt.zz"
+    source.write_bytes(DATA)
+    _crash_after(journal, STAGE_STARTED, source, target, replaced=True)
+
+    messages = journal.recover(service._holds_original)
+
+    assert len(messages) == 1 and "Finished" in messages[0]
+    assert not source.exists()
+    restored = service.decompress_file(target)
+    assert restored['success'], restored['message']
+    assert source.read_bytes() == DATA
+
+
+def test_started_operation_with_mismatching_target_keeps_both(tmp_path):
+    journal = OperationJournal(tmp_path / "journal")
+    service = CompressionService(use_scan_index=False)
+    source, target = tmp_path / "h.txt", tmp_path / "h.txt.zz"
+    source.write_bytes(DATA)
+    _crash_after(journal, STAGE_STARTED, source, target, replaced=True)
+    source.write_bytes(DATA + b"changed")
+
+    messages = journal.recover(service._holds_original)
+
+    assert len(messages) == 1 and "kept both" in messages[0]
+    assert source.read_bytes() == DATA + b"changed"
+    assert target.exists()
+    assert list((tmp_path / "journal").glob("*.json")) == []
+
+
+def test_started_operation_without_source_is_reported_finished(tmp_path):
+    journal = OperationJournal(tmp_path / "journal")
+    source, target = tmp_path / "i.txt", tmp_path / "i.txt.zz"
+    source.write_bytes(DATA)
+    _crash_after(journal, STAGE_STARTED, source, target, replaced=True)
+    source.unlink()
+
+    messages = journal.recover()
+
+    assert len(messages) == 1 and "Finished" in messages[0]
+    assert target.exists()
+
+
+def test_operations_of_a_running_process_are_left_alone(tmp_path):
+    running = OperationJournal(tmp_path / "journal")
+    source, target = tmp_path / "j.txt", tmp_path / "j.txt.zz"
+    source.write_bytes(DATA)
+    token = running.begin("compression", source, target)
+    temp_path_for(target).write_bytes(b"in flight")
+
+    assert OperationJournal(tmp_path / "journal").recover() == []
+    assert token.exists()
+    assert temp_path_for(target).exists()
+
+    running.complete(token)
+
+
+def test_unreadable_entry_is_dropped(tmp_path):
+    journal_dir = tmp_path / "journal"
+    journal_dir.mkdir()
+    (journal_dir / "broken.json").write_text("{not json")
+    assert OperationJournal(journal_dir).recover() == []
+    assert not (journal_dir / "broken.json").exists()
+
+
+def test_entry_records_both_paths(tmp_path):
+    journal = OperationJournal(tmp_path / "journal")
+    token = journal.begin("compression", tmp_path / "c.txt", tmp_path / "c.txt.zz")
+    entry = json.loads(token.read_text())
+    assert entry['source'] == str(tmp_path / "c.txt")
+    assert entry['target'] == str(tmp_path / "c.txt.zz")
+    journal.complete(token)
+    assert not token.exists()
+
+
+def test_atomic_write_leaves_old_content_on_failure(tmp_path):
+    target = tmp_path / "d.txt"
+    target.write_bytes(b"old")
+    try:
+        with atomic_write(target, fsync=False) as f:
+            f.write(b"new and incomplete")
+            raise RuntimeError("crash")
+    except RuntimeError:
+        pass
+    assert target.read_bytes() == b"old"
+    assert not temp_path_for(target).exists()
+
+
+def test_service_round_trip_leaves_no_journal_entries(tmp_path):
+    service = CompressionService(use_scan_index=False)
+    service.journal = OperationJournal(tmp_path / "journal")
+    source = tmp_path / "e.txt"
+    source.write_bytes(DATA)
+
+    compressed = service.compress_file(source)
+    assert compressed['success'], compressed['message']
+    assert service.verify_file(compressed['compressed_path'])['success']
+    restored = service.decompress_file(compressed['compressed_path'])
+    assert restored['success'], restored['message']
+
+    assert source.read_bytes() == DATA
+    assert list((tmp_path / "journal").glob("*.json")) == []
+
+
+def test_corrupt_file_is_never_unpacked(tmp_path):
+    service = CompressionService(use_scan_index=False)
+    service.journal = OperationJournal(tmp_path / "journal")
+    source = tmp_path / "f.txt"
+    source.write_bytes(DATA)
+    compressed = service.compress_file(source)['compressed_path']
+    blob = bytearray(compressed.read_bytes())
+    with open(compressed, "rb") as f:
+        _, entries = container.read_index(f)
+    blob[entries[0].data_offset + 5] ^= 0xFF
+    compressed.write_bytes(bytes(blob))
+
+    assert not service.verify_file(compressed)['success']
+    assert not service.decompress_file(compressed)['success']
+    assert compressed.exists()
+    assert not source.exists()
+    assert not temp_path_for(source).exists()
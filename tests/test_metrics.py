@@ -0,0 +1,109 @@
+import io
+import json
+import time
+
+from services.metrics import Histogram, RunMetrics, StageTimings
+
+
+class _SlowStream(io.BytesIO):
+    def read(self, *args):
+        time.sleep(0.05)
+        return super().read(*args)
+
+
+def _metrics():
+    metrics = RunMetrics("compress", latency_buckets=(0.1, 1.0))
+    metrics.started = 1700000000.0
+    metrics.record_result({'success': True, 'bytes_in': 1000, 'bytes_out': 400,
+                           'timings': {'compress': 0.25, 'write': 0.05}, 'duration': 0.1})
+    metrics.record_result({'success': True, 'file_count': 5, 'errors': ["a: boom"],
+                           'skipped_files': ["b (sample grew by 1.0%)"], 'bytes_in': 4000, 'bytes_out': 1000,
+                           'timings': {'compress': 0.5}, 'duration': 0.5})
+    metrics.record_result({'success': True, 'skipped': True, 'skipped_bytes': 10, 'cpu_saved': 0.0,
+                           'duration': 2.0})
+    metrics.record_result({'success': False, 'error': "gone", 'duration': 0.01})
+    metrics.record_result({'success': False, 'cancelled': True, 'file_count': 2})
+    metrics.elapsed = 3.5
+    return metrics
+
+
+def test_results_are_counted_by_outcome():
+    counters = _metrics().counters
+    assert counters == {
+        'files': 10, 'files_succeeded': 4, 'files_failed': 2, 'files_skipped': 2,
+        'files_cancelled': 2, 'errors': 2, 'bytes_in': 5000, 'bytes_out': 1400
+    }
+
+
+def test_histogram_buckets_are_upper_bounds_inclusive():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 1.0, 3.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 2, 1]
+    assert histogram.cumulative() == [("0.1", 2), ("1.0", 4), ("+Inf", 5)]
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(0.99) == 3.0
+    assert Histogram().quantile(0.5) is None
+
+
+def test_prometheus_output_matches_golden_text():
+    expected = """\
+# HELP coldcompress_files_total Files processed in the last run, by outcome
+# TYPE coldcompress_files_total counter
+coldcompress_files_total{operation="compress",outcome="succeeded"} 4
+coldcompress_files_total{operation="compress",outcome="failed"} 2
+coldcompress_files_total{operation="compress",outcome="skipped"} 2
+coldcompress_files_total{operation="compress",outcome="cancelled"} 2
+# HELP coldcompress_errors_total Failed operations in the last run
+# TYPE coldcompress_errors_total counter
+coldcompress_errors_total{operation="compress"} 2
+# HELP coldcompress_bytes_total Bytes read and written by file operations in the last run
+# TYPE coldcompress_bytes_total counter
+coldcompress_bytes_total{operation="compress",direction="in"} 5000
+coldcompress_bytes_total{operation="compress",direction="out"} 1400
+# HELP coldcompress_stage_seconds_total Time spent per stage in the last run (summed over workers)
+# TYPE coldcompress_stage_seconds_total counter
+coldcompress_stage_seconds_total{operation="compress",stage="compress"} 0.75
+coldcompress_stage_seconds_total{operation="compress",stage="write"} 0.05
+# HELP coldcompress_file_duration_seconds Per-file operation latency in the last run
+# TYPE coldcompress_file_duration_seconds histogram
+coldcompress_file_duration_seconds_bucket{operation="compress",le="0.1"} 2
+coldcompress_file_duration_seconds_bucket{operation="compress",le="1.0"} 3
+coldcompress_file_duration_seconds_bucket{operation="compress",le="+Inf"} 4
+coldcompress_file_duration_seconds_sum{operation="compress"} 2.61
+coldcompress_file_duration_seconds_count{operation="compress"} 4
+# HELP coldcompress_run_duration_seconds Wall time of the last run
+# TYPE coldcompress_run_duration_seconds gauge
+coldcompress_run_duration_seconds{operation="compress"} 3.5
+# HELP coldcompress_run_timestamp_seconds Start time of the last run
+# TYPE coldcompress_run_timestamp_seconds gauge
+coldcompress_run_timestamp_seconds{operation="compress"} 1700000000.0
+"""
+    assert _metrics().to_prometheus() == expected
+
+
+def test_write_produces_json_and_prometheus_files(tmp_path):
+    metrics = _metrics()
+    json_path, prom_path = metrics.write(tmp_path / "metrics")
+    assert json.loads(json_path.read_text())['counters']['files'] == 10
+    assert prom_path.read_text() == metrics.to_prometheus()
+    assert json_path.name == "coldcompress-compress.json"
+
+
+def test_stage_timings_exclude_nested_stages():
+    timings = StageTimings()
+    with timings.stage('decompress', exclude=('read',)):
+        timings.wrap(_SlowStream(b"data"), 'read').read()
+    assert timings.seconds['read'] >= 0.05
+    assert timings.seconds['decompress'] < 0.05
+
+
+def test_timed_iteration_charges_the_producer():
+    metrics = RunMetrics("verify")
+
+    def slow():
+        time.sleep(0.05)
+        yield 1
+
+    assert list(metrics.timed(slow(), "scan")) == [1]
+    assert metrics.stages['scan'] >= 0.05
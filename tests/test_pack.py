@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+from config import PACK_NAME
+from services.compression_service import CompressionService
+from services.job_control import JobCancelled
+from services.pack import PackArchive
+
+TEXT = b"the quick brown fox jumps over the lazy dog\n" * 200
+
+
+def _service():
+    return CompressionService(use_scan_index=False, use_journal=False)
+
+
+def _files(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"file{i}.txt"
+        path.write_bytes(TEXT + bytes([i]))
+        paths.append(path)
+    return paths
+
+
+def test_pack_round_trip(tmp_path):
+    files = _files(tmp_path, 3)
+    service = _service()
+    result = service.pack_files(files)
+    assert result['success'], result['message']
+    assert not any(path.exists() for path in files)
+
+    pack_path = tmp_path / PACK_NAME
+    assert sorted(member.name for member in service.list_pack(pack_path)) == [p.name for p in files]
+    result = service.extract_pack(pack_path)
+    assert result['success'], result['message']
+    for i, path in enumerate(files):
+        assert path.read_bytes() == TEXT + bytes([i])
+    assert not pack_path.exists()
+
+
+def test_incompressible_members_are_skipped(tmp_path):
+    files = _files(tmp_path, 2)
+    noise = tmp_path / "noise.bin"
+    noise.write_bytes(os.urandom(64 * 1024))
+    result = _service().pack_files(files + [noise])
+
+    assert result['success'], result['message']
+    assert result['original_paths'] == files
+    assert len(result['skipped_files']) == 1
+    assert result['skipped_bytes'] == 64 * 1024
+    assert noise.exists()
+    with PackArchive(tmp_path / PACK_NAME) as pack:
+        assert sorted(pack.members) == ["file0.txt", "file1.txt"]
+
+
+def test_all_incompressible_is_reported_as_skipped(tmp_path):
+    noise = tmp_path / "noise.bin"
+    noise.write_bytes(os.urandom(4096))
+    result = _service().pack_files([noise])
+    assert result['success'] and result['skipped']
+    assert not (tmp_path / PACK_NAME).exists()
+
+
+def _cancel_after_first_block(size):
+    raise JobCancelled()
+
+
+def test_cancelled_new_pack_is_removed(tmp_path):
+    files = _files(tmp_path, 2)
+    with pytest.raises(JobCancelled):
+        _service().pack_files(files, on_progress=_cancel_after_first_block)
+    assert not (tmp_path / PACK_NAME).exists()
+    assert all(path.exists() for path in files)
+
+
+def test_cancelled_append_keeps_existing_pack_intact(tmp_path):
+    service = _service()
+    first = _files(tmp_path, 1)
+    assert service.pack_files(first)['success']
+    pack_path = tmp_path / PACK_NAME
+    size = pack_path.stat().st_size
+
+    second = tmp_path / "later.txt"
+    second.write_bytes(TEXT)
+    with pytest.raises(JobCancelled):
+        service.pack_files([second], on_progress=_cancel_after_first_block)
+    assert pack_path.stat().st_size == size
+    assert second.exists()
+    with PackArchive(pack_path) as pack:
+        assert sorted(pack.members) == ["file0.txt"]
+
+
+def test_damaged_tail_falls_back_to_last_index(tmp_path):
+    service = _service()
+    assert service.pack_files(_files(tmp_path, 2))['success']
+    pack_path = tmp_path / PACK_NAME
+    with open(pack_path, "ab") as f:
+        f.write(b"\0" * 100)  # An append that never reached its index
+    with PackArchive(pack_path) as pack:
+        assert sorted(pack.members) == ["file0.txt", "file1.txt"]
+    assert service.extract_pack(pack_path, ["file1.txt"])['success']
+    assert (tmp_path / "file1.txt").read_bytes() == TEXT + bytes([1])
@@ -0,0 +1,51 @@
+import os
+from pathlib import Path
+
+from services.compression_service import CompressionService
+from services.parallel_executor import ParallelExecutor
+
+TEXT = b"cold data " * 5000
+
+
+class _CrashingService(CompressionService):
+    """Kills its worker process when asked to compress a file named 'crash'."""
+
+    def compress_file(self, filepath, on_progress=None):
+        if filepath.name == "crash":
+            os._exit(1)
+        return super().compress_file(filepath, on_progress)
+
+
+def test_dead_worker_fails_its_tasks_and_the_run_continues(tmp_path):
+    files = [tmp_path / "crash"] + [tmp_path / f"file{i}.txt" for i in range(6)]
+    for path in files:
+        path.write_bytes(TEXT)
+    service = _CrashingService(use_scan_index=False, use_journal=False)
+    executor = ParallelExecutor(service, max_workers=1, use_processes=True, profile=False)
+
+    results = list(executor.compress_files(files))
+
+    assert len(results) == len(files)
+    crashed = [r for r in results if not r['success']]
+    assert any("crash" in r['message'] for r in crashed)
+    assert (tmp_path / "file5.txt.zz").exists()
+    assert not (tmp_path / "file5.txt").exists()
+
+
+class _RecordingService(CompressionService):
+    """Records how many block threads a large file would get."""
+
+    def compress_file(self, filepath, on_progress=None):
+        return {'success': True, 'message': "", 'space_saved': 0,
+                'block_workers': self._block_workers_for(self.block_size * 100)}
+
+
+def test_block_threads_are_shared_between_concurrent_files():
+    service = _RecordingService(block_workers=8, use_scan_index=False, use_journal=False)
+    executor = ParallelExecutor(service, max_workers=4, use_processes=False, profile=False)
+
+    results = list(executor.compress_files([Path("a"), Path("b")]))
+
+    assert [r['block_workers'] for r in results] == [2, 2]
+    # Outside a run, a single file may use them all
+    assert service._block_workers_for(service.block_size * 100) == 8
@@ -0,0 +1,144 @@
+import os
+import stat
+
+import pytest
+
+from services.compression_service import CompressionService
+from services.pipeline import CompressionPipeline
+
+OLD = 1_000_000_000  # Well past any age threshold
+
+
+def _pipeline(use_scheduler=False, **options):
+    service = CompressionService(use_scan_index=False, use_journal=False, **options)
+    return CompressionPipeline(service, max_workers=2, use_scheduler=use_scheduler, metrics_dir=None)
+
+
+def _cold_file(path, data, mode=0o640):
+    path.write_bytes(data)
+    os.chmod(path, mode)
+    os.utime(path, (OLD, OLD + 5))
+    return path
+
+
+def _assert_metadata_restored(path, mode=0o640):
+    file_stat = path.stat()
+    assert file_stat.st_atime == OLD
+    assert file_stat.st_mtime == OLD + 5
+    assert stat.S_IMODE(file_stat.st_mode) == mode
+
+
+@pytest.mark.parametrize("mode", [0o640, 0o604])
+def test_plain_round_trip_restores_metadata(tmp_path, mode):
+    data = b"plain cold text\n" * 5000
+    path = _cold_file(tmp_path / "plain.txt", data, mode)
+    pipeline = _pipeline()
+
+    assert pipeline.compress(tmp_path, threshold_days=30).files_succeeded == 1
+    assert not path.exists()
+    assert pipeline.decompress(tmp_path).files_succeeded == 1
+
+    _assert_metadata_restored(path, mode)
+    assert path.read_bytes() == data
+
+
+def test_compress_file_records_the_scanned_atime(tmp_path):
+    path = _cold_file(tmp_path / "read.txt", b"read before compression\n" * 500)
+    scanned = path.stat()
+    path.read_bytes()  # Bumps the atime, as a probe would
+    service = CompressionService(use_scan_index=False, use_journal=False)
+
+    assert service.compress_file(path, scanned=scanned)['success']
+    assert service.stat_compressed(tmp_path / "read.txt.zz").atime == OLD
+
+
+def test_compress_file_ignores_a_stale_scan_stat(tmp_path):
+    path = _cold_file(tmp_path / "rewritten.txt", b"old content\n" * 500)
+    scanned = path.stat()
+    path.write_bytes(b"new content\n" * 600)
+    os.utime(path, (OLD + 100, OLD + 200))
+    service = CompressionService(use_scan_index=False, use_journal=False)
+
+    assert service.compress_file(path, scanned=scanned)['success']
+    recorded = service.stat_compressed(tmp_path / "rewritten.txt.zz")
+    assert (recorded.atime, recorded.mtime) == (OLD + 100, OLD + 200)
+
+
+def test_scheduler_probe_keeps_the_scanned_atime(tmp_path):
+    data = b"".join(b"record %d of a large cold log file\n" % i for i in range(300_000))
+    assert len(data) >= 8 * 1024 * 1024
+    big = _cold_file(tmp_path / "big.log", data)
+    pipeline = _pipeline(use_scheduler=True)
+
+    summary = pipeline.compress(tmp_path, threshold_days=30)
+    assert summary.files_succeeded == 1
+    assert pipeline.decompress(tmp_path).files_succeeded == 1
+
+    _assert_metadata_restored(big)
+    assert big.read_bytes() == data
+
+
+def test_dedup_hashing_keeps_the_scanned_atime_of_unique_files(tmp_path):
+    copy = b"shared cold content\n" * 1000
+    _cold_file(tmp_path / "a.txt", copy)
+    _cold_file(tmp_path / "b.txt", copy)
+    # Same size as each other, so both are hashed before they turn out unique
+    unique = [_cold_file(tmp_path / f"unique{i}.txt", (b"unique %d\n" % i) * 2000) for i in range(2)]
+    pipeline = _pipeline(use_dedup=True)
+
+    summary = pipeline.compress(tmp_path, threshold_days=30)
+    assert summary.files_succeeded == 4
+    assert pipeline.decompress(tmp_path).files_succeeded == 4
+
+    for path in unique:
+        _assert_metadata_restored(path)
+    # Copies share a blob that records no atime, so theirs comes back as the mtime
+    for name in ("a.txt", "b.txt"):
+        copy_stat = (tmp_path / name).stat()
+        assert copy_stat.st_mtime == copy_stat.st_atime == OLD + 5
+        assert stat.S_IMODE(copy_stat.st_mode) == 0o640
+    assert (tmp_path / "b.txt").read_bytes() == copy
+
+
+def _small_cold_files(directory, count=12):
+    return [_cold_file(directory / f"row{i}.json", b'{"id": %d, "status": "archived", "tags": []}\n' % i * 20)
+            for i in range(count)]
+
+
+@pytest.mark.parametrize("use_packs", [False, True])
+def test_dictionary_sampling_keeps_the_scanned_atime(tmp_path, use_packs):
+    files = _small_cold_files(tmp_path)
+    pipeline = _pipeline(use_dictionaries=True, use_packs=use_packs)
+
+    summary = pipeline.compress(tmp_path, threshold_days=30)
+    assert summary.files_succeeded == len(files)
+    assert list(tmp_path.glob(".coldcompress-*.dict"))
+    assert pipeline.decompress(tmp_path).files_succeeded == len(files)
+
+    for path in files:
+        _assert_metadata_restored(path)
+
+
+def test_compress_verify_decompress_flow(tmp_path):
+    data = b"pipeline flow\n" * 3000
+    files = [_cold_file(tmp_path / f"f{i}.txt", data) for i in range(4)]
+    (tmp_path / "hot.txt").write_bytes(data)
+    pipeline = _pipeline()
+    results = []
+
+    dry = pipeline.compress(tmp_path, threshold_days=30, dry_run=True)
+    assert dry.files_processed == 4 and not list(tmp_path.glob("*.zz"))
+
+    summary = pipeline.compress(tmp_path, threshold_days=30, on_result=lambda result, _: results.append(result))
+    assert (summary.candidate_files, summary.files_succeeded, summary.files_failed) == (4, 4, 0)
+    assert summary.space_saved > 0 and len(results) == 4
+    assert pipeline.metrics.counters['files_succeeded'] == 4
+
+    verified = pipeline.verify(tmp_path)
+    assert (verified.files_processed, verified.files_succeeded) == (4, 4)
+    assert not any(path.exists() for path in files)
+
+    restored = pipeline.decompress(tmp_path)
+    assert restored.files_succeeded == 4
+    assert not list(tmp_path.glob("*.zz"))
+    assert all(path.read_bytes() == data for path in files)
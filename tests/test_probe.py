@@ -0,0 +1,27 @@
+import os
+
+from services.codecs import get_codec
+from services.probe import CompressibilityProbe
+
+
+def _check(tmp_path, data, min_savings=10.0):
+    path = tmp_path / "sample.dat"
+    path.write_bytes(data)
+    return CompressibilityProbe(min_savings=min_savings).check(path, len(data), get_codec("zlib"), 6)
+
+
+def test_random_data_is_reported_as_growing(tmp_path):
+    result = _check(tmp_path, os.urandom(64 * 1024))
+    assert not result.compress
+    assert result.reason.startswith("sample grew by ")
+    assert "-" not in result.reason
+
+
+def test_weakly_compressible_data_is_reported_as_shrinking_too_little(tmp_path):
+    result = _check(tmp_path, b"abcd" * 4096, min_savings=100.0)
+    assert not result.compress
+    assert result.reason.startswith("sample shrank by only ")
+
+
+def test_compressible_data_is_accepted(tmp_path):
+    assert _check(tmp_path, b"abcd" * 4096).compress
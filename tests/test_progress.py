@@ -0,0 +1,78 @@
+from services.progress import ProgressSnapshot, ProgressTracker, format_duration, format_progress
+
+MB = 1024 * 1024
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _tracker(window=5.0):
+    clock = _Clock()
+    processed = [0]
+    tracker = ProgressTracker(window=window, clock=clock)
+    tracker.attach(lambda: processed[0])
+    return tracker, clock, processed
+
+
+def test_rate_and_eta_from_the_windowed_samples():
+    tracker, clock, processed = _tracker()
+    tracker.add_total(100 * MB)
+    tracker.finish_scan()
+    assert tracker.snapshot().eta is None  # One sample: no rate yet
+
+    clock.now += 2
+    processed[0] = 20 * MB
+    snapshot = tracker.snapshot()
+    assert snapshot.rate == 10 * MB
+    assert snapshot.percent == 20.0
+    assert snapshot.eta == 8.0
+
+
+def test_rate_forgets_samples_older_than_the_window():
+    tracker, clock, processed = _tracker(window=5.0)
+    tracker.add_total(1000 * MB)
+    for _ in range(10):
+        tracker.snapshot()
+        clock.now += 1
+        processed[0] += 50 * MB
+    # Slow down to 10 MB/s; after a full window only the new rate counts
+    for _ in range(6):
+        clock.now += 1
+        processed[0] += 10 * MB
+        snapshot = tracker.snapshot()
+    assert snapshot.rate == 10 * MB
+
+
+def test_stalled_run_has_no_eta():
+    tracker, clock, processed = _tracker()
+    tracker.add_total(10 * MB)
+    tracker.snapshot()
+    clock.now += 3
+    snapshot = tracker.snapshot()
+    assert snapshot.rate == 0 and snapshot.eta is None
+
+
+def test_total_grows_with_the_scan_and_never_trails_processed():
+    tracker, clock, processed = _tracker()
+    tracker.add_total(10 * MB)
+    processed[0] = 15 * MB
+    snapshot = tracker.snapshot()
+    assert snapshot.total_bytes == 15 * MB and snapshot.percent == 100.0
+    assert not snapshot.scan_complete
+
+    empty, _, _ = _tracker()
+    assert empty.snapshot().percent == 0.0
+    empty.finish_scan()
+    assert empty.snapshot().percent == 100.0
+
+
+def test_formatting():
+    assert format_duration(None) == "--:--"
+    assert format_duration(3725.9) == "1:02:05"
+    snapshot = ProgressSnapshot(20 * MB, 100 * MB, 20.0, 10 * MB, 8.0, False)
+    assert format_progress(snapshot) == "20.0% of 100.0+ MB — 10.0 MB/s — ETA 0:00:08"
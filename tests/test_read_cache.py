@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from services.compression_service import CompressionService
+from services.file_server import ColdFileServer
+from services.read_cache import DecompressionCache
+
+
+def _service():
+    return CompressionService(use_scan_index=False, use_journal=False, probe_enabled=False)
+
+
+def _compressed(directory, name, data):
+    path = directory / name
+    path.write_bytes(data)
+    assert _service().compress_file(path)['success']
+    return path
+
+
+def _content(i, size=1000):
+    return (b"file %d " % i * size)[:size]
+
+
+def _cache(tmp_path, **limits):
+    return DecompressionCache(_service(), cache_dir=tmp_path / "cache", **limits)
+
+
+def test_repeated_reads_hit_memory(tmp_path):
+    path = _compressed(tmp_path, "a.txt", _content(1))
+    cache = _cache(tmp_path)
+
+    assert cache.read(path) == _content(1)
+    assert cache.read(path) == _content(1)
+    stats = cache.stats
+    assert (stats.misses, stats.memory_hits, stats.disk_hits) == (1, 1, 0)
+    assert path.with_name("a.txt.zz").exists() and not path.exists()
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    paths = [_compressed(tmp_path, f"f{i}.txt", _content(i)) for i in range(3)]
+    cache = _cache(tmp_path, memory_bytes=2500, memory_max_file=1000)
+
+    cache.read(paths[0])
+    cache.read(paths[1])
+    cache.read(paths[0])  # f1 is now the least recently used
+    cache.read(paths[2])
+    stats = cache.stats
+    assert stats.evictions == 1 and stats.memory_bytes == 2000
+
+    cache.read(paths[0])
+    assert cache.stats.memory_hits == 2
+    cache.read(paths[1])  # Evicted from memory, still on disk
+    assert cache.stats.disk_hits == 1
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    paths = [_compressed(tmp_path, f"f{i}.txt", _content(i, 4000)) for i in range(3)]
+    cache = _cache(tmp_path, disk_bytes=9000, memory_bytes=0, memory_max_file=0)
+
+    for path in paths:
+        assert cache.read(path) == _content(paths.index(path), 4000)
+    stats = cache.stats
+    assert stats.evictions == 1 and stats.disk_bytes == 8000
+    assert len(list((tmp_path / "cache").glob("*.orig"))) == 2
+
+    cache.read(paths[0])  # The evicted file is inflated again
+    assert cache.stats.misses == 4
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = _compressed(tmp_path, "a.txt", _content(1))
+    _cache(tmp_path).read(path)
+
+    cache = _cache(tmp_path)
+    assert cache.read(path) == _content(1)
+    assert (cache.stats.disk_hits, cache.stats.misses) == (1, 0)
+
+
+def test_changed_zz_is_never_served_stale(tmp_path):
+    path = _compressed(tmp_path, "a.txt", _content(1))
+    cache = _cache(tmp_path)
+    assert cache.read(path) == _content(1)
+
+    other = tmp_path / "other"
+    other.mkdir()
+    replacement = _compressed(other, "a.txt", _content(2, 1500))
+    os.replace(replacement.with_name("a.txt.zz"), path.with_name("a.txt.zz"))
+
+    assert cache.read(path) == _content(2, 1500)
+    assert cache.stats.misses == 2
+
+
+def test_pack_members_are_read_through_the_cache(tmp_path):
+    files = []
+    for i in range(3):
+        files.append(tmp_path / f"m{i}.txt")
+        files[-1].write_bytes(_content(i))
+    assert _service().pack_files(files)['success']
+    cache = _cache(tmp_path)
+
+    assert cache.read(files[1]) == _content(1)
+    with pytest.raises(FileNotFoundError):
+        cache.read(tmp_path / "missing.txt")
+
+
+@pytest.fixture
+def server(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    server = ColdFileServer(root, _cache(tmp_path), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _get(server, path, headers=None):
+    host, port = server.server_address[:2]
+    request = urllib.request.Request(f"http://{host}:{port}{path}", headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), b""
+
+
+def test_server_serves_compressed_files_whole(server):
+    _compressed(server.root, "report.csv", _content(7))
+    status, headers, body = _get(server, "/report.csv")
+    assert status == 200
+    assert body == _content(7)
+    assert headers["Content-Length"] == str(len(body))
+    assert headers["Accept-Ranges"] == "bytes"
+
+
+def test_server_answers_byte_ranges(server):
+    _compressed(server.root, "report.csv", _content(7))
+    size = len(_content(7))
+
+    status, headers, body = _get(server, "/report.csv", {"Range": "bytes=10-19"})
+    assert status == 206
+    assert body == _content(7)[10:20]
+    assert headers["Content-Range"] == f"bytes 10-19/{size}"
+
+    status, headers, body = _get(server, "/report.csv", {"Range": "bytes=-5"})
+    assert status == 206 and body == _content(7)[-5:]
+    assert headers["Content-Range"] == f"bytes {size - 5}-{size - 1}/{size}"
+
+    status, _, _ = _get(server, "/report.csv", {"Range": f"bytes={size}-"})
+    assert status == 416
+
+
+def test_server_rejects_missing_and_escaping_paths(server):
+    (server.root.parent / "secret.txt").write_bytes(b"secret")
+    assert _get(server, "/missing.txt")[0] == 404
+    assert _get(server, "/../secret.txt")[0] == 404
+    assert _get(server, "/%2e%2e/secret.txt")[0] == 404
+
+
+def test_server_reports_cache_stats(server):
+    _compressed(server.root, "a.txt", _content(1))
+    _get(server, "/a.txt")
+    _get(server, "/a.txt")
+    status, headers, body = _get(server, "/_stats")
+    stats = json.loads(body)
+    assert status == 200 and headers["Content-Type"] == "application/json"
+    assert stats['misses'] == 1 and stats['memory_hits'] == 1
+    assert stats['hit_rate'] == 0.5
@@ -0,0 +1,137 @@
+import os
+import sqlite3
+import time
+
+from services.scan_index import ScanIndex
+from services.scanner import DirectoryScanner
+from services.selection_policy import SelectionPolicy
+
+
+def _scan(root, index):
+    scanner = DirectoryScanner(threshold_days=0, now=time.time() + 60, workers=1, index=index)
+    return sorted(str(entry.path) for entry in scanner.scan(root))
+
+
+def test_subtree_first_scanned_as_root_stays_reachable(tmp_path):
+    # Regression: scanning /a/b and then /a twice lost /a/b from the cached listing of /a
+    root = tmp_path / "a"
+    (root / "b").mkdir(parents=True)
+    (root / "b" / "f.txt").write_bytes(b"f")
+    (root / "g.txt").write_bytes(b"g")
+    index = ScanIndex(tmp_path / "index.sqlite3")
+    expected = [str(root / "b" / "f.txt"), str(root / "g.txt")]
+
+    _scan(str(root / "b"), index)
+    assert _scan(str(root), index) == expected
+    assert _scan(str(root), index) == expected
+    assert index.folder_stats(str(root)) == (2, 0)
+
+
+def test_unchanged_directory_is_served_from_index(tmp_path):
+    (tmp_path / "d").mkdir()
+    (tmp_path / "d" / "x.log").write_bytes(b"x")
+    index = ScanIndex(tmp_path / "index.sqlite3")
+    root = str(tmp_path / "d")
+    _scan(root, index)
+
+    cached = index.load_directory(root, os.stat(root).st_mtime)
+    assert cached is not None
+    records, subdirs = cached
+    assert [record.path for record in records] == [os.path.join(root, "x.log")]
+    assert subdirs == []
+
+
+def test_removed_subdirectory_is_dropped(tmp_path):
+    root = tmp_path / "r"
+    (root / "gone").mkdir(parents=True)
+    (root / "gone" / "f.txt").write_bytes(b"f")
+    index = ScanIndex(tmp_path / "index.sqlite3")
+    _scan(str(root), index)
+
+    os.remove(root / "gone" / "f.txt")
+    os.rmdir(root / "gone")
+    assert _scan(str(root), index) == []
+    assert index.folder_stats(str(root)) == (0, 0)
+
+
+def test_locked_index_does_not_block_scan(tmp_path):
+    root = tmp_path / "locked"
+    (root / "sub").mkdir(parents=True)
+    (root / "sub" / "f.txt").write_bytes(b"f")
+    (root / "g.txt").write_bytes(b"g")
+    db_path = tmp_path / "index.sqlite3"
+    index = ScanIndex(db_path, timeout=0.05)
+
+    # Another process holding the write lock
+    other = sqlite3.connect(str(db_path))
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        scanner = DirectoryScanner(threshold_days=0, now=time.time() + 60, workers=1, index=index)
+        found = sorted(str(entry.path) for entry in scanner.scan(str(root)))
+        assert found == [str(root / "g.txt"), str(root / "sub" / "f.txt")]
+        assert scanner.active_index is None
+    finally:
+        other.rollback()
+        other.close()
+
+    # The index is usable again once the lock is released
+    assert _scan(str(root), index) == [str(root / "g.txt"), str(root / "sub" / "f.txt")]
+    assert index.folder_stats(str(root)) == (2, 0)
+
+
+def test_directory_updates_are_committed_before_entries_are_yielded(tmp_path):
+    (tmp_path / "d").mkdir()
+    (tmp_path / "d" / "x.log").write_bytes(b"x")
+    db_path = tmp_path / "index.sqlite3"
+    index = ScanIndex(db_path)
+    scanner = DirectoryScanner(threshold_days=0, now=time.time() + 60, workers=1, index=index)
+    entries = scanner.scan(str(tmp_path / "d"))
+    next(entries)
+
+    # A second process can write while the consumer still holds the first entry
+    other = sqlite3.connect(str(db_path), timeout=0.05)
+    try:
+        other.execute("BEGIN IMMEDIATE")
+        other.rollback()
+    finally:
+        other.close()
+    entries.close()
+
+
+def _cold_scan(root, index, rules=None):
+    scanner = DirectoryScanner(threshold_days=30, workers=1, index=index, policy=SelectionPolicy(rules or {}))
+    return sorted(os.path.basename(entry.path) for entry in scanner.scan(root))
+
+
+def test_timestamps_set_back_are_found_in_an_unchanged_directory(tmp_path):
+    root = tmp_path / "logs"
+    root.mkdir()
+    for i in range(3):
+        (root / f"f{i}.log").write_bytes(b"x")
+    index = ScanIndex(tmp_path / "index.sqlite3")
+    assert _cold_scan(root, index) == []
+
+    directory_mtime = os.stat(root).st_mtime_ns
+    for i in range(3):
+        os.utime(root / f"f{i}.log", (1_000_000_000, 1_000_000_000))
+    assert os.stat(root).st_mtime_ns == directory_mtime
+    assert _cold_scan(root, index) == ["f0.log", "f1.log", "f2.log"]
+
+
+def test_size_changes_in_place_are_found_in_an_unchanged_directory(tmp_path):
+    root = tmp_path / "logs"
+    root.mkdir()
+    (root / "grown.log").write_bytes(b"x")
+    (root / "shrunk.log").write_bytes(b"x" * 5000)
+    for name in ("grown.log", "shrunk.log"):
+        os.utime(root / name, (1_000_000_000, 1_000_000_000))
+    index = ScanIndex(tmp_path / "index.sqlite3")
+    rules = {'min_size': 100, 'max_size': 1000}
+    assert _cold_scan(root, index, rules) == []
+
+    with open(root / "grown.log", "ab") as f:
+        f.write(b"x" * 500)
+    os.truncate(root / "shrunk.log", 500)
+    for name in ("grown.log", "shrunk.log"):
+        os.utime(root / name, (1_000_000_000, 1_000_000_000))
+    assert _cold_scan(root, index, rules) == ["grown.log", "shrunk.log"]
@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+
+from services.scanner import DirectoryScanner
+
+
+class _CountingScanner(DirectoryScanner):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.listed = 0
+        self._lock = threading.Lock()
+
+    def _list_directory(self, directory):
+        with self._lock:
+            self.listed += 1
+        return super()._list_directory(directory)
+
+
+def _tree(root, width=40, depth=2):
+    for i in range(width):
+        sub = root / f"d{i:03}"
+        sub.mkdir()
+        (sub / "file.txt").write_bytes(b"x")
+        if depth > 1:
+            _tree(sub, width=3, depth=depth - 1)
+
+
+def _paths(scanner, root):
+    return [str(entry.path) for entry in scanner.scan(root)]
+
+
+def test_ordered_parallel_scan_is_name_sorted_depth_first(tmp_path):
+    _tree(tmp_path)
+    expected = []
+    for top in sorted(tmp_path.iterdir()):
+        expected.append(str(top / "file.txt"))
+        expected.extend(str(sub / "file.txt") for sub in sorted(top.iterdir()) if sub.is_dir())
+
+    scanner = DirectoryScanner(threshold_days=0, now=time.time() + 60, workers=4, ordered=True)
+    assert _paths(scanner, tmp_path) == expected
+
+
+def test_ordered_parallel_scan_bounds_prefetch(tmp_path):
+    _tree(tmp_path, width=200, depth=1)
+    scanner = _CountingScanner(threshold_days=0, now=time.time() + 60, workers=2, ordered=True)
+    entries = scanner.scan(tmp_path)
+    next(entries)
+    time.sleep(0.2)  # Give the pool time to run anything it was handed
+
+    # The root, the directory being yielded and at most workers * 2 prefetched listings
+    assert scanner.listed <= 2 + 2 * 2
+    assert len(list(entries)) == 199
+
+
+def test_sequential_scan_stats_a_directory_before_yielding_it(tmp_path):
+    for i in range(5):
+        (tmp_path / f"f{i}.txt").write_bytes(b"x")
+        os.utime(tmp_path / f"f{i}.txt", (1_000_000_000, 1_000_000_000))
+    scanner = DirectoryScanner(threshold_days=30, workers=1)
+    entries = scanner.scan(tmp_path)
+    first = next(entries)
+    # A consumer reading the neighbours (e.g. to train a dictionary) must not change their scan stat
+    for path in tmp_path.iterdir():
+        os.utime(path)
+    rest = list(entries)
+    assert len(rest) == 4
+    assert all(entry.stat.st_atime == 1_000_000_000 for entry in [first] + rest)
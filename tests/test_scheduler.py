@@ -0,0 +1,65 @@
+import os
+import time
+from pathlib import Path
+
+from services.compression_service import CompressionService
+from services.probe import CompressibilityProbe
+from services.scheduler import CompressionScheduler
+from services.scanner import DirectoryScanner, ScanEntry
+
+
+class _CountingProbe(CompressibilityProbe):
+    def __init__(self):
+        super().__init__()
+        self.checked = []
+
+    def check(self, filepath, size, codec, level):
+        self.checked.append(filepath)
+        return super().check(filepath, size, codec, level)
+
+
+def _entry(name: str, size: int) -> ScanEntry:
+    return ScanEntry(Path(name), False, None, size)
+
+
+def test_first_candidate_is_dispatched_after_warmup():
+    service = CompressionService(use_scan_index=False, use_journal=False)
+    scheduler = CompressionScheduler(service.codec_policy, window=1000, warmup=4)
+    consumed = []
+
+    def entries():
+        for i in range(50):
+            consumed.append(i)
+            yield _entry(f"f{i}.txt", 1000 + i)
+
+    ordered = scheduler.order(entries(), workers=1)
+    next(ordered)
+    assert len(consumed) == 5
+    assert len(list(ordered)) == 49
+
+
+def test_whole_scan_window_still_orders_everything():
+    service = CompressionService(use_scan_index=False, use_journal=False)
+    scheduler = CompressionScheduler(service.codec_policy, window=0, warmup=4, file_overhead=0)
+    sizes = [10, 5000, 20, 4000]
+    ordered = list(scheduler.order((_entry(f"f{size}.log", size) for size in sizes), workers=1))
+    assert len(ordered) == len(sizes)
+
+
+def test_large_files_are_probed_once(tmp_path):
+    big = tmp_path / "big.txt"
+    big.write_bytes(b"compressible text\n" * 20000)
+    service = CompressionService(use_scan_index=False, use_journal=False)
+    service.probe = _CountingProbe()
+    scheduler = CompressionScheduler(service.codec_policy, service.probe, probe_min_size=1024)
+    scanner = DirectoryScanner(threshold_days=0, now=time.time() + 60)
+
+    ordered = list(scheduler.order(scanner.scan(tmp_path), workers=1))
+    probe = scheduler.take_probe(ordered[0].path)
+    assert probe is not None and probe.compress
+    result = service.compress_file(ordered[0].path, probe=probe)
+
+    assert result['success'], result['message']
+    assert service.probe.checked == [big]
+    assert scheduler.take_probe(ordered[0].path) is None
+    assert os.path.exists(str(big) + ".zz")